@@ -0,0 +1,229 @@
+# benchmarks/bench_connection.py
+"""
+对比「每次调用都 sqlite3.connect()」与 ConnectionManager 长连接的耗时。
+
+    python benchmarks/bench_connection.py [--ticks 2000] [--reads 500]
+
+- tick 写路径: update_stats + update_app_usage + update_key_counts
+- dashboard 读路径: get_today_stats + get_data_by_year + get_today_top_apps
+
+两边执行的是同一份代码：基线版本 DatabaseManager 的冻结副本（TEXT 日期、没有缓存 / 写线程 / 汇总表）。
+before 每次调用新建连接、用完即关；after 只把 _get_connection() 换成 ConnectionManager 的每线程长连接，
+因此差值只来自 ConnectionManager 本身：省去每次的 connect / PRAGMA / 语句解析，
+以及它打开连接时设置的 WAL + synchronous=NORMAL（before 用 SQLite 默认的回滚日志，每次提交都 fsync）。
+结果不受之后 DatabaseManager 改动的影响。
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.connection import ConnectionManager
+
+
+class BaselineDatabaseManager:
+    """基线版本的写路径与 dashboard 读路径的冻结副本：每次调用新建连接，调用结束后关闭"""
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+
+    @contextmanager
+    def _get_connection(self):
+        conn = sqlite3.connect(self.db_name)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def init_db(self):
+        with self._get_connection() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS daily_stats (
+                    date TEXT PRIMARY KEY,
+                    screen_time_seconds REAL DEFAULT 0,
+                    mouse_clicks INTEGER DEFAULT 0,
+                    keystrokes INTEGER DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS app_stats (
+                    date TEXT,
+                    app_name TEXT,
+                    duration_seconds REAL DEFAULT 0,
+                    PRIMARY KEY (date, app_name)
+                );
+                CREATE TABLE IF NOT EXISTS keyboard_stats (
+                    date TEXT,
+                    key_name TEXT,
+                    count INTEGER DEFAULT 0,
+                    PRIMARY KEY (date, key_name)
+                );
+                CREATE TABLE IF NOT EXISTS hourly_stats (
+                    date TEXT,
+                    hour INTEGER,
+                    screen_time_seconds REAL DEFAULT 0,
+                    mouse_clicks INTEGER DEFAULT 0,
+                    keystrokes INTEGER DEFAULT 0,
+                    PRIMARY KEY (date, hour)
+                );
+                """
+            )
+
+    def update_stats(self, add_time=0, add_clicks=0, add_keys=0):
+        now = datetime.now()
+        today_str = now.date().isoformat()
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "INSERT INTO daily_stats (date, screen_time_seconds, mouse_clicks, keystrokes) "
+                    "VALUES (?, ?, ?, ?)",
+                    (today_str, add_time, add_clicks, add_keys),
+                )
+            except sqlite3.IntegrityError:
+                cursor.execute(
+                    "UPDATE daily_stats SET screen_time_seconds = screen_time_seconds + ?, "
+                    "mouse_clicks = mouse_clicks + ?, keystrokes = keystrokes + ? WHERE date = ?",
+                    (add_time, add_clicks, add_keys, today_str),
+                )
+            try:
+                cursor.execute(
+                    "INSERT INTO hourly_stats (date, hour, screen_time_seconds, mouse_clicks, keystrokes) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (today_str, now.hour, add_time, add_clicks, add_keys),
+                )
+            except sqlite3.IntegrityError:
+                cursor.execute(
+                    "UPDATE hourly_stats SET screen_time_seconds = screen_time_seconds + ?, "
+                    "mouse_clicks = mouse_clicks + ?, keystrokes = keystrokes + ? WHERE date = ? AND hour = ?",
+                    (add_time, add_clicks, add_keys, today_str, now.hour),
+                )
+
+    def update_app_usage(self, app_name, duration_delta):
+        today_str = str(date.today())
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "INSERT INTO app_stats (date, app_name, duration_seconds) VALUES (?, ?, ?)",
+                    (today_str, app_name, duration_delta),
+                )
+            except sqlite3.IntegrityError:
+                cursor.execute(
+                    "UPDATE app_stats SET duration_seconds = duration_seconds + ? WHERE date = ? AND app_name = ?",
+                    (duration_delta, today_str, app_name),
+                )
+
+    def update_key_counts(self, key_counts_dict):
+        if not key_counts_dict:
+            return
+        today_str = str(date.today())
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            for key, count in key_counts_dict.items():
+                try:
+                    cursor.execute(
+                        "INSERT INTO keyboard_stats (date, key_name, count) VALUES (?, ?, ?)",
+                        (today_str, key, count),
+                    )
+                except sqlite3.IntegrityError:
+                    cursor.execute(
+                        "UPDATE keyboard_stats SET count = count + ? WHERE date = ? AND key_name = ?",
+                        (count, today_str, key),
+                    )
+
+    def get_today_stats(self):
+        with self._get_connection() as conn:
+            row = conn.execute(
+                "SELECT screen_time_seconds, mouse_clicks, keystrokes FROM daily_stats WHERE date = ?",
+                (str(date.today()),),
+            ).fetchone()
+            return row if row else (0, 0, 0)
+
+    def get_data_by_year(self, year):
+        with self._get_connection() as conn:
+            return conn.execute(
+                "SELECT * FROM daily_stats WHERE date LIKE ? ORDER BY date", (f"{year}-%",)
+            ).fetchall()
+
+    def get_today_top_apps(self, limit=10):
+        with self._get_connection() as conn:
+            return conn.execute(
+                "SELECT app_name, duration_seconds FROM app_stats WHERE date = ? "
+                "ORDER BY duration_seconds DESC LIMIT ?",
+                (str(date.today()), limit),
+            ).fetchall()
+
+    def close(self):
+        pass
+
+
+class PersistentBaselineManager(BaselineDatabaseManager):
+    """同一份基线代码，连接改由 ConnectionManager 提供（每线程一个长连接）"""
+
+    def __init__(self, db_name):
+        super().__init__(db_name)
+        self.connections = ConnectionManager(db_name)
+
+    @contextmanager
+    def _get_connection(self):
+        conn = self.connections.get()
+        with conn:
+            yield conn
+
+    def close(self):
+        self.connections.close_all()
+
+
+def bench_tick_writes(manager, ticks):
+    keys = {"E": 3, "SPACE": 2, "A": 1}
+    start = time.perf_counter()
+    for i in range(ticks):
+        manager.update_stats(2, 1, 6)
+        manager.update_app_usage(f"app{i % 8}.exe", 2)
+        manager.update_key_counts(keys)
+    return time.perf_counter() - start
+
+
+def bench_dashboard_reads(manager, reads):
+    year = date.today().year
+    start = time.perf_counter()
+    for _ in range(reads):
+        manager.get_today_stats()
+        manager.get_data_by_year(year)
+        manager.get_today_top_apps(limit=10)
+    return time.perf_counter() - start
+
+
+def run(label, manager_cls, workdir, ticks, reads):
+    manager = manager_cls(os.path.join(workdir, f"{label}.db"))
+    manager.init_db()
+    write_s = bench_tick_writes(manager, ticks)
+    read_s = bench_dashboard_reads(manager, reads)
+    manager.close()
+    print(f"{label:>8}: tick write {write_s * 1e6 / ticks:8.1f} us/tick   "
+          f"dashboard read {read_s * 1e6 / reads:8.1f} us/refresh")
+    return write_s, read_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        before = run("before", BaselineDatabaseManager, workdir, args.ticks, args.reads)
+        after = run("after", PersistentBaselineManager, workdir, args.ticks, args.reads)
+
+    print(f"speedup : tick write x{before[0] / after[0]:.1f}   dashboard read x{before[1] / after[1]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+# benchmarks/bench_suite.py
+"""
+DatabaseManager 热路径的基准测试套件。
+
+    python benchmarks/bench_suite.py [--years 0,1,10] [--ticks 500] [--reads 100]
+                                     [--output results.json] [--baseline benchmarks/baseline.json]
+                                     [--source PATH] [--save-baseline] [--threshold 20] [--metric p50_us]
+
+每种历史规模（synthetic.py 生成的 N 年数据，0 为空库）分别测量：
+- tick_write:   update_stats + update_app_usage + update_key_counts
+- dashboard:    get_today_stats + get_data_by_year + get_today_top_apps
+- detail:       get_hourly_activity + get_weekly_trend + get_yearly_trend（日期在历史中随机选取）
+每项在两种场景下各跑一遍：alone（只有被测的一方）和 concurrent
+（测写时后台线程不停地读，测读时后台线程不停地写）。
+
+结果写成 JSON（每项的 mean / p50 / p95 / max，单位微秒），与基线文件逐项对比
+（默认比较中位数，受偶发的长尾影响较小），变慢超过 threshold% 的项标为回归，并以退出码 1 结束；
+基线文件不存在时以退出码 2 结束。
+
+benchmarks/baseline.json 是在基线版本（引入连接管理器之前的提交）上测得的。
+--source 指定另一个检出的根目录，测量其中的 DatabaseManager；合成历史仍由当前代码生成，
+基线版本的表结构（TEXT 日期）按需转换。重新生成基线：
+
+    git worktree add /tmp/dailygrid-baseline <基线提交>
+    python benchmarks/bench_suite.py --source /tmp/dailygrid-baseline --save-baseline
+    git worktree remove /tmp/dailygrid-baseline
+
+基线与对比应在同一台机器上测得；换机器后先重新生成基线。
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import DatabaseManager, keyvectors
+from src.database.timekeys import SQL_DAY_TO_DATE, date_from_day
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SEED = 0
+
+
+# ======================================================
+# 被测操作（每次调用是一个样本）
+# ======================================================
+def tick_write(manager, days, rng, i):
+    manager.update_stats(2, 1, 6)
+    manager.update_app_usage(f"app{i % 8}.exe", 2)
+    manager.update_key_counts({"E": 3, "SPACE": 2, "A": 1})
+
+
+def dashboard_read(manager, days, rng, i):
+    manager.get_today_stats()
+    manager.get_data_by_year(date.today().year)
+    manager.get_today_top_apps(limit=10)
+
+
+def detail_read(manager, days, rng, i):
+    day = rng.choice(days)
+    date_str = day.isoformat()
+    manager.get_hourly_activity(date_str)
+    manager.get_weekly_trend(date_str)
+    manager.get_yearly_trend(day.year)
+
+
+OPERATIONS = {
+    "tick_write": (tick_write, dashboard_read),  # (被测操作, concurrent 场景的后台操作)
+    "dashboard": (dashboard_read, tick_write),
+    "detail": (detail_read, tick_write),
+}
+
+
+def measure(manager, days, operation, count, background=None):
+    """
+    执行 count 次 operation，返回每次耗时（微秒）的数组；background 不为空时在后台线程中循环执行。
+    days: detail 读取时随机选取的日期
+    """
+    stop = threading.Event()
+    thread = None
+    if background is not None:
+        def loop():
+            bg_rng = random.Random(SEED + 1)
+            i = 0
+            while not stop.is_set():
+                background(manager, days, bg_rng, i)
+                i += 1
+
+        thread = threading.Thread(target=loop, name="BenchBackground", daemon=True)
+        thread.start()
+
+    rng = random.Random(SEED)
+    samples = np.empty(count, dtype=np.float64)
+    try:
+        for i in range(count):
+            started = time.perf_counter()
+            operation(manager, days, rng, i)
+            samples[i] = (time.perf_counter() - started) * 1e6
+    finally:
+        stop.set()
+        if thread is not None:
+            thread.join()
+    return samples
+
+
+def summarize(samples):
+    return {
+        "count": int(len(samples)),
+        "mean_us": float(samples.mean()),
+        "p50_us": float(np.percentile(samples, 50)),
+        "p95_us": float(np.percentile(samples, 95)),
+        "max_us": float(samples.max()),
+    }
+
+
+# ======================================================
+# 被测代码与历史数据
+# ======================================================
+def load_manager_class(source):
+    """source 为 None 时测量当前代码，否则加载 source 检出中的 src/database 包"""
+    if source is None:
+        return DatabaseManager
+    package = os.path.join(os.path.abspath(source), "src", "database")
+    spec = importlib.util.spec_from_file_location(
+        "bench_target_database", os.path.join(package, "__init__.py"), submodule_search_locations=[package]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module.DatabaseManager
+
+
+def source_commit(source):
+    root = os.path.abspath(source) if source else os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        return subprocess.run(["git", "-C", root, "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_history(workdir, years):
+    """用当前代码生成 years 年的合成历史（每种规模只生成一次），返回 (库路径, 历史中的日期)"""
+    path = os.path.join(workdir, f"history_{years}y.db")
+    manager = DatabaseManager(path)
+    try:
+        manager.init_db()
+        if years:
+            manager.generate_synthetic(years=years, seed=SEED, end=date.today() - timedelta(days=1))
+        with manager._reader() as conn:
+            days = [date_from_day(row[0]) for row in conn.execute("SELECT day FROM daily_stats ORDER BY day")]
+    finally:
+        manager.close()
+    return path, days
+
+
+def copy_to_text_dates(history, path):
+    """把当前表结构的历史写进基线版本的表结构（TEXT 日期、应用名 / 按键名直接存在行里）"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS h", (history,))
+        with conn:
+            conn.execute(
+                f"""
+                INSERT INTO daily_stats (date, screen_time_seconds, mouse_clicks, keystrokes)
+                SELECT {SQL_DAY_TO_DATE.format(col="day")}, screen_time_seconds, mouse_clicks, keystrokes
+                FROM h.daily_stats
+                """
+            )
+            conn.execute(
+                f"""
+                INSERT INTO hourly_stats (date, hour, screen_time_seconds, mouse_clicks, keystrokes)
+                SELECT {SQL_DAY_TO_DATE.format(col="(hour / 24)")}, hour % 24,
+                       screen_time_seconds, mouse_clicks, keystrokes
+                FROM h.hourly_stats
+                """
+            )
+            conn.execute(
+                f"""
+                INSERT INTO app_stats (date, app_name, duration_seconds)
+                SELECT {SQL_DAY_TO_DATE.format(col="s.day")}, a.name, s.duration_seconds
+                FROM h.app_stats s JOIN h.apps a ON a.id = s.app_id
+                """
+            )
+            names = dict(conn.execute("SELECT id, name FROM h.keys"))
+            conn.executemany(
+                "INSERT INTO keyboard_stats (date, key_name, count) VALUES (?, ?, ?)",
+                (
+                    (date_from_day(day).isoformat(), names[key_id], count)
+                    for day, blob in conn.execute("SELECT day, counts FROM h.keyboard_daily").fetchall()
+                    for key_id, count in keyvectors.nonzero_items(keyvectors.unpack(blob))
+                ),
+            )
+        conn.execute("DETACH DATABASE h")
+    finally:
+        conn.close()
+
+
+def creates_text_dates(manager_class, workdir):
+    """被测代码的 init_db() 是否建出基线版本的表结构（daily_stats 以 TEXT 日期为键）"""
+    path = os.path.join(workdir, "probe.db")
+    manager = manager_class(path)
+    manager.init_db()
+    if hasattr(manager, "close"):
+        manager.close()
+    conn = sqlite3.connect(path)
+    try:
+        return "date" in {row[1] for row in conn.execute("PRAGMA table_info(daily_stats)")}
+    finally:
+        conn.close()
+
+
+# ======================================================
+# 运行
+# ======================================================
+def prepare(manager_class, history, path, text_dates):
+    """返回装好 history 中合成历史的 manager_class 实例（库文件为 path）"""
+    if text_dates:
+        manager = manager_class(path)
+        manager.init_db()
+        copy_to_text_dates(history, path)
+    else:
+        shutil.copyfile(history, path)
+        manager = manager_class(path)
+        manager.init_db()
+    return manager
+
+
+def run(years_list, ticks, reads, manager_class=DatabaseManager):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        text_dates = creates_text_dates(manager_class, workdir)
+        for years in years_list:
+            history, days = make_history(workdir, years)
+            # 空库时用最近 30 天
+            days = days or [date.today() - timedelta(days=i) for i in range(30)]
+            for scenario in ("alone", "concurrent"):
+                # 每个场景用一个新库，写入量不会在场景之间累积
+                path = os.path.join(workdir, f"bench_{years}y_{scenario}.db")
+                manager = prepare(manager_class, history, path, text_dates)
+                try:
+                    for name, (operation, background) in OPERATIONS.items():
+                        count = ticks if name == "tick_write" else reads
+                        # 基线版本没有读缓存
+                        if hasattr(manager, "cache"):
+                            manager.cache.clear()
+                        samples = measure(manager, days, operation, count,
+                                          background if scenario == "concurrent" else None)
+                        key = f"{years}y/{scenario}/{name}"
+                        results[key] = summarize(samples)
+                        print(f"{key:<28} mean {results[key]['mean_us']:9.1f} us   "
+                              f"p50 {results[key]['p50_us']:9.1f}   p95 {results[key]['p95_us']:9.1f}")
+                finally:
+                    # 基线版本每次调用新建连接，没有 close()
+                    if hasattr(manager, "close"):
+                        manager.close()
+    return results
+
+
+def compare(results, baseline, threshold, metric="p50_us"):
+    """逐项对比 metric，返回回归项的列表"""
+    regressions = []
+    print(f"\n{'benchmark':<28} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key, current in results.items():
+        old = baseline.get("results", {}).get(key)
+        if old is None:
+            print(f"{key:<28} {'-':>10} {current[metric]:10.1f} {'new':>8}")
+            continue
+        change = (current[metric] - old[metric]) / old[metric] * 100
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key:<28} {old[metric]:10.1f} {current[metric]:10.1f} {change:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", default="0,1,10", help="comma-separated history sizes in years")
+    parser.add_argument("--ticks", type=int, default=500, help="tick writes per benchmark")
+    parser.add_argument("--reads", type=int, default=100, help="read-set refreshes per benchmark")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--source", help="root of another checkout whose DatabaseManager is measured "
+                                         "(e.g. a git worktree of the baseline commit)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the results as the baseline instead of comparing against it")
+    parser.add_argument("--threshold", type=float, default=20.0, help="regression threshold in percent")
+    parser.add_argument("--metric", default="p50_us", choices=("mean_us", "p50_us", "p95_us", "max_us"),
+                        help="statistic compared against the baseline (default: %(default)s)")
+    args = parser.parse_args()
+
+    years_list = [int(y) for y in args.years.split(",")]
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        # 在跑完整个套件之前就失败：没有基线就无从判断回归
+        print(f"No baseline at {args.baseline}. Generate one on the baseline commit first "
+              f"(see `python benchmarks/bench_suite.py --help`).", file=sys.stderr)
+        return 2
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "years": years_list,
+            "ticks": args.ticks,
+            "reads": args.reads,
+            "commit": source_commit(args.source),
+        },
+        "results": run(years_list, args.ticks, args.reads, load_manager_class(args.source)),
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}.")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved baseline to {args.baseline}.")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nBaseline: commit {baseline['meta'].get('commit') or '?'}, created {baseline['meta']['created']}.")
+    regressions = compare(report["results"], baseline, args.threshold, args.metric)
+    if regressions:
+        print(f"\n{len(regressions)} benchmarks slower than the baseline by more than {args.threshold:.0f}%.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,22 @@
 # 文件路径: database/__init__.py
 
+import os
+
 from .service import DatabaseManager
+from .profiler import SLOW_MS
+from .snapshot import SNAPSHOT_INTERVAL
 
 # 创建一个单例实例供外部使用
-db = DatabaseManager()
+# DAILYGRID_IN_MEMORY=1 时在内存数据库上运行，每 DAILYGRID_SNAPSHOT_INTERVAL 秒写回磁盘；
+# DAILYGRID_PROFILE=1 时按方法计时，退出时打印报告；
+# 写缓冲默认带崩溃恢复日志（activity_data.db.deltas），DAILYGRID_JOURNAL=0 时关闭
+db = DatabaseManager(
+    in_memory=os.environ.get("DAILYGRID_IN_MEMORY") == "1",
+    snapshot_interval=float(os.environ.get("DAILYGRID_SNAPSHOT_INTERVAL", SNAPSHOT_INTERVAL)),
+    profile=os.environ.get("DAILYGRID_PROFILE") == "1",
+    slow_query_ms=float(os.environ.get("DAILYGRID_SLOW_QUERY_MS", SLOW_MS)),
+    journal=os.environ.get("DAILYGRID_JOURNAL", "1") == "1",
+)
 
 # 定义包的导出列表
 __all__ = ['db', 'DatabaseManager']
\ No newline at end of file
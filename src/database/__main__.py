@@ -0,0 +1,267 @@
+# 文件路径: database/__main__.py
+"""
+数据库维护命令：
+
+    python -m src.database [--db activity_data.db] rollups --check
+    python -m src.database [--db activity_data.db] rollups --rebuild
+    python -m src.database [--db activity_data.db] retention [--hourly-months N] [--keys-months N] [--save] [--vacuum]
+    python -m src.database [--db activity_data.db] export out.csv.gz [--tables daily,hourly]
+    python -m src.database [--db activity_data.db] merge other_machine.db
+    python -m src.database [--db activity_data.db] profile [--rounds N] [--slow-ms MS] [--json report.json]
+    python -m src.database --db synthetic.db generate [--years 10] [--apps 2000] [--seed 0]
+    python -m src.database [--db activity_data.db] import history.csv [--preset rescuetime] [--map app=Name] [--dry-run]
+"""
+import argparse
+import sys
+import time
+from datetime import date
+
+from .export import EXPORT_TABLES
+from .importer import BATCH_RECORDS, PRESETS, ImportFormatError
+from .merge import MergeError
+from .profiler import SLOW_MS
+from .retention import BATCH_DAYS, RetentionPolicy
+from .service import DB_NAME, DatabaseManager
+from .synthetic import APPS, SEED, YEARS, SyntheticError
+from .timekeys import date_str_from_day, day_key, to_date
+
+
+def cmd_rollups(manager, args):
+    if args.rebuild:
+        problems = manager.rebuild_rollups()
+        print("Rollup tables rebuilt from daily_stats.")
+    else:
+        problems = manager.check_rollups()
+
+    if not problems:
+        print("Rollup tables are consistent with daily_stats.")
+        return 0
+
+    for table, key, expected, actual in problems:
+        print(f"  {table}[{key}]: expected {expected}, found {actual}")
+    print(f"{len(problems)} inconsistent rollup rows (run with --rebuild to fix).")
+    return 1
+
+
+def cmd_retention(manager, args):
+    stored = manager.get_retention_policy()
+    policy = RetentionPolicy(
+        hourly_months=stored.hourly_months if args.hourly_months is None else args.hourly_months,
+        keys_months=stored.keys_months if args.keys_months is None else args.keys_months,
+        batch_days=args.batch_days,
+    )
+    if args.save:
+        manager.set_retention_policy(policy)
+        print(f"Saved {policy}.")
+
+    report = manager.apply_retention(policy, vacuum=args.vacuum)
+    print(f"Folded {report['hourly_rows']} hourly rows and {report['key_days']} days of key counts "
+          f"in {report['batches']} batches.")
+    print(f"Freed {report['freed_bytes'] / 1024:.1f} KiB inside the file, "
+          f"reclaimed {report['reclaimed_bytes'] / 1024:.1f} KiB on disk "
+          f"(now {report['file_bytes'] / 1024:.1f} KiB).")
+    return 0
+
+
+def cmd_export(manager, args):
+    tables = args.tables.split(",") if args.tables else None
+
+    def progress(done, total, name):
+        print(f"\r  {name:<12} {done}/{total} rows", end="", flush=True)
+
+    result = manager.export_data(args.path, tables=tables, progress=progress)
+    print()
+    for name, count in result["rows"].items():
+        print(f"  {name}: {count} rows")
+    print(f"Wrote {', '.join(result['files'])}.")
+    return 0
+
+
+def cmd_merge(manager, args):
+    try:
+        report = manager.merge_from(args.source)
+    except MergeError as e:
+        print(e)
+        return 1
+
+    if report["status"] == "up_to_date":
+        print(f"{args.source} has not changed since it was last merged; nothing to do.")
+        return 0
+    if report["since_day"] is not None:
+        print(f"Merged days after {date_str_from_day(report['since_day'])} from {args.source}:")
+    else:
+        print(f"Merged {args.source}:")
+    for table, count in report["rows"].items():
+        print(f"  {table}: {count} rows")
+    return 0
+
+
+def cmd_profile(manager, args):
+    """冷缓存下跑一遍仪表盘 / 详情页的查询，输出每个方法的耗时与慢查询"""
+    manager.profiler.slow_ms = args.slow_ms
+    manager.profiler.reset()  # 不计入启动时的迁移
+    year = args.year or date.today().year
+    last_day = min(day_key(date.today()), day_key(f"{year}-12-31"))
+
+    for _ in range(args.rounds):
+        manager.cache.clear()
+        manager.get_available_years()
+        manager.get_data_by_year(year)
+        manager.get_daily_arrays(f"{year}-01-01", f"{year}-12-31")
+        manager.get_yearly_trend(year)
+        manager.get_total_keyboard_heatmap()
+        manager.get_today_stats()
+        manager.get_today_top_apps()
+        for day in range(last_day - args.days + 1, last_day + 1):
+            date_str = date_str_from_day(day)
+            manager.get_hourly_activity(date_str)
+            manager.get_weekly_trend(date_str)
+            manager.get_top_apps_by_date(date_str)
+            manager.get_events(date_str)
+
+    if args.json:
+        manager.dump_query_report(args.json)
+        print(f"Wrote {args.json}.")
+    else:
+        manager.dump_query_report()
+    manager.profiler.reset()  # close() 不再重复打印
+    return 0
+
+
+def cmd_generate(manager, args):
+    def progress(done, total):
+        print(f"\r  {done}/{total} days", end="", flush=True)
+
+    started = time.perf_counter()
+    try:
+        rows = manager.generate_synthetic(
+            years=args.years, apps=args.apps, seed=args.seed,
+            end=to_date(args.end) if args.end else None, progress=progress,
+        )
+    except SyntheticError as e:
+        print(e)
+        return 1
+    print()
+    for table, count in rows.items():
+        print(f"  {table}: {count} rows")
+    print(f"Generated {args.years} years of synthetic history in {time.perf_counter() - started:.1f}s.")
+    return 0
+
+
+def cmd_import(manager, args):
+    mapping = PRESETS[args.preset]
+    overrides = {}
+    for item in args.map or ():
+        field, _, column = item.partition("=")
+        if field not in mapping._fields or not column:
+            print(f"Invalid --map {item!r}: expected FIELD=COLUMN with FIELD one of {', '.join(mapping._fields)}.")
+            return 2
+        overrides[field] = column
+    mapping = mapping._replace(**overrides)
+
+    started = time.perf_counter()
+
+    def progress(done, total, records):
+        rate = records / max(time.perf_counter() - started, 1e-9)
+        print(f"\r  {done * 100 // max(total, 1):3d}%  {records} records  {rate:,.0f} records/s", end="", flush=True)
+
+    try:
+        report = manager.import_history(args.path, mapping, dry_run=args.dry_run, batch_records=args.batch,
+                                        progress=progress)
+    except (ImportFormatError, OSError) as e:
+        print(e)
+        return 1
+    if report["status"] == "already_imported":
+        print(f"{args.path} has already been imported; nothing to do.")
+        return 0
+    print()
+
+    elapsed = time.perf_counter() - started
+    print(f"  records: {report['records']} ({report['imported']} valid, {report['invalid']} invalid)")
+    if report["resumed_records"] and not args.dry_run:
+        print(f"  resumed: the first {report['resumed_records']} records were written by an interrupted import")
+    if report["first_date"]:
+        print(f"  range:   {report['first_date']} .. {report['last_date']}, "
+              f"{report['screen_time_seconds'] / 3600:.1f} hours across {report['apps']} apps")
+    for number, message in report["errors"]:
+        print(f"  record {number}: {message}")
+    if report["invalid"] > len(report["errors"]):
+        print(f"  ... and {report['invalid'] - len(report['errors'])} more invalid records")
+    if args.dry_run:
+        note = " (this file has already been imported)" if report["already_imported"] else ""
+        print(f"Dry run: nothing was written{note}. Parsed in {elapsed:.1f}s.")
+    else:
+        print(f"Imported {report['imported']} records in {elapsed:.1f}s "
+              f"({report['imported'] / max(elapsed, 1e-9):,.0f} records/s).")
+    return 1 if report["invalid"] and not report["imported"] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m src.database", description="DailyGrid database tools")
+    parser.add_argument("--db", default=DB_NAME, help="database file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("rollups", help="check or rebuild monthly / yearly rollup tables")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--check", action="store_true", help="only verify the rollups (default)")
+    group.add_argument("--rebuild", action="store_true", help="recompute the rollups from daily_stats")
+    p.set_defaults(func=cmd_rollups)
+
+    p = commands.add_parser("retention", help="downsample old hourly / per-key history")
+    p.add_argument("--hourly-months", type=int, help="months of hourly detail to keep (0 = forever)")
+    p.add_argument("--keys-months", type=int, help="months of per-day key counts to keep (0 = forever)")
+    p.add_argument("--batch-days", type=int, default=BATCH_DAYS, help="days per transaction")
+    p.add_argument("--save", action="store_true", help="store the given months as the default policy")
+    p.add_argument("--vacuum", action="store_true", help="run VACUUM afterwards to shrink the file")
+    p.set_defaults(func=cmd_retention)
+
+    p = commands.add_parser("export", help="stream tables to CSV or JSON Lines (.gz / .xz compressed)")
+    p.add_argument("path", help="output file, e.g. export.csv, export.jsonl.gz, export.csv.xz")
+    p.add_argument("--tables", help=f"comma-separated subset of: {', '.join(EXPORT_TABLES)}")
+    p.set_defaults(func=cmd_export)
+
+    p = commands.add_parser("merge", help="add another machine's database into this one")
+    p.add_argument("source", help="path of the other activity_data.db")
+    p.set_defaults(func=cmd_merge)
+
+    p = commands.add_parser("profile", help="time the UI queries and show slow queries with their plans")
+    p.add_argument("--year", type=int, help="year to query (default: current year)")
+    p.add_argument("--days", type=int, default=7, help="days of detail pages to open (default: %(default)s)")
+    p.add_argument("--rounds", type=int, default=3, help="repetitions with a cold cache (default: %(default)s)")
+    p.add_argument("--slow-ms", type=float, default=SLOW_MS, help="slow-query threshold (default: %(default)s)")
+    p.add_argument("--json", help="write the report to this JSON file instead of printing it")
+    p.set_defaults(func=cmd_profile, profile=True)
+
+    p = commands.add_parser("generate", help="fill an empty database with synthetic multi-year history")
+    p.add_argument("--years", type=int, default=YEARS, help="years of history (default: %(default)s)")
+    p.add_argument("--apps", type=int, default=APPS, help="number of distinct apps (default: %(default)s)")
+    p.add_argument("--seed", type=int, default=SEED, help="random seed (default: %(default)s)")
+    p.add_argument("--end", help="last generated day, YYYY-MM-DD (default: yesterday)")
+    p.set_defaults(func=cmd_generate)
+
+    p = commands.add_parser("import", help="bulk import history exported from other time trackers")
+    p.add_argument("path", help="CSV, JSON Lines or JSON array file (optionally .gz / .xz compressed)")
+    p.add_argument("--preset", choices=sorted(PRESETS), default="generic",
+                   help="column names of a known tracker's export (default: %(default)s)")
+    p.add_argument("--map", action="append", metavar="FIELD=COLUMN",
+                   help="override a column; FIELD is start, end, duration, app, clicks or keys "
+                        "(JSON paths like data.app are allowed)")
+    p.add_argument("--batch", type=int, default=BATCH_RECORDS, help="records per batched upsert (default: %(default)s)")
+    p.add_argument("--dry-run", action="store_true", help="parse and validate only, write nothing")
+    p.set_defaults(func=cmd_import)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    manager = DatabaseManager(args.db, profile=getattr(args, "profile", False))
+    try:
+        manager.init_db()
+        return args.func(manager, args)
+    finally:
+        manager.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
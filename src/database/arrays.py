@@ -0,0 +1,49 @@
+# 文件路径: database/arrays.py
+"""
+列式（NumPy）读取接口的返回类型与辅助函数。
+
+按天 / 按小时的指标由 series.py 读取并散射到连续的、补零的数组，再包装成 MetricArrays：
+
+    MetricArrays.index        epoch-day（或 epoch-hour），连续递增
+    MetricArrays.screen_time  float64，秒
+    MetricArrays.clicks       int64
+    MetricArrays.keys         int64
+"""
+import time
+from collections import namedtuple
+
+import numpy as np
+
+MetricArrays = namedtuple("MetricArrays", ["index", "screen_time", "clicks", "keys"])
+
+# 单个应用的历史：index 为 epoch-day，seconds 为每天的使用秒数（补零），
+# hourly 为 24 个小时（本地时间）的使用秒数，rank 为全部历史中按总时长的名次（从 1 开始）
+AppHistory = namedtuple(
+    "AppHistory", ["app_name", "index", "seconds", "hourly", "total_seconds", "active_days", "rank", "app_count"]
+)
+
+
+def dense_series(days, values, first, last):
+    """days / values 为等长数组，返回 [first, last] 上补零的 float64 数组"""
+    size = max(last - first + 1, 0)
+    result = np.zeros(size, dtype=np.float64)
+    if len(days):
+        result[np.asarray(days) - first] = values
+    return result
+
+
+def hourly_distribution(intervals, start_ts, end_ts):
+    """
+    把 [(start_ts, end_ts), ...] 区间按本地时间的小时（0-23）累加，只计 [start_ts, end_ts) 内的部分。
+    返回长度 24 的 float64 数组（秒）。
+    """
+    hourly = np.zeros(24, dtype=np.float64)
+    for start, end in intervals:
+        start, end = max(start, start_ts), min(end, end_ts)
+        while start < end:
+            # 以区间开始时刻的 UTC 偏移换算本地小时（跨夏令时切换的区间误差不超过一小时）
+            local = start + time.localtime(start).tm_gmtoff
+            hour_end = min(end, start + 3600 - local % 3600)
+            hourly[int(local // 3600) % 24] += hour_end - start
+            start = hour_end
+    return hourly
@@ -0,0 +1,365 @@
+# 文件路径: database/buffer.py
+import threading
+import time
+from datetime import datetime
+
+# 默认每 30 秒刷一次盘（采集间隔 2 秒时，约为原来 1/15 的事务数）
+FLUSH_INTERVAL = 30
+# 缓冲区中待写条目数达到上限时立即刷盘
+MAX_PENDING = 2000
+# 同一应用两次心跳之间允许的空档（秒），超过则另起一个焦点区间（例如中间闲置过）
+EVENT_MERGE_GAP = 2.0
+
+
+class FocusEvent:
+    """
+    一段连续的前台应用区间，对应 events 表中的一行。
+    row_id 在第一次写库后由写线程填入，之后的刷盘只更新 end_ts。
+    """
+
+    __slots__ = ("app_name", "start_ts", "end_ts", "row_id")
+
+    def __init__(self, app_name, start_ts, end_ts):
+        self.app_name = app_name
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.row_id = None
+
+
+class WriteBuffer:
+    """
+    MonitorService 与数据库之间的写缓冲（write-behind）。
+
+    每次采集的增量先在内存中按键合并：
+        minutes: (date_str, minute)  -> [screen_time_seconds, mouse_clicks, keystrokes]
+                 （minute 为当天第几分钟，小时 / 天的合计在写库时由它汇总）
+        apps:   (date_str, app_name) -> duration_seconds
+        keys:   (date_str, key_name) -> count
+    前台应用的心跳合并成焦点区间（FocusEvent）：应用不变且没有空档时
+    只延长当前区间的 end_ts，应用切换时才产生新的一行。
+    到达刷盘间隔、条目上限、跨天或 flush() 被显式调用时，
+    通过 DatabaseManager.submit_deltas() 交给写线程，在一个事务里写入。
+    采集线程默认不等待写库完成。
+
+    open_journal() 之后每次 add() 还会追加到崩溃恢复日志（见 journal.py）：
+    刷盘时把批次中最大的日志序号交给写线程，与增量写在同一个事务里；
+    刷盘成功后截掉日志中已写入的部分，启动时用 replay_journal() 重放剩余的记录。
+
+    已提交但尚未写完的批次（inflight）在提交前仍计入 pending_*()，
+    保证读取「今天」的数据时不会出现短暂回退。
+    """
+
+    def __init__(self, manager, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING,
+                 event_merge_gap=EVENT_MERGE_GAP):
+        self.manager = manager
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.event_merge_gap = event_merge_gap
+
+        self._minutes = {}
+        self._apps = {}
+        self._keys = {}
+        self._events = []  # 自上次刷盘以来新建或延长过的 FocusEvent
+        self._inflight = {}  # {Future: ((minutes, apps, keys, events), 日志位置, 日志序号区间)}，已交给写线程的批次
+
+        # 当前（最后一个）焦点区间
+        self._open_event = None
+
+        self._lock = threading.RLock()
+        self._last_flush = time.monotonic()
+        self._current_date = None
+        # 跨天后置位，下一次 is_due() 立即触发刷盘
+        self._day_rolled = False
+
+        # 崩溃恢复日志（open_journal() 之后才启用）
+        self.journal = None
+        # 刷盘成功后是否立即截断日志；内存模式下要等快照写回磁盘后才能截断
+        self.truncate_journal_on_flush = True
+        self._journal_seq = 0   # 缓冲区中最后一条增量的日志序号
+        self._flushed_seq = 0   # 上一个批次交给写线程时的 _journal_seq：批次包含 (_flushed_seq, _journal_seq] 的记录
+        self._durable_mark = 0  # 最近一次刷盘成功时的日志位置
+
+    # ======================================================
+    # 写入（合并增量）
+    # ======================================================
+    def add(self, add_time=0, add_clicks=0, add_keys=0, app_name=None, app_delta=0,
+            key_counts=None, focus_app=None, focus_seconds=0, now=None, journal=True):
+        """
+        记录一次采集的增量。与 update_stats / update_app_usage / update_key_counts 的参数含义一致。
+        focus_app / focus_seconds: 截至 now 的 focus_seconds 秒内处于前台的应用（心跳）
+        journal=False: 不写崩溃恢复日志（重放日志时使用）
+        """
+        now = now or datetime.now()
+        date_str = now.date().isoformat()
+
+        # 跨天：前一天的数据在下一次 flush_if_due() 时立即刷盘
+        if self._current_date is not None and date_str != self._current_date:
+            self._day_rolled = True
+        self._current_date = date_str
+
+        with self._lock:
+            if journal and self.journal is not None:
+                self._journal_seq = self.journal.append({"add": {
+                    "ts": now.timestamp(), "add_time": add_time, "add_clicks": add_clicks,
+                    "add_keys": add_keys, "app_name": app_name, "app_delta": app_delta,
+                    "key_counts": key_counts or None, "focus_app": focus_app, "focus_seconds": focus_seconds,
+                }})
+
+            if add_time or add_clicks or add_keys:
+                bucket = self._minutes.setdefault((date_str, now.hour * 60 + now.minute), [0, 0, 0])
+                bucket[0] += add_time
+                bucket[1] += add_clicks
+                bucket[2] += add_keys
+
+            if app_name and app_delta:
+                key = (date_str, app_name)
+                self._apps[key] = self._apps.get(key, 0) + app_delta
+
+            if key_counts:
+                for key_name, count in key_counts.items():
+                    key = (date_str, key_name)
+                    self._keys[key] = self._keys.get(key, 0) + count
+
+            if focus_app and focus_seconds > 0:
+                self._heartbeat(focus_app, now.timestamp() - focus_seconds, now.timestamp())
+
+    def _heartbeat(self, app_name, start_ts, end_ts):
+        # 调用方需持有 self._lock
+        event = self._open_event
+        if (event is not None and event.app_name == app_name
+                and start_ts - event.end_ts <= self.event_merge_gap):
+            # 同一应用且连续：原地延长
+            event.end_ts = max(event.end_ts, end_ts)
+        else:
+            event = FocusEvent(app_name, start_ts, end_ts)
+            self._open_event = event
+        if event not in self._events:
+            self._events.append(event)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._minutes) + len(self._apps) + len(self._keys) + len(self._events)
+
+    def is_due(self):
+        """是否到达刷盘条件（间隔 / 条目上限 / 跨天）"""
+        if self._day_rolled or self.pending_count() >= self.max_pending:
+            return True
+        return time.monotonic() - self._last_flush >= self.flush_interval
+
+    def flush_if_due(self):
+        if self.is_due():
+            self.flush(wait=False)
+
+    def flush(self, wait=True):
+        """
+        把缓冲区中的全部增量交给写线程，在一个事务里写入数据库。
+        wait=True 时等待所有已提交的批次写入完成（失败时抛出异常）。
+        """
+        with self._lock:
+            # 区间的 end_ts 之后还会被延长，这里记下提交时的值
+            events = [(event, event.end_ts) for event in self._events]
+            batch = (self._minutes, self._apps, self._keys, events)
+            self._minutes, self._apps, self._keys, self._events = {}, {}, {}, []
+            self._last_flush = time.monotonic()
+            self._day_rolled = False
+            if any(batch):
+                # 日志中到此为止的记录都包含在这个批次里（或更早的批次中）
+                journal_seq = self._journal_seq if self.journal is not None else None
+                mark = self.journal.position if self.journal is not None else None
+                seqs = (self._flushed_seq, self._journal_seq)
+                self._flushed_seq = self._journal_seq
+                # 持锁提交，保证 future 在回调触发前已登记到 inflight
+                future = self.manager.submit_deltas(*batch, journal_seq=journal_seq)
+                self._inflight[future] = (batch, mark, seqs)
+                future.add_done_callback(self._on_flushed)
+            pending_futures = list(self._inflight)
+
+        if wait:
+            for future in pending_futures:
+                future.result()
+
+    def _on_flushed(self, future):
+        with self._lock:
+            batch, mark, seqs = self._inflight.pop(future)
+            if future.exception() is not None:
+                # 写库失败：把增量合并回缓冲区，等下次再试
+                self._merge_back(*batch)
+                self._journal_batch(batch, seqs)
+                print(f"Failed to flush activity buffer: {future.exception()}")
+            elif mark is not None:
+                self._durable_mark = max(self._durable_mark, mark)
+                if self.truncate_journal_on_flush:
+                    self.journal.discard_until(mark)
+
+    def _journal_batch(self, batch, seqs):
+        """
+        把写库失败、合并回缓冲区的批次重新追加到日志（调用方需持有 self._lock）。
+        其后已经提交的批次刷盘成功时会截掉它原来的记录，这里换上更大的序号；
+        replaces 标明被取代的原记录的序号区间 (lo, hi]，重放时跳过它们，不会重复计入。
+        """
+        if self.journal is None:
+            return
+        minutes, apps, keys, events = batch
+        self._journal_seq = self.journal.append({"batch": {
+            "minutes": [[d, m, *v] for (d, m), v in minutes.items()],
+            "apps": [[d, name, sec] for (d, name), sec in apps.items()],
+            "keys": [[d, name, count] for (d, name), count in keys.items()],
+            "events": [[e.app_name, e.start_ts, e.end_ts, e.row_id] for e, _ in events],
+        }, "replaces": list(seqs)})
+
+    def _merge_back(self, minutes, apps, keys, events):
+        for key, (t, c, k) in minutes.items():
+            bucket = self._minutes.setdefault(key, [0, 0, 0])
+            bucket[0] += t
+            bucket[1] += c
+            bucket[2] += k
+        for key, sec in apps.items():
+            self._apps[key] = self._apps.get(key, 0) + sec
+        for key, count in keys.items():
+            self._keys[key] = self._keys.get(key, 0) + count
+        for event, _ in events:
+            if event not in self._events:
+                self._events.append(event)
+
+    # ======================================================
+    # 崩溃恢复日志
+    # ======================================================
+    def open_journal(self, journal, truncate_on_flush=True):
+        """启用崩溃恢复日志（DeltaJournal）；应在开始采集之前调用"""
+        with self._lock:
+            self.journal = journal
+            self.truncate_journal_on_flush = truncate_on_flush
+            self._journal_seq = journal.last_seq
+            self._flushed_seq = journal.last_seq
+            self._durable_mark = journal.position
+
+    def replay_journal(self, applied_seq):
+        """
+        把日志中序号大于 applied_seq（数据库中已写入的最大序号）的记录重放进缓冲区，
+        返回重放的记录数。重放的增量不会再次写入日志。
+        """
+        if self.journal is None:
+            return 0
+        self.journal.advance(applied_seq)
+        records = [record for record in self.journal.records() if record["seq"] > applied_seq]
+        # 写库失败后重新追加的批次取代了它原来的记录
+        replaced = [record["replaces"] for record in records if "replaces" in record]
+        replayed = 0
+        with self._lock:
+            # 重放的记录都进入下一个批次
+            self._flushed_seq = min(applied_seq, self._flushed_seq)
+            for record in records:
+                if any(lo < record["seq"] <= hi for lo, hi in replaced):
+                    continue
+                if "add" in record:
+                    args = dict(record["add"])
+                    now = datetime.fromtimestamp(args.pop("ts"))
+                    self.add(**args, now=now, journal=False)
+                elif "batch" in record:
+                    self._merge_back(*self._batch_from_record(record["batch"]))
+                self._journal_seq = record["seq"]
+                replayed += 1
+        return replayed
+
+    @staticmethod
+    def _batch_from_record(record):
+        events = []
+        for app_name, start_ts, end_ts, row_id in record["events"]:
+            event = FocusEvent(app_name, start_ts, end_ts)
+            event.row_id = row_id
+            events.append((event, end_ts))
+        return (
+            {(d, m): [t, c, k] for d, m, t, c, k in record["minutes"]},
+            {(d, name): sec for d, name, sec in record["apps"]},
+            {(d, name): count for d, name, count in record["keys"]},
+            events,
+        )
+
+    def journal_checkpoint(self):
+        """最近一次刷盘成功时的日志位置（内存模式下快照写回磁盘后截断到这里）"""
+        with self._lock:
+            return self._durable_mark
+
+    def close_journal(self):
+        with self._lock:
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+
+    # ======================================================
+    # 读取未刷盘的增量（供 DatabaseManager 的查询合并）
+    # ======================================================
+    def _batches(self):
+        # 调用方需持有 self._lock
+        current = (self._minutes, self._apps, self._keys, [(e, e.end_ts) for e in self._events])
+        return [current, *(batch for batch, *_ in self._inflight.values())]
+
+    def pending_minutes(self, date_str):
+        """{minute: (screen_time_seconds, mouse_clicks, keystrokes)}"""
+        result = {}
+        with self._lock:
+            for minutes, *_ in self._batches():
+                for (d, minute), (t, c, k) in minutes.items():
+                    if d == date_str:
+                        old = result.get(minute, (0, 0, 0))
+                        result[minute] = (old[0] + t, old[1] + c, old[2] + k)
+        return result
+
+    def pending_hourly(self, date_str):
+        """{hour: (screen_time_seconds, mouse_clicks, keystrokes)}"""
+        result = {}
+        for minute, (t, c, k) in self.pending_minutes(date_str).items():
+            old = result.get(minute // 60, (0, 0, 0))
+            result[minute // 60] = (old[0] + t, old[1] + c, old[2] + k)
+        return result
+
+    def pending_daily(self, date_str):
+        """(screen_time_seconds, mouse_clicks, keystrokes)"""
+        total = [0, 0, 0]
+        for t, c, k in self.pending_hourly(date_str).values():
+            total[0] += t
+            total[1] += c
+            total[2] += k
+        return tuple(total)
+
+    def pending_dates(self):
+        """缓冲区中出现过的日期集合"""
+        with self._lock:
+            dates = set()
+            for minutes, apps, keys, _ in self._batches():
+                dates.update(d for d, _ in minutes)
+                dates.update(d for d, _ in apps)
+                dates.update(d for d, _ in keys)
+            return dates
+
+    def pending_apps(self, date_str):
+        """{app_name: duration_seconds}"""
+        result = {}
+        with self._lock:
+            for _, apps, *_ in self._batches():
+                for (d, app_name), sec in apps.items():
+                    if d == date_str:
+                        result[app_name] = result.get(app_name, 0) + sec
+        return result
+
+    def pending_keys(self):
+        """{key_name: count}（所有日期合计）"""
+        result = {}
+        with self._lock:
+            for _, _, keys, _ in self._batches():
+                for (_, key_name), count in keys.items():
+                    result[key_name] = result.get(key_name, 0) + count
+        return result
+
+    def pending_events(self):
+        """
+        尚未写完的焦点区间 [(row_id, app_name, start_ts, end_ts), ...]。
+        row_id 为 None 表示还没有写入过数据库；end_ts 取内存中的最新值。
+        """
+        with self._lock:
+            seen = []
+            for *_, events in self._batches():
+                for event, _ in events:
+                    if event not in seen:
+                        seen.append(event)
+            return [(e.row_id, e.app_name, e.start_ts, e.end_ts) for e in seen]
@@ -0,0 +1,113 @@
+# 文件路径: database/cache.py
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from .timekeys import day_key
+
+# 缓存条目上限（LRU 淘汰）
+MAX_ENTRIES = 256
+# 涉及「今天」的条目最多存活的秒数；过去日期的条目只随表代号失效
+TODAY_TTL = 5.0
+
+
+class QueryCache:
+    """
+    DatabaseManager 的读缓存（read-through）。
+
+    每张表有两个代号（generation），写事务提交后 bump() 对应表的代号：
+        (table, "all")   任何写入都会递增
+        (table, "past")  只有写到今天之前的日期（或日期未知）时才递增
+    缓存条目记录查询时所依赖代号的快照，任一代号变化即视为失效。
+    只覆盖过去日期的条目（past_only=True）只依赖 "past" 代号，
+    因此采集线程每次写入今天的数据不会让历史查询失效。
+
+    条目键为 (方法名, 参数...)；ttl=None 的条目只随代号失效，
+    否则到期后也会失效（用于「今天」的查询）。
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, today_ttl=TODAY_TTL):
+        self.max_entries = max_entries
+        self.today_ttl = today_ttl
+
+        # key -> (value, scopes, generations, expires_at)
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+
+    def _snapshot(self, scopes):
+        return tuple(self._generations.get(scope, 0) for scope in scopes)
+
+    def get_or_load(self, key, tables, loader, ttl=None, past_only=False):
+        """
+        命中则直接返回缓存值，否则调用 loader() 查询并写入缓存。
+        tables: 查询依赖的表名元组
+        past_only: 查询只覆盖今天之前的日期
+        """
+        kind = "past" if past_only else "all"
+        scopes = tuple((t, kind) for t in tables)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, _, generations, expires_at = entry
+                if generations == self._snapshot(scopes) and (expires_at is None or now < expires_at):
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+                self._stale += 1
+            self._misses += 1
+            # 在查询之前取代号快照：查询期间若有写入提交，条目会被视为过期
+            generations = self._snapshot(scopes)
+
+        value = loader()
+
+        with self._lock:
+            expires_at = None if ttl is None else time.monotonic() + ttl
+            self._entries[key] = (value, scopes, generations, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def bump(self, *tables, days=None):
+        """
+        写事务提交后调用：使依赖这些表的条目失效。
+        days: 本次写入涉及的 epoch-day；None 表示未知（所有条目都失效）
+        """
+        touches_past = days is None or min(days, default=0) < day_key(date.today())
+        with self._lock:
+            for table in tables:
+                scopes = [(table, "all")]
+                if touches_past:
+                    scopes.append((table, "past"))
+                for scope in scopes:
+                    self._generations[scope] = self._generations.get(scope, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for table in self._generations:
+                self._generations[table] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "stale": self._stale,
+                "evictions": self._evictions,
+                "generations": {f"{t}:{kind}": g for (t, kind), g in self._generations.items()},
+            }
@@ -0,0 +1,240 @@
+# 文件路径: database/connection.py
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import quote
+
+# ======================================================
+# 连接参数（按桌面端小数据库调优）
+# ======================================================
+# 页缓存大小（KiB），对应 PRAGMA cache_size = -N
+CACHE_SIZE_KIB = 8 * 1024
+# 内存映射读取上限（字节）
+MMAP_SIZE = 64 * 1024 * 1024
+# 每个连接缓存的预编译语句数量
+CACHED_STATEMENTS = 256
+# 遇到锁时的最长等待（秒）
+BUSY_TIMEOUT = 5.0
+# UI 查询使用的只读连接池大小
+READ_POOL_SIZE = 4
+
+
+class ConnectionManager:
+    """
+    每个线程持有一个长连接，避免每次查询都 connect / 解析 / 关闭。
+
+    连接打开时统一设置：
+        - journal_mode = WAL       读写互不阻塞
+        - synchronous  = NORMAL    WAL 下每次提交不再 fsync
+        - cache_size / mmap_size   减少重复读盘
+    预编译语句由 sqlite3 自带的 cached_statements 缓存，
+    因为连接不再频繁重建，缓存可以真正被命中。
+
+    get()    返回当前线程的读写连接（写线程使用）
+    reader() 从只读连接池借出一个连接（UI 查询使用），WAL 下不会阻塞写线程
+
+    in_memory=True 时所有连接指向同一个共享缓存的内存数据库，
+    第一次打开时用 backup API 从 db_name 载入；写回磁盘由 snapshot.Snapshotter 负责。
+    """
+
+    def __init__(self, db_name, cache_size_kib=CACHE_SIZE_KIB, mmap_size=MMAP_SIZE,
+                 cached_statements=CACHED_STATEMENTS, timeout=BUSY_TIMEOUT,
+                 read_pool_size=READ_POOL_SIZE, in_memory=False):
+        self.db_name = db_name
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self.read_pool_size = read_pool_size
+
+        self.in_memory = in_memory
+        # 共享缓存的内存数据库：只要还有一个连接开着就一直存在，由 _keeper 保持
+        self.memory_uri = f"file:dailygrid-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        self._keeper = None
+        self._keeper_lock = threading.Lock()
+
+        # 新打开的连接都会设置的 trace callback（profiler.QueryProfiler 使用）
+        self.trace_callback = None
+
+        self._local = threading.local()
+        # {thread: conn}，用于清理已退出线程的连接以及 close_all()
+        self._connections = {}
+        self._lock = threading.Lock()
+
+        # 只读连接池
+        self._read_pool = queue.LifoQueue()
+        self._read_created = 0
+        self._read_checkouts = 0
+        self._read_wait_total = 0.0
+        self._read_wait_max = 0.0
+
+    def get(self):
+        """返回当前线程的连接（不存在则创建）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                # close_all(keep=...) 重置了 _local：被保留的线程在这里取回自己的连接
+                conn = self._connections.get(threading.current_thread())
+            if conn is None:
+                conn = self._open()
+                with self._lock:
+                    self._prune_dead_threads()
+                    self._connections[threading.current_thread()] = conn
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """
+        借出一个只读连接：
+            with manager.reader() as conn:
+                conn.execute("SELECT ...")
+        """
+        started = time.perf_counter()
+        conn = self._checkout_reader()
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._read_checkouts += 1
+            self._read_wait_total += waited
+            self._read_wait_max = max(self._read_wait_max, waited)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._read_pool.put(conn)
+
+    def _checkout_reader(self):
+        try:
+            return self._read_pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._read_created < self.read_pool_size
+            if can_create:
+                self._read_created += 1
+        if can_create:
+            try:
+                return self._open_reader()
+            except Exception:
+                with self._lock:
+                    self._read_created -= 1
+                raise
+        # 池已满：等待其他线程归还
+        return self._read_pool.get()
+
+    def _open(self):
+        # check_same_thread=False 仅用于 close_all() 跨线程关闭，
+        # 正常使用时每个连接只在创建它的线程里访问
+        if self.in_memory:
+            self._ensure_memory_db()
+        conn = sqlite3.connect(
+            self.memory_uri if self.in_memory else self.db_name,
+            uri=self.in_memory,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        self._apply_pragmas(conn)
+        return conn
+
+    def _open_reader(self):
+        if self.in_memory:
+            self._ensure_memory_db()
+            uri = self.memory_uri
+        else:
+            uri = f"file:{quote(os.path.abspath(self.db_name))}?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        self._apply_pragmas(conn, read_only=True)
+        return conn
+
+    def _ensure_memory_db(self):
+        """创建内存数据库并从磁盘文件载入（只执行一次）"""
+        with self._keeper_lock:
+            if self._keeper is not None:
+                return
+            keeper = sqlite3.connect(self.memory_uri, uri=True, check_same_thread=False)
+            if os.path.exists(self.db_name):
+                disk = sqlite3.connect(self.db_name, timeout=self.timeout)
+                try:
+                    disk.backup(keeper)
+                finally:
+                    disk.close()
+            self._keeper = keeper
+
+    def _apply_pragmas(self, conn, read_only=False):
+        if read_only:
+            # journal_mode 由读写连接设置（持久化在文件里）
+            conn.execute("PRAGMA query_only = ON")
+            if self.in_memory:
+                # 共享缓存下读事务会对表加锁并与写线程冲突（SQLITE_LOCKED 不受 busy_timeout 影响）；
+                # 读未提交的数据对统计查询无害
+                conn.execute("PRAGMA read_uncommitted = ON")
+        else:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        if self.trace_callback is not None:
+            conn.set_trace_callback(self.trace_callback)
+
+    def _prune_dead_threads(self):
+        for thread in [t for t in self._connections if not t.is_alive()]:
+            self._connections.pop(thread).close()
+
+    def close_current(self):
+        """关闭当前线程的连接"""
+        self._local.conn = None
+        # 以 _connections 为准：close_all(keep=...) 之后 _local 已经重置
+        with self._lock:
+            conn = self._connections.pop(threading.current_thread(), None)
+        if conn is not None:
+            conn.close()
+
+    def close_all(self, keep=None):
+        """
+        关闭所有线程的连接以及空闲的只读连接（程序退出时调用）。
+        keep: 仍在使用自己连接的线程（例如没有按时停止的写线程），它的连接留给它退出时自己关闭
+        """
+        with self._lock:
+            kept = self._connections.pop(keep, None) if keep is not None else None
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+            if kept is not None:
+                self._connections[keep] = kept
+            while True:
+                try:
+                    self._read_pool.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._read_created -= 1
+        self._local = threading.local()
+        # 内存模式：最后关闭 keeper，内存数据库随之释放（调用方应先写快照）
+        with self._keeper_lock:
+            if self._keeper is not None:
+                self._keeper.close()
+                self._keeper = None
+
+    def metrics(self):
+        with self._lock:
+            n = self._read_checkouts or 1
+            return {
+                "read_pool_size": self.read_pool_size,
+                "read_connections": self._read_created,
+                "read_idle": self._read_pool.qsize(),
+                "read_checkouts": self._read_checkouts,
+                "read_wait_avg_ms": self._read_wait_total / n * 1000,
+                "read_wait_max_ms": self._read_wait_max * 1000,
+            }
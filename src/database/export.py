@@ -0,0 +1,207 @@
+# 文件路径: database/export.py
+"""
+流式导出。
+
+每张表分块（CHUNK_ROWS 行）读取、逐块写出，内存占用与历史长短无关；
+所有表在同一个读事务（同一个 WAL 快照）中导出，结果彼此一致。
+
+    csv    每张表一个文件：<name>_<table>.csv
+    jsonl  单个文件，每行一个 JSON 对象，"table" 字段标明来源表
+文件名以 .gz / .xz 结尾时分别用 gzip / lzma 压缩。
+"""
+import csv
+import gzip
+import itertools
+import json
+import lzma
+import os
+
+from . import keyvectors
+from .timekeys import SQL_DAY_TO_DATE, date_str_from_day
+
+# 每次从游标取的行数
+CHUNK_ROWS = 5000
+
+FORMATS = ("csv", "jsonl")
+COMPRESSIONS = {".gz": gzip.open, ".xz": lzma.open}
+
+_DATE = SQL_DAY_TO_DATE.format(col="day")
+
+
+def _key_days(conn):
+    """按天展开 keyboard_daily 的计数向量：每天一组 [(date, key_name, count), ...]，按键名排序"""
+    names = dict(conn.execute("SELECT id, name FROM keys"))
+    for day, blob in conn.execute("SELECT day, counts FROM keyboard_daily ORDER BY day"):
+        date_str = date_str_from_day(day)
+        counts = keyvectors.nonzero_items(keyvectors.unpack(blob))
+        yield [(date_str, name, count) for name, count in sorted((names[key_id], count) for key_id, count in counts)]
+
+
+# 导出名 -> (表名, 列名, SELECT 语句或按源表的行分组生成的函数)；整数时间键转换回日期 / 小时 / 本地时间
+EXPORT_TABLES = {
+    "daily": (
+        "daily_stats",
+        ("date", "screen_time_seconds", "mouse_clicks", "keystrokes"),
+        f"SELECT {_DATE}, screen_time_seconds, mouse_clicks, keystrokes FROM daily_stats ORDER BY day",
+    ),
+    "hourly": (
+        "hourly_stats",
+        ("date", "hour", "screen_time_seconds", "mouse_clicks", "keystrokes"),
+        f"""
+        SELECT {SQL_DAY_TO_DATE.format(col="(hour / 24)")}, hour % 24, screen_time_seconds, mouse_clicks, keystrokes
+        FROM hourly_stats ORDER BY hour
+        """,
+    ),
+    "apps": (
+        "app_stats",
+        ("date", "app_name", "duration_seconds"),
+        f"""
+        SELECT {_DATE}, a.name, s.duration_seconds
+        FROM app_stats s JOIN apps a ON a.id = s.app_id
+        ORDER BY s.day, a.name
+        """,
+    ),
+    "keys": (
+        "keyboard_daily",
+        ("date", "key_name", "count"),
+        _key_days,
+    ),
+    "keys_monthly": (
+        "keyboard_monthly",
+        ("month", "key_name", "count"),
+        """
+        SELECT printf('%04d-%02d', s.month / 12, s.month % 12 + 1), k.name, s.count
+        FROM keyboard_monthly s JOIN keys k ON k.id = s.key_id
+        ORDER BY s.month, k.name
+        """,
+    ),
+    "events": (
+        "events",
+        ("app_name", "start", "end"),
+        """
+        SELECT app_name, datetime(start_ts, 'unixepoch', 'localtime'), datetime(end_ts, 'unixepoch', 'localtime')
+        FROM events ORDER BY start_ts
+        """,
+    ),
+}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def split_path(path):
+    """'x.jsonl.gz' -> ('x', 'jsonl', '.gz')；无法识别的格式按 csv 处理"""
+    stem, compression = path, ""
+    for suffix in COMPRESSIONS:
+        if path.lower().endswith(suffix):
+            stem, compression = path[: -len(suffix)], suffix
+    base, ext = os.path.splitext(stem)
+    fmt = ext[1:].lower()
+    if fmt not in FORMATS:
+        return stem, "csv", compression
+    return base, fmt, compression
+
+
+def _open_text(path, compression):
+    opener = COMPRESSIONS.get(compression, open)
+    return opener(path, "wt", encoding="utf-8", newline="")
+
+
+def _row_count(conn, name):
+    return conn.execute(f"SELECT COUNT(*) FROM {EXPORT_TABLES[name][0]}").fetchone()[0]
+
+
+def _sql_chunks(rows_iter, chunk_rows):
+    """SELECT 的结果：每行对应源表的一行，返回 (块, 源表行数)"""
+    while True:
+        chunk = list(itertools.islice(rows_iter, chunk_rows))
+        if not chunk:
+            return
+        yield chunk, len(chunk)
+
+
+def _grouped_chunks(groups, chunk_rows):
+    """按源表的行分组的结果（按键向量每天展开成多行）：凑够 chunk_rows 行为一块，返回 (块, 源表行数)"""
+    chunk, units = [], 0
+    for group in groups:
+        chunk.extend(group)
+        units += 1
+        if len(chunk) >= chunk_rows:
+            yield chunk, units
+            chunk, units = [], 0
+    if units:
+        yield chunk, units
+
+
+def export_tables(conn, path, tables=None, progress=None, cancel_event=None, chunk_rows=CHUNK_ROWS):
+    """
+    把 tables（默认全部，见 EXPORT_TABLES）导出到 path，返回 {"rows": {name: 行数}, "files": [...]}。
+    progress(done_rows, total_rows, name): 每写完一块调用一次；行数按源表计（keys 按 keyboard_daily 的天数），
+    总数只需对每张表 COUNT(*)，不必先展开按键向量
+    cancel_event: threading.Event，置位后在下一块之前中止，删除已写的文件并抛出 ExportCancelled
+    """
+    names = list(tables or EXPORT_TABLES)
+    unknown = [name for name in names if name not in EXPORT_TABLES]
+    if unknown:
+        raise ValueError(f"Unknown export tables: {', '.join(unknown)}")
+
+    base, fmt, compression = split_path(path)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    names = [name for name in names if EXPORT_TABLES[name][0] in existing]
+
+    files = []
+    rows = dict.fromkeys(names, 0)
+    # 同一个读事务：所有表来自同一个快照
+    conn.execute("BEGIN")
+    try:
+        total = sum(_row_count(conn, name) for name in names)
+        done = 0
+
+        def chunks(name):
+            nonlocal done
+            source = EXPORT_TABLES[name][2]
+            if isinstance(source, str):
+                parts = _sql_chunks(conn.execute(source), chunk_rows)
+            else:
+                parts = _grouped_chunks(source(conn), chunk_rows)
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            for chunk, units in parts:
+                yield chunk
+                rows[name] += len(chunk)
+                done += units
+                if progress is not None:
+                    progress(done, total, name)
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ExportCancelled()
+
+        if fmt == "jsonl":
+            files.append(path)
+            with _open_text(path, compression) as out:
+                for name in names:
+                    columns = EXPORT_TABLES[name][1]
+                    for chunk in chunks(name):
+                        out.writelines(
+                            json.dumps({"table": name, **dict(zip(columns, row))}, ensure_ascii=False) + "\n"
+                            for row in chunk
+                        )
+        else:
+            for name in names:
+                table_path = f"{base}_{name}.csv{compression}"
+                files.append(table_path)
+                with _open_text(table_path, compression) as out:
+                    writer = csv.writer(out)
+                    writer.writerow(EXPORT_TABLES[name][1])
+                    for chunk in chunks(name):
+                        writer.writerows(chunk)
+    except BaseException:
+        # 取消或出错：不留下不完整的文件
+        for file in files:
+            if os.path.exists(file):
+                os.remove(file)
+        raise
+    finally:
+        conn.rollback()
+
+    return {"rows": rows, "files": files}
@@ -0,0 +1,433 @@
+# 文件路径: database/importer.py
+"""
+从其他记录工具的导出文件批量导入历史。
+
+输入按流读取，内存占用与文件大小无关：
+    .csv                     表头为列名（csv.DictReader）
+    .jsonl / .ndjson         每行一个 JSON 对象
+    .json                    顶层为对象数组（逐个解码，不整体载入）
+文件名以 .gz / .xz 结尾时先解压。
+
+每条记录是一段使用区间：开始时间 + 结束时间或时长，可选应用名 / 点击数 / 按键数。
+字段名由 ImportMapping 指定（JSON 中可以用 "data.app" 这样的路径），常见工具有预设（PRESETS）。
+区间按本地时间的小时切分后累加进 hourly_stats（daily_stats 由触发器同步），按天汇总进月 / 年汇总表，
+应用时长按天累加进 app_stats。记录先在内存中按小时 / (天, 应用) 合并，
+每 batch_records 条用 executemany 批量 upsert 一次，每批一个短事务，批次之间采集线程的刷盘可以插队执行。
+
+每批与「已写入到第几条记录」（settings 中的 import_progress:<source_id>）在同一个事务里提交；
+导入中断后再次导入同一个文件时，从这个位置继续，已写入的记录不会重复计入。
+导入完成的文件（按内容的 SHA-1）记录在 merged_sources 表中，重复导入同一个文件会被拒绝。
+文件中途才发现的格式错误（例如截断的 JSON 数组）不会撤销之前已经提交的批次，大文件可以先用 dry run 校验。
+多个来源的区间互相重叠时（例如同时导入窗口和 AFK 记录）时长会重复计入，这里不做去重。
+"""
+import csv
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import os
+import re
+import time
+from collections import namedtuple
+from functools import lru_cache
+from datetime import datetime
+
+from . import rollups
+from .timekeys import date_str_from_day
+
+# 每批合并后写库的记录数
+BATCH_RECORDS = 100_000
+# 单条记录允许的最长时长（秒），更长的视为无效记录
+MAX_DURATION = 24 * 3600
+# 报告中保留的错误条数
+MAX_ERRORS = 20
+# 读取 JSON 数组时每次读入的字符数
+_READ_SIZE = 1 << 16
+
+FORMATS = ("csv", "jsonl", "json")
+_EXTENSIONS = {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl", "json": "json"}
+_COMPRESSIONS = {".gz": gzip.open, ".xz": lzma.open}
+
+# start 必填；end 与 duration 至少有一个；其余可选（None 表示没有该字段）
+ImportMapping = namedtuple(
+    "ImportMapping", ["start", "end", "duration", "app", "clicks", "keys"], defaults=(None,) * 5
+)
+
+PRESETS = {
+    # GET /api/0/buckets/<窗口 bucket>/events 的结果（JSON 数组）
+    "activitywatch": ImportMapping(start="timestamp", duration="duration", app="data.app"),
+    # RescueTime 的 Activity 导出（每小时一行）
+    "rescuetime": ImportMapping(start="Date", duration="Time Spent (seconds)", app="Activity"),
+    # ManicTime 的 Applications 时间线 CSV
+    "manictime": ImportMapping(start="Start", end="End", app="Name"),
+    # 通用格式：start / end / duration / app / clicks / keys
+    "generic": ImportMapping(start="start", end="end", duration="duration", app="app", clicks="clicks", keys="keys"),
+}
+
+SOURCE_PREFIX = "import:"
+PROGRESS_PREFIX = "import_progress:"
+
+_TIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M",
+    "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %H:%M", "%m/%d/%Y %I:%M %p",
+)
+_NUMBER = re.compile(r"-?\d+(\.\d+)?")
+_JSON_SKIP = re.compile(r"[\s,]*")
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+# ======================================================
+# 读取记录（流式）
+# ======================================================
+def detect_format(path):
+    """'x.json.gz' -> ('json', '.gz')"""
+    stem, compression = path, ""
+    for suffix in _COMPRESSIONS:
+        if path.lower().endswith(suffix):
+            stem, compression = path[: -len(suffix)], suffix
+    fmt = _EXTENSIONS.get(os.path.splitext(stem)[1][1:].lower())
+    if fmt is None:
+        raise ImportFormatError(f"Unsupported file type: {path} (expected {', '.join(_EXTENSIONS)})")
+    return fmt, compression
+
+
+def read_records(raw, fmt, compression=""):
+    """
+    raw: 以二进制打开的文件。逐条产生 (记录序号, dict)；记录序号为 CSV / JSONL 的行号或 JSON 数组的下标。
+    """
+    stream = _COMPRESSIONS[compression](raw, "rb") if compression else raw
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        # 比 csv.DictReader 快：不检查多余 / 缺少的列，缺少的列按没有该字段处理
+        reader = csv.reader(text)
+        header = next(reader, None) or []
+        for row in reader:
+            if row:
+                yield reader.line_num, dict(zip(header, row))
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(text, 1):
+            if line.strip():
+                yield line_no, _json_object(line, line_no)
+    else:
+        yield from enumerate(_json_array(text))
+
+
+def _json_object(line, line_no):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise ImportFormatError(f"Invalid JSON on line {line_no}: {e}") from None
+
+
+def _json_array(text):
+    """逐个解码顶层数组中的元素，缓冲区只保留尚未解码的部分"""
+    decoder = json.JSONDecoder()
+    buffer = text.read(_READ_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise ImportFormatError("Expected a JSON array of records.")
+    pos = 1
+    while True:
+        pos = _JSON_SKIP.match(buffer, pos).end()
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            if pos == len(buffer):
+                raise ValueError("need more data")
+            item, end = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            more = text.read(_READ_SIZE)
+            if not more:
+                raise ImportFormatError("Truncated or invalid JSON array.") from None
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        yield item
+        pos = end
+        if pos > _READ_SIZE:
+            buffer, pos = buffer[pos:], 0
+
+
+# ======================================================
+# 解析字段
+# ======================================================
+def _getter(path):
+    """path -> 从记录中取该字段的函数；不含 '.' 的字段名直接用 dict.get"""
+    if path is None:
+        return lambda record: None
+    if "." not in path:
+        return lambda record: record.get(path)
+    parts = path.split(".")
+
+    def get(record):
+        # 平铺的列名（例如 CSV 表头本身就叫 "data.app"）优先
+        if path in record:
+            return record[path]
+        value = record
+        for part in parts:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
+    return get
+
+
+@lru_cache(maxsize=16)
+def _getters(mapping):
+    return tuple(_getter(path) for path in mapping)
+
+
+def parse_time(value):
+    """ISO-8601 / 常见日期格式 / Unix 时间戳（秒或毫秒） -> Unix 时间戳；无时区的时间按本地时间处理"""
+    if value is None or value == "":
+        raise ValueError("missing timestamp")
+    if isinstance(value, str) and "-" in value:
+        # 绝大多数导出是 ISO-8601，先走最快的路径
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    if isinstance(value, (int, float)) or _NUMBER.fullmatch(str(value).strip()):
+        ts = float(value)
+        return ts / 1000 if ts > 1e11 else ts
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        pass
+    for fmt in _TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised timestamp {text!r}")
+
+
+def parse_duration(value):
+    """秒数或 [H:]MM:SS -> 秒"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    if ":" in text:
+        seconds = 0.0
+        for part in text.split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    return float(text)
+
+
+def _count(value):
+    if value is None or value == "":
+        return 0
+    count = int(float(value))
+    if count < 0:
+        raise ValueError(f"negative count {value!r}")
+    return count
+
+
+def parse_record(mapping, record):
+    """返回 (start_ts, end_ts, app_name, clicks, keys)；记录无效时抛出 ValueError"""
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    get_start, get_end, get_duration, get_app, get_clicks, get_keys = _getters(mapping)
+    start = parse_time(get_start(record))
+    end_value = get_end(record)
+    if end_value is not None and end_value != "":
+        end = parse_time(end_value)
+    else:
+        duration = get_duration(record)
+        if duration in (None, ""):
+            raise ValueError("missing end time and duration")
+        end = start + parse_duration(duration)
+    if end < start:
+        raise ValueError("ends before it starts")
+    if end - start > MAX_DURATION:
+        raise ValueError(f"lasts more than {MAX_DURATION // 3600} hours")
+    app = get_app(record)
+    app = str(app).strip() if app is not None and app != "" else None
+    return start, end, app, _count(get_clicks(record)), _count(get_keys(record))
+
+
+@lru_cache(maxsize=4096)
+def _utc_offset(utc_hour):
+    """UTC 整点所在小时内本地时间相对 UTC 的偏移（秒）；夏令时切换都发生在整点上"""
+    return time.localtime(utc_hour * 3600).tm_gmtoff
+
+
+def split_hours(start, end):
+    """[start, end) 按本地时间的整点切开：逐段产生 (epoch-hour, 秒数)"""
+    while start < end:
+        local = start + _utc_offset(int(start // 3600))
+        stop = min(end, start + 3600 - local % 3600)
+        yield int(local // 3600), stop - start
+        start = stop
+
+
+# ======================================================
+# 导入
+# ======================================================
+def file_digest(path):
+    """文件内容的 SHA-1（流式）"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def import_file(path, mapping, write=None, batch_records=BATCH_RECORDS, progress=None, skip_records=0):
+    """
+    解析 path 中的记录，每 batch_records 条有效记录把合并后的增量交给
+    write(hourly, apps, records_done) 写库（返回 (小时行数, 应用行数)）；write 为 None 时只解析和校验。
+    skip_records: 前面已经写入过的记录数（继续中断的导入），这些记录只计入报告、不再交给 write。
+    progress(done_bytes, total_bytes, records)。
+    返回报告 dict：records / imported / invalid / errors / first_date / last_date / screen_time_seconds 等。
+    """
+    fmt, compression = detect_format(path)
+    total_bytes = os.path.getsize(path)
+    report = {
+        "records": 0, "imported": 0, "invalid": 0, "errors": [],
+        "first_date": None, "last_date": None, "last_day": None, "screen_time_seconds": 0.0, "apps": 0,
+        "hourly_rows": 0, "app_rows": 0, "resumed_records": skip_records,
+    }
+    hourly = {}  # epoch-hour -> [sec, clicks, keys]
+    apps = {}  # (epoch-day, app_name) -> sec
+    seen_apps = set()
+    first_day = last_day = None
+
+    def flush():
+        if write is not None and (hourly or apps):
+            rows = write(hourly, apps, report["records"])
+            report["hourly_rows"] += rows[0]
+            report["app_rows"] += rows[1]
+        hourly.clear()
+        apps.clear()
+
+    with open(path, "rb") as raw:
+        pending = 0
+        for number, record in read_records(raw, fmt, compression):
+            report["records"] += 1
+            try:
+                start, end, app, clicks, keys = parse_record(mapping, record)
+            except (ValueError, TypeError) as e:
+                report["invalid"] += 1
+                if len(report["errors"]) < MAX_ERRORS:
+                    report["errors"].append((number, str(e)))
+                continue
+
+            report["imported"] += 1
+            report["screen_time_seconds"] += end - start
+            local = start + _utc_offset(int(start // 3600))
+            first_hour = int(local // 3600)
+            if app:
+                seen_apps.add(app)
+            day = first_hour // 24
+            first_day = day if first_day is None else min(first_day, day)
+            last_day = day if last_day is None else max(last_day, day)
+            if report["records"] <= skip_records:
+                continue
+
+            if end - start <= 3600 - local % 3600:
+                # 常见情况：整段落在同一个小时内，不必切分
+                spans = ((first_hour, end - start),) if end > start else ()
+            else:
+                spans = split_hours(start, end)
+            for hour, seconds in spans:
+                bucket = hourly.get(hour)
+                if bucket is None:
+                    bucket = hourly[hour] = [0.0, 0, 0]
+                bucket[0] += seconds
+                if app:
+                    key = (hour // 24, app)
+                    apps[key] = apps.get(key, 0.0) + seconds
+            # 时长为 0 的记录：点击 / 按键仍计入开始时刻所在的小时
+            if clicks or keys:
+                bucket = hourly.setdefault(first_hour, [0.0, 0, 0])
+                bucket[1] += clicks
+                bucket[2] += keys
+
+            pending += 1
+            if pending >= batch_records:
+                flush()
+                pending = 0
+                if progress is not None:
+                    progress(raw.tell(), total_bytes, report["records"])
+        flush()
+        if progress is not None:
+            progress(total_bytes, total_bytes, report["records"])
+
+    report["apps"] = len(seen_apps)
+    if first_day is not None:
+        report["first_date"] = date_str_from_day(first_day)
+        report["last_date"] = date_str_from_day(last_day)
+        report["last_day"] = last_day
+    return report
+
+
+def progress_key(source_id):
+    """settings 中记录已写入记录数的键"""
+    return PROGRESS_PREFIX + source_id
+
+
+def load_progress(conn, source_id):
+    """上次中断的导入已经写入的记录数（没有中断过为 0）"""
+    row = conn.execute("SELECT value FROM settings WHERE key = ?", (progress_key(source_id),)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def save_progress(conn, source_id, records_done):
+    conn.execute(
+        "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+        (progress_key(source_id), str(records_done)),
+    )
+
+
+def mark_imported(conn, source_id, path, last_day):
+    """记录导入完成的文件，并删除中断续传用的进度"""
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO merged_sources (source_id, path, fingerprint, last_day, merged_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (source_id, os.path.abspath(path), source_id, last_day, datetime.now().isoformat(timespec="seconds")),
+    )
+    conn.execute("DELETE FROM settings WHERE key = ?", (progress_key(source_id),))
+
+
+def write_batch(conn, hourly, apps, app_names):
+    """
+    hourly: {epoch-hour: [sec, clicks, keys]}，apps: {(epoch-day, app_name): sec}
+    upsert 进 hourly_stats（触发器同步 daily_stats）/ 月 / 年汇总表 / app_stats，返回 (小时行数, 应用行数)
+    """
+    daily = {}
+    for hour, (sec, clicks, keys) in hourly.items():
+        total = daily.setdefault(hour // 24, [0, 0, 0])
+        total[0] += sec
+        total[1] += clicks
+        total[2] += keys
+
+    rollups.add_daily_deltas(conn, daily)
+    conn.executemany(
+        """
+        INSERT INTO hourly_stats (hour, screen_time_seconds, mouse_clicks, keystrokes)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(hour) DO UPDATE SET
+            screen_time_seconds = screen_time_seconds + excluded.screen_time_seconds,
+            mouse_clicks        = mouse_clicks        + excluded.mouse_clicks,
+            keystrokes          = keystrokes          + excluded.keystrokes
+        """,
+        [(hour, *totals) for hour, totals in hourly.items()],
+    )
+    app_ids = app_names.ids(conn, {name for _, name in apps})
+    conn.executemany(
+        """
+        INSERT INTO app_stats (day, app_id, duration_seconds)
+        VALUES (?, ?, ?)
+        ON CONFLICT(day, app_id) DO UPDATE SET
+            duration_seconds = duration_seconds + excluded.duration_seconds
+        """,
+        [(day, app_ids[name], sec) for (day, name), sec in apps.items()],
+    )
+    return len(hourly), len(apps)
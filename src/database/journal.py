@@ -0,0 +1,164 @@
+# 文件路径: database/journal.py
+"""
+写缓冲的崩溃恢复日志（内存映射、只追加）。
+
+WriteBuffer 每次 add() 都把这一次的增量追加到日志，不做 fsync：
+数据写进映射的页面后即由操作系统负责落盘，进程被杀掉也不会丢失
+（断电 / 系统崩溃时最后几秒可能丢失，CRC 保证不会读到写了一半的记录）。
+写缓冲刷盘成功后截掉已写入数据库的部分；启动时把剩余的记录重放进写缓冲。
+
+文件格式（little-endian）：
+    头部   magic "DGJ1" | uint32 保留 | uint64 next_seq
+    记录   uint32 长度 | uint32 CRC32 | JSON（含单调递增的 "seq"）
+长度为 0 表示日志结束；有效记录之后的字节始终为 0。
+
+每个记录都有序号，刷盘时把批次中最大的序号与增量写在同一个事务里
+（settings.journal_seq），重放时跳过已经写入数据库的记录，
+即使截断日志之前进程退出也不会重复计入。
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+# 日志文件名：<数据库文件名>.deltas
+JOURNAL_SUFFIX = ".deltas"
+# 初始映射大小，写满时翻倍
+JOURNAL_SIZE = 256 * 1024
+
+SETTING_JOURNAL_SEQ = "journal_seq"
+
+_MAGIC = b"DGJ1"
+_HEADER = struct.Struct("<4sIQ")
+_RECORD = struct.Struct("<II")
+
+
+class DeltaJournal:
+    def __init__(self, path, size=JOURNAL_SIZE):
+        self.path = path
+        self._lock = threading.Lock()
+
+        exists = os.path.exists(path)
+        self._file = open(path, "r+b" if exists else "w+b")
+        size = max(size, os.fstat(self._file.fileno()).st_size)
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+        magic, _, next_seq = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            # 新文件或无法识别的内容：重新初始化
+            self._map[:] = bytes(size)
+            next_seq = 1
+            _HEADER.pack_into(self._map, 0, _MAGIC, 0, next_seq)
+
+        # 从头扫描出有效记录的末尾；之后的字节（例如写了一半的记录）清零
+        records, self._end = self._scan()
+        self._map[self._end:] = bytes(size - self._end)
+        if records:
+            next_seq = max(next_seq, records[-1]["seq"] + 1)
+        self._next_seq = next_seq
+        # 逻辑位置 = _base + (_end - 头部大小)，截断后仍单调递增
+        self._base = 0
+
+    # ======================================================
+    # 读取
+    # ======================================================
+    def _scan(self):
+        """(有效记录列表, 有效记录的末尾)"""
+        records = []
+        pos = _HEADER.size
+        size = len(self._map)
+        while pos + _RECORD.size <= size:
+            length, crc = _RECORD.unpack_from(self._map, pos)
+            start = pos + _RECORD.size
+            if length == 0 or start + length > size:
+                break
+            payload = self._map[start:start + length]
+            if zlib.crc32(payload) != crc:
+                break
+            try:
+                records.append(json.loads(payload))
+            except ValueError:
+                break
+            pos = start + length
+        return records, pos
+
+    def records(self):
+        """当前日志中的全部记录（按序号升序）"""
+        with self._lock:
+            return self._scan()[0]
+
+    @property
+    def position(self):
+        """逻辑末尾位置，用作 discard_until() 的参数"""
+        with self._lock:
+            return self._base + self._end - _HEADER.size
+
+    @property
+    def last_seq(self):
+        with self._lock:
+            return self._next_seq - 1
+
+    # ======================================================
+    # 写入
+    # ======================================================
+    def append(self, record):
+        """追加一条记录（dict），返回分配的序号"""
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            payload = json.dumps({"seq": seq, **record}, separators=(",", ":")).encode()
+            needed = self._end + _RECORD.size + len(payload) + _RECORD.size
+            if needed > len(self._map):
+                self._grow(needed)
+            start = self._end + _RECORD.size
+            self._map[start:start + len(payload)] = payload
+            # 最后写长度：长度非 0 时记录才可见
+            struct.pack_into("<I", self._map, self._end + 4, zlib.crc32(payload))
+            struct.pack_into("<I", self._map, self._end, len(payload))
+            self._end = start + len(payload)
+            return seq
+
+    def advance(self, seq):
+        """保证之后分配的序号大于 seq（日志文件被删除而数据库里已记录了更大的序号时）"""
+        with self._lock:
+            if self._next_seq <= seq:
+                self._next_seq = seq + 1
+                _HEADER.pack_into(self._map, 0, _MAGIC, 0, self._next_seq)
+
+    def discard_until(self, position):
+        """丢弃逻辑位置 position 之前的记录（之后追加的记录前移到文件开头）"""
+        with self._lock:
+            cut = position - self._base
+            if cut <= 0:
+                return
+            used = self._end - _HEADER.size
+            cut = min(cut, used)
+            remaining = used - cut
+            if remaining:
+                self._map.move(_HEADER.size, _HEADER.size + cut, remaining)
+            new_end = _HEADER.size + remaining
+            self._map[new_end:self._end] = bytes(self._end - new_end)
+            self._end = new_end
+            self._base += cut
+            # 日志为空时重启也要从这里继续编号
+            _HEADER.pack_into(self._map, 0, _MAGIC, 0, self._next_seq)
+
+    def _grow(self, needed):
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def close(self):
+        with self._lock:
+            if self._map.closed:
+                return
+            _HEADER.pack_into(self._map, 0, _MAGIC, 0, self._next_seq)
+            self._map.flush()
+            self._map.close()
+            self._file.close()
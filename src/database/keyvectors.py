@@ -0,0 +1,79 @@
+# 文件路径: database/keyvectors.py
+"""
+按天打包的按键计数向量。
+
+keyboard_daily 每天一行：
+    CREATE TABLE keyboard_daily (day INTEGER PRIMARY KEY, counts BLOB NOT NULL)
+counts 是 little-endian uint32 数组，下标为 keys 字典表的 id（0 号位不用）。
+新按键只会得到更大的 id，所以旧的向量比当前字典短时，缺的部分视为 0。
+
+每次写入只读写当天的一行（向量加法）；全部历史的合计是 O(天数) 次 NumPy 加法。
+"""
+from collections import defaultdict
+
+import numpy as np
+
+DTYPE = np.dtype("<u4")
+
+
+def unpack(blob):
+    """BLOB -> 只读的 uint32 数组（None / 空 BLOB 为长度 0）"""
+    if not blob:
+        return np.zeros(0, dtype=DTYPE)
+    return np.frombuffer(blob, dtype=DTYPE)
+
+
+def pack(vector):
+    return np.ascontiguousarray(vector, dtype=DTYPE).tobytes()
+
+
+def add_counts(blob, counts):
+    """
+    在 blob 表示的向量上累加 counts: {key_id: count}，返回新的 BLOB。
+    """
+    if not counts:
+        return blob
+    ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    current = unpack(blob)
+    vector = np.zeros(max(len(current), int(ids.max()) + 1), dtype=np.int64)
+    vector[:len(current)] = current
+    np.add.at(vector, ids, values)
+    return pack(vector)
+
+
+def sum_blobs(blobs):
+    """多个向量逐位相加，返回 int64 数组（长度取最长的向量）"""
+    total = np.zeros(0, dtype=np.int64)
+    for blob in blobs:
+        vector = unpack(blob)
+        if len(vector) > len(total):
+            total = np.concatenate((total, np.zeros(len(vector) - len(total), dtype=np.int64)))
+        total[:len(vector)] += vector
+    return total
+
+
+def nonzero_items(vector):
+    """[(key_id, count), ...]，只含计数不为 0 的按键"""
+    ids = np.flatnonzero(vector)
+    return list(zip(ids.tolist(), vector[ids].tolist()))
+
+
+# ======================================================
+# 写入（调用方负责事务）
+# ======================================================
+def add_daily(conn, deltas, schema="main"):
+    """
+    deltas: {(day, key_id): count}
+    每天读一次、写一次 keyboard_daily 的行
+    """
+    per_day = defaultdict(dict)
+    for (day, key_id), count in deltas.items():
+        per_day[day][key_id] = per_day[day].get(key_id, 0) + count
+
+    for day, counts in per_day.items():
+        row = conn.execute(f"SELECT counts FROM {schema}.keyboard_daily WHERE day = ?", (day,)).fetchone()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {schema}.keyboard_daily (day, counts) VALUES (?, ?)",
+            (day, add_counts(row[0] if row else None, counts)),
+        )
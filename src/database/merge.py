@@ -0,0 +1,422 @@
+# 文件路径: database/merge.py
+"""
+合并另一台机器的 activity_data.db。
+
+源库通过 ATTACH 挂载为 src，各表用一条 INSERT ... SELECT ... ON CONFLICT DO UPDATE
+累加进本库（整批在 SQLite 内完成，不经过 Python 逐行处理），全部在一个事务里提交。
+
+merged_sources 表记录合并过的源（按源库的 instance_id 识别）以及当时的内容指纹、
+最后一天和最后一天已经合并进来的内容（boundary，JSON）：
+    - 指纹没变：什么也不做（重复合并同一个文件不会重复计入）
+    - 源库之后又记录了新数据：最后一天按源库现在的值与 boundary 的差值补上，
+      之后的日期整批合并
+表结构版本较旧的源库先复制到临时文件并执行迁移，再挂载副本；
+没有 instance_id 的旧源库以内容指纹识别。
+"""
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, time
+from urllib.parse import quote
+
+from . import keyvectors, minutes, rollups
+from .migrations import latest_version, migrate
+from .timekeys import SQL_DAY_TO_MONTH, date_from_day
+
+SETTING_INSTANCE_ID = "instance_id"
+
+# 按日期合并的表：(表名, 键列, 数值列, 冲突键, 字典表)
+# 字典编码的表按名字把源库的 id 换成本库的 id
+# hourly_stats 先合并：触发器会把这些小时累加进本库的 daily_stats，daily_stats 只补源库中没有小时明细的部分
+_DAY_TABLES = (
+    ("hourly_stats", "hour", ("screen_time_seconds", "mouse_clicks", "keystrokes"), ("hour",), None),
+    ("daily_stats", "day", ("screen_time_seconds", "mouse_clicks", "keystrokes"), ("day",), None),
+    ("app_stats", "day", ("duration_seconds",), ("day", "app_id"), "apps"),
+)
+
+MERGE_TABLES = (
+    *(t[0] for t in _DAY_TABLES), *rollups.ROLLUP_TABLES, "minute_stats", "keyboard_daily", "keyboard_monthly",
+    "events",
+)
+
+
+class MergeError(Exception):
+    pass
+
+
+def _has_table(conn, table, schema="main"):
+    return conn.execute(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def instance_id(conn, schema="main"):
+    if not _has_table(conn, "settings", schema):
+        return None
+    row = conn.execute(
+        f"SELECT value FROM {schema}.settings WHERE key = ?", (SETTING_INSTANCE_ID,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def _schema_version(conn):
+    if not _has_table(conn, "schema_version"):
+        return 0
+    return conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+
+
+def fingerprint(conn, schema="main"):
+    """源库内容的指纹：各表的行数与合计（只要有新数据写入就会变化）"""
+    parts = [
+        conn.execute(
+            f"""
+            SELECT COUNT(*), MAX(day), TOTAL(screen_time_seconds), TOTAL(mouse_clicks), TOTAL(keystrokes)
+            FROM {schema}.daily_stats
+            """
+        ).fetchone(),
+        conn.execute(f"SELECT COUNT(*), TOTAL(duration_seconds) FROM {schema}.app_stats").fetchone(),
+        conn.execute(f"SELECT COUNT(*), MAX(day), TOTAL(LENGTH(counts)) FROM {schema}.keyboard_daily").fetchone(),
+    ]
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def prepare_source(path):
+    """
+    返回 (可以直接 ATTACH 的路径, 合并后要删除的临时文件或 None, 源库的 instance_id 或 None)。
+    旧版本的源库先用 backup API 复制到临时文件再迁移，原文件保持不变。
+    """
+    if not os.path.exists(path):
+        raise MergeError(f"Source database not found: {path}")
+    source = sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True)
+    try:
+        if not _has_table(source, "daily_stats"):
+            raise MergeError(f"Not a DailyGrid database: {path}")
+        source_id = instance_id(source)
+        if _schema_version(source) >= latest_version():
+            return path, None, source_id
+
+        fd, temp_path = tempfile.mkstemp(suffix=".db", prefix="dailygrid_merge_")
+        os.close(fd)
+        copy = sqlite3.connect(temp_path)
+        try:
+            source.backup(copy)
+            with copy:
+                migrate(copy)
+        finally:
+            copy.close()
+        return temp_path, temp_path, source_id
+    finally:
+        source.close()
+
+
+def merge_attached(conn, path, source_id=None, schema="src"):
+    """
+    把已挂载为 schema 的源库合并进 main（调用方负责事务）。
+    source_id: 源库原有的 instance_id；None 表示旧源库，以内容指纹识别
+    返回 {"status": "merged" | "up_to_date", "source_id", "since_day", "rows": {表名: 行数}}
+    """
+    content = fingerprint(conn, schema)
+    if source_id is None:
+        source_id = f"fingerprint:{content}"
+    if source_id == instance_id(conn):
+        raise MergeError("Cannot merge a database into itself.")
+
+    known = conn.execute(
+        "SELECT fingerprint, last_day, boundary FROM merged_sources WHERE source_id = ?", (source_id,)
+    ).fetchone()
+    if known is not None and known[0] == content:
+        return {"status": "up_to_date", "source_id": source_id, "since_day": known[1], "rows": {}}
+
+    # 新的源：合并全部；合并过的源：只合并上次最后一天之后的日期
+    since = known[1] if known is not None and known[1] is not None else -1
+    rows = {}
+
+    # 先把源库的名字并入本库的字典表
+    for dictionary in ("apps", "keys"):
+        conn.execute(f"INSERT OR IGNORE INTO main.{dictionary} (name) SELECT name FROM {schema}.{dictionary}")
+
+    # 上次的最后一天之后源库可能又有新的记录：按差值补上（源库当时还没有数据时没有 boundary）
+    if known is not None and known[2] is not None:
+        for table, count in merge_boundary_day(conn, schema, json.loads(known[2])).items():
+            rows[table] = rows.get(table, 0) + count
+
+    for table, key_col, values, conflict, dictionary in _DAY_TABLES:
+        low = since * 24 + 23 if key_col == "hour" else since
+        column_list = ", ".join((*conflict, *values))
+        updates = ", ".join(f"{v} = {v} + excluded.{v}" for v in values)
+        if table == "daily_stats":
+            # 源库的每日合计减去它的小时明细之和（保留策略折叠掉的小时、早期没有小时明细的日期）
+            source = (
+                f"SELECT s.day, {', '.join(f'IFNULL(s.{v}, 0) - IFNULL(h.{v}, 0)' for v in values)} "
+                f"FROM {schema}.daily_stats s LEFT JOIN ("
+                f"SELECT hour / 24 AS day, {', '.join(f'SUM({v}) AS {v}' for v in values)} "
+                f"FROM {schema}.hourly_stats WHERE hour > ? GROUP BY 1) h ON h.day = s.day"
+            )
+        elif dictionary is None:
+            source = f"SELECT {column_list} FROM {schema}.{table} s"
+        else:
+            id_col = conflict[1]
+            source = (
+                f"SELECT s.{key_col}, m.id, {', '.join(f's.{v}' for v in values)} FROM {schema}.{table} s "
+                f"JOIN {schema}.{dictionary} d ON d.id = s.{id_col} JOIN main.{dictionary} m ON m.name = d.name"
+            )
+        rows[table] = rows.get(table, 0) + conn.execute(
+            f"""
+            INSERT INTO main.{table} ({column_list})
+            {source}
+            WHERE s.{key_col} > ?
+            ON CONFLICT({", ".join(conflict)}) DO UPDATE SET {updates}
+            """,
+            (since * 24 + 23, low) if table == "daily_stats" else (low,),
+        ).rowcount
+
+    # 按键计数向量：按名字把源库的 key id 换成本库的 id，再逐天相加
+    key_map = dict(conn.execute(
+        f"SELECT d.id, m.id FROM {schema}.keys d JOIN main.keys m ON m.name = d.name"
+    ))
+    key_days = conn.execute(
+        f"SELECT day, counts FROM {schema}.keyboard_daily WHERE day > ?", (since,)
+    ).fetchall()
+    keyvectors.add_daily(conn, {
+        (day, key_map[key_id]): count
+        for day, blob in key_days
+        for key_id, count in keyvectors.nonzero_items(keyvectors.unpack(blob))
+    })
+    rows["keyboard_daily"] = rows.get("keyboard_daily", 0) + len(key_days)
+
+    # 按分钟的数组：逐天相加
+    minute_days = conn.execute(
+        f"SELECT day, data FROM {schema}.minute_stats WHERE day > ?", (since,)
+    ).fetchall()
+    for day, blob in minute_days:
+        row = conn.execute("SELECT data FROM main.minute_stats WHERE day = ?", (day,)).fetchone()
+        merged = minutes.unpack(blob) + minutes.unpack(row[0] if row else None)
+        conn.execute("INSERT OR REPLACE INTO main.minute_stats (day, data) VALUES (?, ?)", (day, minutes.pack(merged)))
+    rows["minute_stats"] = rows.get("minute_stats", 0) + len(minute_days)
+
+    # 月 / 年汇总表：按源库的 daily_stats 增量累加
+    rows["monthly_stats"] = rows.get("monthly_stats", 0) + conn.execute(
+        f"""
+        INSERT INTO main.monthly_stats (month, screen_time_seconds, mouse_clicks, keystrokes)
+        SELECT {SQL_DAY_TO_MONTH.format(col="day")}, SUM(screen_time_seconds), SUM(mouse_clicks), SUM(keystrokes)
+        FROM {schema}.daily_stats
+        WHERE day > ?
+        GROUP BY 1
+        ON CONFLICT(month) DO UPDATE SET
+            screen_time_seconds = screen_time_seconds + excluded.screen_time_seconds,
+            mouse_clicks        = mouse_clicks        + excluded.mouse_clicks,
+            keystrokes          = keystrokes          + excluded.keystrokes
+        """,
+        (since,),
+    ).rowcount
+    rows["yearly_stats"] = rows.get("yearly_stats", 0) + conn.execute(
+        f"""
+        INSERT INTO main.yearly_stats (year, screen_time_seconds, mouse_clicks, keystrokes)
+        SELECT {SQL_DAY_TO_MONTH.format(col="day")} / 12,
+               SUM(screen_time_seconds), SUM(mouse_clicks), SUM(keystrokes)
+        FROM {schema}.daily_stats
+        WHERE day > ?
+        GROUP BY 1
+        ON CONFLICT(year) DO UPDATE SET
+            screen_time_seconds = screen_time_seconds + excluded.screen_time_seconds,
+            mouse_clicks        = mouse_clicks        + excluded.mouse_clicks,
+            keystrokes          = keystrokes          + excluded.keystrokes
+        """,
+        (since,),
+    ).rowcount
+
+    # 按月折叠的按键计数只在第一次合并时计入：之后再折叠的都是已经按日合并过的日期
+    rows["keyboard_monthly"] = 0
+    if known is None:
+        rows["keyboard_monthly"] = conn.execute(
+            f"""
+            INSERT INTO main.keyboard_monthly (month, key_id, count)
+            SELECT s.month, m.id, s.count
+            FROM {schema}.keyboard_monthly s
+            JOIN {schema}.keys d ON d.id = s.key_id
+            JOIN main.keys m ON m.name = d.name
+            WHERE s.month IS NOT NULL
+            ON CONFLICT(month, key_id) DO UPDATE SET count = count + excluded.count
+            """
+        ).rowcount
+
+    # 焦点区间直接追加（开始于上次最后一天之后的区间）
+    since_ts = datetime.combine(date_from_day(since + 1), time()).timestamp() if since >= 0 else 0
+    rows["events"] = rows.get("events", 0) + conn.execute(
+        f"""
+        INSERT INTO main.events (app_name, start_ts, end_ts)
+        SELECT app_name, start_ts, end_ts FROM {schema}.events
+        WHERE start_ts >= ?
+        ORDER BY start_ts
+        """,
+        (since_ts,),
+    ).rowcount
+
+    last_day = conn.execute(f"SELECT MAX(day) FROM {schema}.daily_stats").fetchone()[0]
+    last_day = max(last_day if last_day is not None else since, since)
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO merged_sources (source_id, path, fingerprint, last_day, merged_at, boundary)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (source_id, os.path.abspath(path), content, last_day, datetime.now().isoformat(timespec="seconds"),
+         json.dumps(day_snapshot(conn, schema, last_day)) if last_day >= 0 else None),
+    )
+    return {"status": "merged", "source_id": source_id, "since_day": since if since >= 0 else None, "rows": rows}
+
+
+# ======================================================
+# 最后一天的增量合并
+# ======================================================
+def _day_range_ts(day):
+    start = datetime.combine(date_from_day(day), time()).timestamp()
+    return start, datetime.combine(date_from_day(day + 1), time()).timestamp()
+
+
+def day_snapshot(conn, schema, day):
+    """源库某一天的全部内容（可以 JSON 序列化），下次合并时据此计算这一天新增的部分"""
+    start_ts, end_ts = _day_range_ts(day)
+    daily = conn.execute(
+        f"SELECT screen_time_seconds, mouse_clicks, keystrokes FROM {schema}.daily_stats WHERE day = ?", (day,)
+    ).fetchone()
+    minute_blob = conn.execute(f"SELECT data FROM {schema}.minute_stats WHERE day = ?", (day,)).fetchone()
+    key_blob = conn.execute(f"SELECT counts FROM {schema}.keyboard_daily WHERE day = ?", (day,)).fetchone()
+    key_names = dict(conn.execute(f"SELECT id, name FROM {schema}.keys"))
+    return {
+        "day": day,
+        "daily": [v or 0 for v in daily] if daily else [0, 0, 0],
+        "hourly": {
+            str(hour): [sec or 0, clicks or 0, keys or 0]
+            for hour, sec, clicks, keys in conn.execute(
+                f"""
+                SELECT hour, screen_time_seconds, mouse_clicks, keystrokes FROM {schema}.hourly_stats
+                WHERE hour BETWEEN ? AND ?
+                """,
+                (day * 24, day * 24 + 23),
+            )
+        },
+        "apps": dict(conn.execute(
+            f"""
+            SELECT d.name, s.duration_seconds FROM {schema}.app_stats s
+            JOIN {schema}.apps d ON d.id = s.app_id
+            WHERE s.day = ?
+            """,
+            (day,),
+        )),
+        "keys": {
+            key_names[key_id]: count
+            for key_id, count in keyvectors.nonzero_items(keyvectors.unpack(key_blob[0] if key_blob else None))
+        },
+        "minutes": base64.b64encode(minute_blob[0]).decode("ascii") if minute_blob else None,
+        # 与这一天有重叠的区间（包括前一天开始、延续到这一天的）
+        "events": conn.execute(
+            f"SELECT app_name, start_ts, end_ts FROM {schema}.events WHERE start_ts < ? AND end_ts >= ?",
+            (end_ts, start_ts),
+        ).fetchall(),
+    }
+
+
+def _minus(new, old):
+    return [a - b for a, b in zip(new, old)]
+
+
+def merge_boundary_day(conn, schema, old):
+    """
+    old: 上次合并时记录的 day_snapshot()。把源库这一天现在的内容与 old 的差值累加进 main
+    （源库只会增长：计数只增不减，焦点区间只会延长或新增）。返回 {表名: 行数}。
+    """
+    day = old["day"]
+    new = day_snapshot(conn, schema, day)
+    rows = {}
+
+    # hourly_stats（触发器同步 daily_stats），再补 daily_stats 中没有小时明细的部分
+    hourly = {}
+    for hour in set(new["hourly"]) | set(old["hourly"]):
+        delta = _minus(new["hourly"].get(hour, [0, 0, 0]), old["hourly"].get(hour, [0, 0, 0]))
+        if any(delta):
+            hourly[int(hour)] = delta
+    conn.executemany(
+        """
+        INSERT INTO main.hourly_stats (hour, screen_time_seconds, mouse_clicks, keystrokes)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(hour) DO UPDATE SET
+            screen_time_seconds = screen_time_seconds + excluded.screen_time_seconds,
+            mouse_clicks        = mouse_clicks        + excluded.mouse_clicks,
+            keystrokes          = keystrokes          + excluded.keystrokes
+        """,
+        [(hour, *delta) for hour, delta in hourly.items()],
+    )
+    rows["hourly_stats"] = len(hourly)
+    daily_delta = _minus(new["daily"], old["daily"])
+    rest = _minus(daily_delta, [sum(v[i] for v in hourly.values()) for i in range(3)])
+    rows["daily_stats"] = 0
+    if any(abs(v) > 1e-9 for v in rest):
+        conn.execute(
+            """
+            INSERT INTO main.daily_stats (day, screen_time_seconds, mouse_clicks, keystrokes)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(day) DO UPDATE SET
+                screen_time_seconds = screen_time_seconds + excluded.screen_time_seconds,
+                mouse_clicks        = mouse_clicks        + excluded.mouse_clicks,
+                keystrokes          = keystrokes          + excluded.keystrokes
+            """,
+            (day, *rest),
+        )
+        rows["daily_stats"] = 1
+    if any(daily_delta):
+        rollups.add_daily_deltas(conn, {day: daily_delta})
+
+    apps = {name: sec - old["apps"].get(name, 0) for name, sec in new["apps"].items()}
+    apps = {name: sec for name, sec in apps.items() if sec}
+    # 按名字换成本库的 id（字典表已经合并过）
+    app_ids = dict(conn.execute("SELECT name, id FROM main.apps"))
+    conn.executemany(
+        """
+        INSERT INTO main.app_stats (day, app_id, duration_seconds)
+        VALUES (?, ?, ?)
+        ON CONFLICT(day, app_id) DO UPDATE SET
+            duration_seconds = duration_seconds + excluded.duration_seconds
+        """,
+        [(day, app_ids[name], sec) for name, sec in apps.items()],
+    )
+    rows["app_stats"] = len(apps)
+    keys = {name: count - old["keys"].get(name, 0) for name, count in new["keys"].items()}
+    key_ids = dict(conn.execute("SELECT name, id FROM main.keys"))
+    keyvectors.add_daily(conn, {(day, key_ids[name]): count for name, count in keys.items() if count})
+    rows["keyboard_daily"] = int(any(keys.values()))
+
+    # minute_stats：两个数组相减
+    old_minutes = minutes.unpack(base64.b64decode(old["minutes"]) if old["minutes"] else None)
+    new_minutes = minutes.unpack(base64.b64decode(new["minutes"]) if new["minutes"] else None)
+    delta = new_minutes - old_minutes
+    changed = delta.any(axis=0)
+    minutes.add_daily(conn, {
+        (day, int(minute)): tuple(int(v) for v in delta[:, minute])
+        for minute in changed.nonzero()[0]
+    })
+    rows["minute_stats"] = int(changed.any())
+
+    # events：延长过的区间更新 end_ts，新的区间追加
+    day_start = _day_range_ts(day)[0]
+    old_events = {(app, start): end for app, start, end in old["events"]}
+    rows["events"] = 0
+    for app, start, end in new["events"]:
+        previous = old_events.get((app, start))
+        if previous is not None:
+            if end <= previous:
+                continue
+            conn.execute(
+                "UPDATE main.events SET end_ts = ? WHERE app_name = ? AND start_ts = ? AND end_ts = ?",
+                (end, app, start, previous),
+            )
+        elif start >= day_start or not conn.execute(
+                # 前一天开始的区间上次已经合并过，只是当时还没有延续到这一天
+                "UPDATE main.events SET end_ts = MAX(end_ts, ?) WHERE app_name = ? AND start_ts = ?",
+                (end, app, start),
+        ).rowcount:
+            conn.execute("INSERT INTO main.events (app_name, start_ts, end_ts) VALUES (?, ?, ?)", (app, start, end))
+        rows["events"] += 1
+    return rows
@@ -0,0 +1,496 @@
+# 文件路径: database/migrations.py
+"""
+带版本号的数据库迁移。
+
+schema_version 表记录已经执行过的迁移；DatabaseManager.init_db() 启动时
+按版本号顺序执行尚未执行的迁移，全部在写线程的同一个事务中完成，
+失败时整体回滚，旧库保持原样。
+
+新增迁移：在文件末尾写一个函数并用 @migration(版本号, 说明) 注册，版本号递增。
+迁移里用到的 SQL 与常量都写在迁移自己里面，不调用 rollups / keyvectors 等模块：
+那些模块会随之后的版本改变，而旧版本的迁移必须始终按写下它时的表结构执行。
+"""
+import struct
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+
+    return register
+
+
+def current_version(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT
+        )
+        """
+    )
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def migrate(conn):
+    """执行所有未执行的迁移，返回执行过的版本号列表（调用方负责事务）"""
+    version = current_version(conn)
+    applied = []
+    for target, description, fn in MIGRATIONS:
+        if target <= version:
+            continue
+        fn(conn)
+        conn.execute(
+            "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+            (target, description, datetime.now().isoformat(timespec="seconds")),
+        )
+        applied.append(target)
+    return applied
+
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+# ======================================================
+# v1: 初始表结构（TEXT 日期）
+# ======================================================
+@migration(1, "initial schema")
+def _v1_initial_schema(conn):
+    cursor = conn.cursor()
+
+    # 每日汇总
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            date TEXT PRIMARY KEY,
+            screen_time_seconds REAL DEFAULT 0,
+            mouse_clicks INTEGER DEFAULT 0,
+            keystrokes INTEGER DEFAULT 0
+        )
+        """
+    )
+
+    # 每日每应用使用时长
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS app_stats (
+            date TEXT,
+            app_name TEXT,
+            duration_seconds REAL DEFAULT 0,
+            PRIMARY KEY (date, app_name)
+        )
+        """
+    )
+
+    # 设置表（例如 daily_goal）
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        """
+    )
+
+    # 键盘热力图
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS keyboard_stats (
+            date TEXT,
+            key_name TEXT,
+            count INTEGER DEFAULT 0,
+            PRIMARY KEY (date, key_name)
+        )
+        """
+    )
+
+    # 小时粒度统计（用于 Daily Activity 24h 图）
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS hourly_stats (
+            date TEXT,
+            hour INTEGER,
+            screen_time_seconds REAL DEFAULT 0,
+            mouse_clicks INTEGER DEFAULT 0,
+            keystrokes INTEGER DEFAULT 0,
+            PRIMARY KEY (date, hour)
+        )
+        """
+    )
+
+    # 默认每日目标 4 小时
+    cursor.execute(
+        "INSERT OR IGNORE INTO settings (key, value) VALUES ('daily_goal', '4.0')"
+    )
+
+
+# ======================================================
+# v2: 整数 epoch-day / epoch-hour 主键
+# ======================================================
+# 'YYYY-MM-DD' -> epoch-day（julianday('1970-01-01') = 2440587.5）
+_SQL_DATE_TO_DAY = "CAST(julianday({col}) - 2440587.5 AS INTEGER)"
+
+
+@migration(2, "integer epoch-day / epoch-hour keys")
+def _v2_integer_day_keys(conn):
+    # v1 建表时已经是新结构（例如重复执行）就跳过
+    if "day" in _table_columns(conn, "daily_stats"):
+        return
+
+    for table in ("daily_stats", "hourly_stats", "app_stats", "keyboard_stats"):
+        conn.execute(f"ALTER TABLE {table} RENAME TO {table}_v1")
+
+    # day = epoch-day
+    conn.execute(
+        """
+        CREATE TABLE daily_stats (
+            day INTEGER PRIMARY KEY,
+            screen_time_seconds REAL DEFAULT 0,
+            mouse_clicks INTEGER DEFAULT 0,
+            keystrokes INTEGER DEFAULT 0
+        )
+        """
+    )
+    # hour = epoch-hour（day * 24 + 当天小时）
+    conn.execute(
+        """
+        CREATE TABLE hourly_stats (
+            hour INTEGER PRIMARY KEY,
+            screen_time_seconds REAL DEFAULT 0,
+            mouse_clicks INTEGER DEFAULT 0,
+            keystrokes INTEGER DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE app_stats (
+            day INTEGER,
+            app_name TEXT,
+            duration_seconds REAL DEFAULT 0,
+            PRIMARY KEY (day, app_name)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE keyboard_stats (
+            day INTEGER,
+            key_name TEXT,
+            count INTEGER DEFAULT 0,
+            PRIMARY KEY (day, key_name)
+        ) WITHOUT ROWID
+        """
+    )
+
+    day = _SQL_DATE_TO_DAY.format(col="date")
+    conn.execute(
+        f"""
+        INSERT INTO daily_stats (day, screen_time_seconds, mouse_clicks, keystrokes)
+        SELECT {day}, SUM(screen_time_seconds), SUM(mouse_clicks), SUM(keystrokes)
+        FROM daily_stats_v1
+        WHERE date IS NOT NULL
+        GROUP BY 1
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO hourly_stats (hour, screen_time_seconds, mouse_clicks, keystrokes)
+        SELECT {day} * 24 + hour, SUM(screen_time_seconds), SUM(mouse_clicks), SUM(keystrokes)
+        FROM hourly_stats_v1
+        WHERE date IS NOT NULL AND hour BETWEEN 0 AND 23
+        GROUP BY 1
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO app_stats (day, app_name, duration_seconds)
+        SELECT {day}, app_name, SUM(duration_seconds)
+        FROM app_stats_v1
+        WHERE date IS NOT NULL AND app_name IS NOT NULL
+        GROUP BY 1, 2
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO keyboard_stats (day, key_name, count)
+        SELECT {day}, key_name, SUM(count)
+        FROM keyboard_stats_v1
+        WHERE date IS NOT NULL AND key_name IS NOT NULL
+        GROUP BY 1, 2
+        """
+    )
+
+    for table in ("daily_stats", "hourly_stats", "app_stats", "keyboard_stats"):
+        conn.execute(f"DROP TABLE {table}_v1")
+
+
+# ======================================================
+# v3: 月 / 年汇总表
+# ======================================================
+# epoch-day -> year * 12 + (month - 1)
+_SQL_DAY_TO_MONTH = (
+    "(CAST(strftime('%Y', {col} * 86400, 'unixepoch') AS INTEGER) * 12"
+    " + CAST(strftime('%m', {col} * 86400, 'unixepoch') AS INTEGER) - 1)"
+)
+
+
+@migration(3, "monthly / yearly rollup tables")
+def _v3_rollup_tables(conn):
+    # month = year * 12 + (month - 1)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS monthly_stats (
+            month INTEGER PRIMARY KEY,
+            screen_time_seconds REAL DEFAULT 0,
+            mouse_clicks INTEGER DEFAULT 0,
+            keystrokes INTEGER DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS yearly_stats (
+            year INTEGER PRIMARY KEY,
+            screen_time_seconds REAL DEFAULT 0,
+            mouse_clicks INTEGER DEFAULT 0,
+            keystrokes INTEGER DEFAULT 0
+        )
+        """
+    )
+    conn.execute("DELETE FROM monthly_stats")
+    conn.execute("DELETE FROM yearly_stats")
+    conn.execute(
+        f"""
+        INSERT INTO monthly_stats (month, screen_time_seconds, mouse_clicks, keystrokes)
+        SELECT {_SQL_DAY_TO_MONTH.format(col="day")},
+               SUM(screen_time_seconds), SUM(mouse_clicks), SUM(keystrokes)
+        FROM daily_stats
+        GROUP BY 1
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO yearly_stats (year, screen_time_seconds, mouse_clicks, keystrokes)
+        SELECT month / 12, SUM(screen_time_seconds), SUM(mouse_clicks), SUM(keystrokes)
+        FROM monthly_stats
+        GROUP BY 1
+        """
+    )
+
+
+# ======================================================
+# v4: 前台应用焦点区间
+# ======================================================
+@migration(4, "focus-interval events table")
+def _v4_events(conn):
+    # start_ts / end_ts 为 Unix 时间戳（秒）；同一应用连续处于前台时只延长 end_ts
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            app_name TEXT NOT NULL,
+            start_ts REAL NOT NULL,
+            end_ts REAL NOT NULL
+        )
+        """
+    )
+    # 按时间段查询（某天 / 最近）只需扫描 end_ts 之后的区间
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_end_ts ON events(end_ts)")
+
+
+# ======================================================
+# v5: 按月折叠的按键计数（保留策略）
+# ======================================================
+@migration(5, "keyboard_monthly table")
+def _v5_retention(conn):
+    # month = year * 12 + (month - 1)；v8 起 key_name 换成 key_id
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS keyboard_monthly (
+            month INTEGER,
+            key_name TEXT,
+            count INTEGER DEFAULT 0,
+            PRIMARY KEY (month, key_name)
+        ) WITHOUT ROWID
+        """
+    )
+    # 不写入默认策略：降采样会删除明细，只有用户明确设置后才执行
+
+
+# ======================================================
+# v6: 多机合并（实例 ID + 已合并的源）
+# ======================================================
+@migration(6, "instance id and merged_sources table")
+def _v6_merge_sources(conn):
+    # 每个数据库一个随机 ID，合并时用来识别源库
+    conn.execute(
+        "INSERT OR IGNORE INTO settings (key, value) VALUES ('instance_id', ?)",
+        (uuid.uuid4().hex,),
+    )
+    # boundary: 上次合并时源库最后一天的内容（JSON，见 merge.day_snapshot()）
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS merged_sources (
+            source_id TEXT PRIMARY KEY,
+            path TEXT,
+            fingerprint TEXT,
+            last_day INTEGER,
+            merged_at TEXT,
+            boundary TEXT
+        )
+        """
+    )
+
+
+# ======================================================
+# v7: 按应用查询历史的覆盖索引
+# ======================================================
+@migration(7, "covering indexes for per-app history")
+def _v7_app_indexes(conn):
+    # app_stats 的主键是 (day, app_name)，「某个应用的所有日期」只能全表扫描；
+    # 带上 duration_seconds 后查询只读索引
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_app_stats_app ON app_stats(app_name, day, duration_seconds)"
+    )
+    # 某个应用在时间段内的焦点区间（小时分布）
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_events_app ON events(app_name, end_ts, start_ts)"
+    )
+
+
+# ======================================================
+# v8: 应用名 / 按键名字典编码
+# ======================================================
+@migration(8, "apps / keys dictionary tables")
+def _v8_name_dictionaries(conn):
+    # 事实表只存整数 id（见 names.py）
+    conn.execute("CREATE TABLE apps (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    conn.execute("CREATE TABLE keys (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    conn.execute(
+        "INSERT INTO apps (name) SELECT DISTINCT app_name FROM app_stats WHERE app_name IS NOT NULL ORDER BY 1"
+    )
+    conn.execute(
+        """
+        INSERT INTO keys (name)
+        SELECT key_name FROM keyboard_stats WHERE key_name IS NOT NULL
+        UNION
+        SELECT key_name FROM keyboard_monthly WHERE key_name IS NOT NULL
+        ORDER BY 1
+        """
+    )
+
+    # (表名, 时间键, 名字列, id 列, 字典表, 数值列)
+    tables = (
+        ("app_stats", "day", "app_name", "app_id", "apps", "duration_seconds REAL DEFAULT 0"),
+        ("keyboard_stats", "day", "key_name", "key_id", "keys", "count INTEGER DEFAULT 0"),
+        ("keyboard_monthly", "month", "key_name", "key_id", "keys", "count INTEGER DEFAULT 0"),
+    )
+    for table, key_col, name_col, id_col, dictionary, value_def in tables:
+        value_col = value_def.split()[0]
+        conn.execute(f"ALTER TABLE {table} RENAME TO {table}_v7")
+        conn.execute(
+            f"""
+            CREATE TABLE {table} (
+                {key_col} INTEGER,
+                {id_col} INTEGER,
+                {value_def},
+                PRIMARY KEY ({key_col}, {id_col})
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT INTO {table} ({key_col}, {id_col}, {value_col})
+            SELECT t.{key_col}, d.id, t.{value_col}
+            FROM {table}_v7 t JOIN {dictionary} d ON d.name = t.{name_col}
+            """
+        )
+        conn.execute(f"DROP TABLE {table}_v7")
+
+    # v7 的覆盖索引随旧表删除，按 app_id 重建
+    conn.execute("CREATE INDEX idx_app_stats_app ON app_stats(app_id, day, duration_seconds)")
+
+
+# ======================================================
+# v9: 按天打包的按键计数向量
+# ======================================================
+@migration(9, "packed per-day keyboard count vectors")
+def _v9_keyboard_vectors(conn):
+    # 每天一行 little-endian uint32 向量，下标为 keys.id，0 号位不用（见 keyvectors.py）
+    conn.execute("CREATE TABLE keyboard_daily (day INTEGER PRIMARY KEY, counts BLOB NOT NULL)")
+    per_day = defaultdict(dict)
+    for day, key_id, count in conn.execute(
+        "SELECT day, key_id, count FROM keyboard_stats WHERE day IS NOT NULL AND count > 0"
+    ):
+        per_day[day][key_id] = count
+    for day, counts in per_day.items():
+        vector = [0] * (max(counts) + 1)
+        for key_id, count in counts.items():
+            vector[key_id] = count
+        conn.execute(
+            "INSERT INTO keyboard_daily (day, counts) VALUES (?, ?)",
+            (day, struct.pack(f"<{len(vector)}I", *vector)),
+        )
+    conn.execute("DROP TABLE keyboard_stats")
+
+
+# ======================================================
+# v10: 按分钟的活动数组
+# ======================================================
+@migration(10, "per-day minute-resolution activity arrays")
+def _v10_minute_stats(conn):
+    # 每天一行 zlib 压缩的 (3, 1440) uint16 数组（见 minutes.py）；旧数据只有小时精度，不回填
+    conn.execute("CREATE TABLE minute_stats (day INTEGER PRIMARY KEY, data BLOB NOT NULL)")
+
+
+# ======================================================
+# v11: daily_stats 由 hourly_stats 的触发器维护
+# ======================================================
+@migration(11, "derive daily_stats from hourly_stats via triggers")
+def _v11_daily_triggers(conn):
+    # 只对之后的写入生效；已有的 daily_stats 保持原样（早期没有小时明细的日期、保留策略折叠过的日期）
+    # hourly_stats 的插入 / 更新按差值累加进 daily_stats（hour / 24 即 epoch-day）
+    upsert = """
+        INSERT INTO daily_stats (day, screen_time_seconds, mouse_clicks, keystrokes)
+        VALUES (NEW.hour / 24, {sec}, {clicks}, {keys})
+        ON CONFLICT(day) DO UPDATE SET
+            screen_time_seconds = IFNULL(screen_time_seconds, 0) + excluded.screen_time_seconds,
+            mouse_clicks        = IFNULL(mouse_clicks, 0)        + excluded.mouse_clicks,
+            keystrokes          = IFNULL(keystrokes, 0)          + excluded.keystrokes;
+    """
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS hourly_stats_insert_daily
+        AFTER INSERT ON hourly_stats
+        BEGIN
+            {upsert.format(sec="IFNULL(NEW.screen_time_seconds, 0)", clicks="IFNULL(NEW.mouse_clicks, 0)",
+                           keys="IFNULL(NEW.keystrokes, 0)")}
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS hourly_stats_update_daily
+        AFTER UPDATE OF screen_time_seconds, mouse_clicks, keystrokes ON hourly_stats
+        BEGIN
+            {upsert.format(sec="IFNULL(NEW.screen_time_seconds, 0) - IFNULL(OLD.screen_time_seconds, 0)",
+                           clicks="IFNULL(NEW.mouse_clicks, 0) - IFNULL(OLD.mouse_clicks, 0)",
+                           keys="IFNULL(NEW.keystrokes, 0) - IFNULL(OLD.keystrokes, 0)")}
+        END
+        """
+    )
@@ -0,0 +1,113 @@
+# 文件路径: database/minutes.py
+"""
+按分钟的活动数组。
+
+minute_stats 每天一行：
+    CREATE TABLE minute_stats (day INTEGER PRIMARY KEY, data BLOB NOT NULL)
+data 是 zlib 压缩后的 little-endian uint16 数组，形状 (3, 1440)：
+    第 0 行 活跃秒数，第 1 行 点击数，第 2 行 按键数；列为本地时间的第几分钟（0-1439）。
+未压缩 8640 字节，没有活动的分钟为 0，压缩后通常只有 1-3 KB。
+单个分钟的计数超过 65535 时截断（采集间隔内不可能出现）。
+
+每次刷盘只读写涉及的那几天的行；小时 / 天 / 任意时间窗的合计都由 NumPy 向量运算得到。
+"""
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+# 每天的分钟数、每分钟的指标数（活跃秒数 / 点击 / 按键）
+SLOTS = 1440
+FIELDS = 3
+DTYPE = np.dtype("<u2")
+_MAX = np.iinfo(DTYPE).max
+
+
+def empty():
+    return np.zeros((FIELDS, SLOTS), dtype=np.int64)
+
+
+def unpack(blob):
+    """BLOB -> (3, 1440) 的 int64 数组（None 为全 0）"""
+    if not blob:
+        return empty()
+    return np.frombuffer(zlib.decompress(blob), dtype=DTYPE).reshape(FIELDS, SLOTS).astype(np.int64)
+
+
+def pack(array):
+    return zlib.compress(np.clip(array, 0, _MAX).astype(DTYPE).tobytes())
+
+
+def add_minutes(blob, deltas):
+    """在 blob 上累加 deltas: {minute: (sec, clicks, keys)}，返回新的 BLOB"""
+    array = unpack(blob)
+    for minute, values in deltas.items():
+        array[:, minute] += values
+    return pack(array)
+
+
+# ======================================================
+# 向量汇总
+# ======================================================
+def resample(array, step):
+    """(3, n) 按连续的 step 个分钟求和，例如 step=60 得到每小时、step=1440 得到每天"""
+    fields, size = array.shape
+    return array[:, :size // step * step].reshape(fields, -1, step).sum(axis=2)
+
+
+def window(array, start, end):
+    """[start, end) 分钟内的合计 (sec, clicks, keys)"""
+    return tuple(int(v) for v in array[:, start:end].sum(axis=1))
+
+
+def active_blocks(seconds, max_gap=0, min_length=1):
+    """
+    连续活跃的时间段 [(开始分钟, 结束分钟), ...]（结束为开区间）。
+    不超过 max_gap 分钟的空档视为同一段；短于 min_length 分钟的段丢弃。
+    段与段之间的空档即为休息时间。
+    """
+    active = np.asarray(seconds) > 0
+    if not active.any():
+        return []
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if max_gap > 0 and len(starts) > 1:
+        # 空档 (ends[i], starts[i + 1]) 足够短时合并相邻两段
+        keep = (starts[1:] - ends[:-1]) > max_gap
+        starts = starts[np.concatenate(([True], keep))]
+        ends = ends[np.concatenate((keep, [True]))]
+    return [(int(s), int(e)) for s, e in zip(starts, ends) if e - s >= min_length]
+
+
+# ======================================================
+# 写入（调用方负责事务）
+# ======================================================
+def add_daily(conn, deltas, schema="main"):
+    """
+    deltas: {(day, minute): (sec, clicks, keys)}
+    每天读一次、写一次 minute_stats 的行
+    """
+    per_day = defaultdict(dict)
+    for (day, minute), values in deltas.items():
+        old = per_day[day].get(minute, (0, 0, 0))
+        per_day[day][minute] = tuple(a + b for a, b in zip(old, values))
+
+    for day, minutes in per_day.items():
+        row = conn.execute(f"SELECT data FROM {schema}.minute_stats WHERE day = ?", (day,)).fetchone()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {schema}.minute_stats (day, data) VALUES (?, ?)",
+            (day, add_minutes(row[0] if row else None, minutes)),
+        )
+
+
+def read_days(conn, first, last):
+    """[first, last] 内每天一块，返回 (3, 1440 * 天数) 的 int64 数组，没有记录的日期为 0"""
+    size = max(last - first + 1, 0)
+    result = np.zeros((FIELDS, SLOTS * size), dtype=np.int64)
+    for day, blob in conn.execute(
+        "SELECT day, data FROM minute_stats WHERE day BETWEEN ? AND ?", (first, last)
+    ):
+        pos = (day - first) * SLOTS
+        result[:, pos:pos + SLOTS] = unpack(blob)
+    return result
@@ -0,0 +1,75 @@
+# 文件路径: database/names.py
+"""
+应用名 / 按键名的字典编码。
+
+app_stats / keyboard_monthly 只存整数 id（keyboard_daily 的向量以 id 为下标），名字保存在 apps / keys 字典表中：
+    CREATE TABLE apps (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)
+NameDictionary 是字典表在进程内的缓存（intern cache）：名字一旦分配了 id 就不再变化，
+采集线程每次写入只在遇到新名字时才访问字典表。
+"""
+import threading
+
+# IN (...) 每批的参数个数（低于 SQLite 的变量上限）
+_BATCH = 500
+
+
+class NameDictionary:
+    def __init__(self, table):
+        self.table = table
+        self._ids = {}    # name -> id
+        self._names = {}  # id -> name
+        self._lock = threading.Lock()
+
+    def ids(self, conn, names, create=True):
+        """
+        {name: id}。create=True 时为新名字分配 id（需要在写连接上、写事务中调用），
+        否则未知的名字对应 None。
+        """
+        names = set(names)
+        with self._lock:
+            missing = [name for name in names if name not in self._ids]
+        if missing:
+            if create:
+                conn.executemany(f"INSERT OR IGNORE INTO {self.table} (name) VALUES (?)", [(n,) for n in missing])
+            self._load(conn, "name", missing)
+        with self._lock:
+            return {name: self._ids.get(name) for name in names}
+
+    def id(self, conn, name):
+        """已有名字的 id，未知的名字返回 None（只读）"""
+        return self.ids(conn, (name,), create=False)[name]
+
+    def names(self, conn, ids):
+        """{id: name}"""
+        ids = set(ids)
+        with self._lock:
+            missing = [i for i in ids if i not in self._names]
+        if missing:
+            self._load(conn, "id", missing)
+        with self._lock:
+            return {i: self._names.get(i) for i in ids}
+
+    def decode(self, conn, rows):
+        """[(id, value...), ...] -> [(name, value...), ...]"""
+        rows = list(rows)
+        names = self.names(conn, (row[0] for row in rows))
+        return [(names[row[0]], *row[1:]) for row in rows]
+
+    def reset(self):
+        """写事务回滚后调用：缓存中可能有未提交的 id"""
+        with self._lock:
+            self._ids.clear()
+            self._names.clear()
+
+    def _load(self, conn, column, values):
+        found = []
+        for i in range(0, len(values), _BATCH):
+            chunk = values[i:i + _BATCH]
+            placeholders = ", ".join("?" * len(chunk))
+            found.extend(conn.execute(
+                f"SELECT id, name FROM {self.table} WHERE {column} IN ({placeholders})", chunk
+            ))
+        with self._lock:
+            for id_, name in found:
+                self._ids[name] = id_
+                self._names[id_] = name
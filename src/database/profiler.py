@@ -0,0 +1,232 @@
+# 文件路径: database/profiler.py
+"""
+DatabaseManager 的按方法计时与慢查询日志（默认关闭）。
+
+instrument() 把实例上的方法替换为计时包装：
+    - 每个方法记录调用次数、总耗时、最近 SAMPLE_SIZE 次的 p50 / p95 / p99、返回的行数
+    - 嵌套调用各自计时（外层方法的耗时包含内层，例如 get_weekly_trend 包含 get_daily_arrays）
+    - 写命令在写线程中执行，按命令名（_apply_deltas 等）计时
+
+连接的 trace callback 把执行的 SQL 记到当前线程正在计时的方法上；
+耗时超过 slow_ms 的调用连同其 SQL 的 EXPLAIN QUERY PLAN 记入慢查询日志，
+计划中出现全表扫描（SCAN <table>）时单独标出。
+"""
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+# 每个方法保留最近多少次耗时用于计算分位数
+SAMPLE_SIZE = 1000
+# 超过该耗时（毫秒）的调用记入慢查询日志
+SLOW_MS = 50.0
+# 慢查询日志保留的条数
+SLOW_LOG_SIZE = 100
+# 每次调用最多记录的 SQL 条数
+MAX_STATEMENTS = 32
+
+# 不计时的方法：连接 / 写线程管理、统计本身
+SKIP_METHODS = {
+    "__init__", "_get_connection", "_reader", "_submit_write", "_write", "_cached",
+    "close", "metrics", "snapshot_status", "cache_stats", "query_report", "dump_query_report",
+}
+
+_STATEMENT = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+# 全表扫描："SCAN t"（旧版本 SQLite 为 "SCAN TABLE t"）；走索引时为 "SCAN t USING ... INDEX"
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)$")
+
+
+def _row_count(result):
+    """
+    返回值对应的行数：列表 / 字典按长度，MetricArrays 按数组长度，
+    单行（例如 get_today_stats() 的 (sec, clicks, keys)、其他 namedtuple）为 1
+    """
+    if result is None:
+        return 0
+    if hasattr(result, "index") and hasattr(result.index, "__len__"):
+        return len(result.index)
+    if isinstance(result, (list, dict, set, np.ndarray)):
+        return len(result)
+    if isinstance(result, tuple) and not hasattr(result, "_fields"):
+        # 多行的元组：每个元素本身是一行
+        if all(isinstance(row, (tuple, list)) for row in result):
+            return len(result)
+    return 1
+
+
+class _MethodStats:
+    __slots__ = ("calls", "errors", "total", "max", "rows", "samples")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+
+class QueryProfiler:
+    def __init__(self, manager, slow_ms=SLOW_MS):
+        self.manager = manager
+        self.slow_ms = slow_ms
+
+        self._stats = {}
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+        self._lock = threading.Lock()
+        # 当前线程正在计时的方法：[[name, statements], ...]（由外到内）
+        self._local = threading.local()
+
+    # ======================================================
+    # 挂载
+    # ======================================================
+    def instrument(self):
+        """包装 manager 的方法（实例属性遮蔽类方法，内部的 self.xxx() 调用同样经过包装）"""
+        for name, attr in vars(type(self.manager)).items():
+            if name in SKIP_METHODS or not callable(attr) or isinstance(attr, (staticmethod, classmethod)):
+                continue
+            setattr(self.manager, name, self._wrap(name, getattr(self.manager, name)))
+        # 新打开的连接都会带上 trace callback
+        self.manager.connections.trace_callback = self._trace
+
+    def _frames(self):
+        frames = getattr(self._local, "frames", None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    def _trace(self, sql):
+        if getattr(self._local, "explaining", False) or not _STATEMENT.match(sql):
+            return
+        for frame in self._frames():
+            if len(frame[1]) < MAX_STATEMENTS:
+                frame[1].append(sql)
+
+    def _wrap(self, name, method):
+        def wrapper(*args, **kwargs):
+            frames = self._frames()
+            frame = [name, []]
+            frames.append(frame)
+            started = time.perf_counter()
+            failed = False
+            result = None
+            try:
+                result = method(*args, **kwargs)
+                return result
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                frames.pop()
+                self._record(name, elapsed, _row_count(result), failed, frame[1])
+
+        wrapper.__name__ = name
+        wrapper.__doc__ = method.__doc__
+        wrapper.__wrapped__ = method
+        return wrapper
+
+    # ======================================================
+    # 记录
+    # ======================================================
+    def _record(self, name, elapsed, rows, failed, statements):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _MethodStats()
+            stats.calls += 1
+            stats.errors += failed
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.rows += rows
+            stats.samples.append(elapsed)
+
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms < self.slow_ms or not statements:
+            return
+        plans = [self._explain(sql) for sql in dict.fromkeys(statements)]
+        entry = {
+            "method": name,
+            "ms": elapsed_ms,
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "statements": plans,
+            "full_scans": sorted({t for plan in plans for t in plan["full_scans"]}),
+        }
+        with self._lock:
+            self._slow.append(entry)
+        scans = f" (full scan: {', '.join(entry['full_scans'])})" if entry["full_scans"] else ""
+        print(f"Slow query: {name} took {elapsed_ms:.1f} ms{scans}")
+
+    def _explain(self, sql):
+        """{"sql", "plan": [detail, ...], "full_scans": [table, ...]}；无法解释时 plan 为 None 并带 error"""
+        self._local.explaining = True
+        try:
+            with self.manager._reader() as conn:
+                details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        except Exception as e:
+            return {"sql": sql, "plan": None, "full_scans": [], "error": str(e)}
+        finally:
+            self._local.explaining = False
+        scans = [m.group(1) for m in map(_FULL_SCAN.match, details) if m]
+        return {"sql": sql, "plan": details, "full_scans": scans}
+
+    # ======================================================
+    # 报告
+    # ======================================================
+    def report(self):
+        """按总耗时降序：[{method, calls, errors, total_ms, p50_ms, p95_ms, p99_ms, max_ms, rows}, ...]"""
+        with self._lock:
+            items = [(name, s.calls, s.errors, s.total, s.max, s.rows, list(s.samples))
+                     for name, s in self._stats.items()]
+        result = []
+        for name, calls, errors, total, longest, rows, samples in items:
+            p50, p95, p99 = np.percentile(samples, (50, 95, 99)) * 1000
+            result.append({
+                "method": name,
+                "calls": calls,
+                "errors": errors,
+                "total_ms": total * 1000,
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "max_ms": longest * 1000,
+                "rows": rows,
+            })
+        result.sort(key=lambda item: item["total_ms"], reverse=True)
+        return result
+
+    def slow_queries(self):
+        with self._lock:
+            return list(self._slow)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+
+    def format_report(self, limit=None):
+        """文本报告（调试输出用）"""
+        methods = self.report()[:limit]
+        lines = [
+            f"{'method':<28} {'calls':>7} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'rows':>9}"
+        ]
+        for m in methods:
+            lines.append(
+                f"{m['method']:<28} {m['calls']:>7} {m['total_ms']:>10.1f} {m['p50_ms']:>8.2f} "
+                f"{m['p95_ms']:>8.2f} {m['p99_ms']:>8.2f} {m['max_ms']:>8.2f} {m['rows']:>9}"
+            )
+
+        slow = self.slow_queries()
+        lines.append("")
+        lines.append(f"{len(slow)} slow calls (>= {self.slow_ms:g} ms)")
+        for entry in slow:
+            scans = f"  FULL SCAN: {', '.join(entry['full_scans'])}" if entry["full_scans"] else ""
+            lines.append(f"  {entry['at']} {entry['method']} {entry['ms']:.1f} ms{scans}")
+            for statement in entry["statements"]:
+                lines.append(f"    {' '.join(statement['sql'].split())}")
+                details = statement["plan"] if statement["plan"] is not None else [statement["error"]]
+                lines.extend(f"      {detail}" for detail in details)
+        return "\n".join(lines)
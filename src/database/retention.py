@@ -0,0 +1,153 @@
+# 文件路径: database/retention.py
+"""
+历史数据的保留与降采样。
+
+    hourly_stats    超过 hourly_months 个月的小时明细删除，每日合计保留在 daily_stats
+    minute_stats    随同一天的小时明细一起删除
+    keyboard_daily  超过 keys_months 个月的按日按键计数向量按月折叠进 keyboard_monthly 后删除
+
+策略保存在 settings 表（retention_hourly_months / retention_keys_months，0 表示永久保留）。
+降采样会永久删除明细，默认不启用：用户用 `python -m src.database retention --hourly-months N --save`
+等方式明确设置之后才会执行。
+每个批次只处理 batch_days 天的数据；DatabaseManager.apply_retention() 把每个批次
+作为一条独立的写命令提交，批次之间写线程照常处理采集线程的刷盘，不会长时间持有写锁。
+"""
+from collections import defaultdict
+from datetime import date
+
+from . import keyvectors, rollups
+from .timekeys import day_key, month_key, month_key_from_day
+
+# 默认永久保留小时明细和按日按键计数（0 = 不降采样）
+HOURLY_MONTHS = 0
+KEYS_MONTHS = 0
+# 每个批次（一个写事务）处理的天数
+BATCH_DAYS = 7
+
+SETTING_HOURLY_MONTHS = "retention_hourly_months"
+SETTING_KEYS_MONTHS = "retention_keys_months"
+
+
+class RetentionPolicy:
+    def __init__(self, hourly_months=HOURLY_MONTHS, keys_months=KEYS_MONTHS, batch_days=BATCH_DAYS):
+        self.hourly_months = hourly_months
+        self.keys_months = keys_months
+        self.batch_days = batch_days
+
+    @classmethod
+    def from_settings(cls, conn):
+        values = dict(
+            conn.execute(
+                "SELECT key, value FROM settings WHERE key IN (?, ?)",
+                (SETTING_HOURLY_MONTHS, SETTING_KEYS_MONTHS),
+            ).fetchall()
+        )
+        return cls(
+            hourly_months=int(values.get(SETTING_HOURLY_MONTHS, HOURLY_MONTHS)),
+            keys_months=int(values.get(SETTING_KEYS_MONTHS, KEYS_MONTHS)),
+        )
+
+    def save(self, conn):
+        """写入 settings 表（调用方负责事务）"""
+        conn.executemany(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+            [(SETTING_HOURLY_MONTHS, str(self.hourly_months)), (SETTING_KEYS_MONTHS, str(self.keys_months))],
+        )
+
+    def hourly_cutoff(self, today=None):
+        return cutoff_day(self.hourly_months, today)
+
+    def keys_cutoff(self, today=None):
+        return cutoff_day(self.keys_months, today)
+
+    def __repr__(self):
+        return (f"RetentionPolicy(hourly_months={self.hourly_months}, "
+                f"keys_months={self.keys_months}, batch_days={self.batch_days})")
+
+
+def cutoff_day(months, today=None):
+    """
+    保留最近 months 个整月（加上本月）：返回最早保留日期的 epoch-day，
+    此前的数据会被降采样。months <= 0 表示永久保留，返回 None。
+    """
+    if not months or months <= 0:
+        return None
+    month = month_key(today or date.today()) - months
+    return day_key(date(month // 12, month % 12 + 1, 1))
+
+
+# ======================================================
+# 单个批次（调用方负责事务）
+# ======================================================
+def fold_hourly_batch(conn, cutoff, batch_days=BATCH_DAYS):
+    """
+    删除 cutoff 之前最早 batch_days 天的小时明细（以及这些天的按分钟数组），
+    返回删除的小时行数（0 表示已处理完）。
+    daily_stats 由 hourly_stats 的触发器维护（删除小时明细不影响它），正常情况下已经包含这些小时的合计；
+    触发器之前的旧数据中个别缺少 daily_stats 行的日期先用小时明细补上（同时累加到月 / 年汇总表）。
+    """
+    first_hour = conn.execute("SELECT MIN(hour) FROM hourly_stats WHERE hour < ?", (cutoff * 24,)).fetchone()[0]
+    if first_hour is None:
+        return 0
+    lo = first_hour // 24 * 24
+    hi = min(first_hour // 24 + batch_days, cutoff) * 24
+
+    missing = {
+        row[0]: row[1:]
+        for row in conn.execute(
+            """
+            SELECT hour / 24, SUM(screen_time_seconds), SUM(mouse_clicks), SUM(keystrokes)
+            FROM hourly_stats
+            WHERE hour >= ? AND hour < ?
+              AND hour / 24 NOT IN (SELECT day FROM daily_stats WHERE day >= ? AND day < ?)
+            GROUP BY 1
+            """,
+            (lo, hi, lo // 24, hi // 24),
+        )
+    }
+    if missing:
+        conn.executemany(
+            "INSERT INTO daily_stats (day, screen_time_seconds, mouse_clicks, keystrokes) VALUES (?, ?, ?, ?)",
+            [(day, *totals) for day, totals in missing.items()],
+        )
+        rollups.add_daily_deltas(conn, missing)
+
+    conn.execute("DELETE FROM minute_stats WHERE day >= ? AND day < ?", (lo // 24, hi // 24))
+    return conn.execute("DELETE FROM hourly_stats WHERE hour >= ? AND hour < ?", (lo, hi)).rowcount
+
+
+def fold_keys_batch(conn, cutoff, batch_days=BATCH_DAYS):
+    """
+    把 cutoff 之前最早 batch_days 天的按键计数向量按月累加进 keyboard_monthly 并删除，
+    返回删除的天数（0 表示已处理完）。
+    """
+    first_day = conn.execute("SELECT MIN(day) FROM keyboard_daily WHERE day < ?", (cutoff,)).fetchone()[0]
+    if first_day is None:
+        return 0
+    last_day = min(first_day + batch_days, cutoff)
+
+    per_month = defaultdict(list)
+    for day, blob in conn.execute(
+        "SELECT day, counts FROM keyboard_daily WHERE day >= ? AND day < ?", (first_day, last_day)
+    ):
+        per_month[month_key_from_day(day)].append(blob)
+
+    conn.executemany(
+        """
+        INSERT INTO keyboard_monthly (month, key_id, count)
+        VALUES (?, ?, ?)
+        ON CONFLICT(month, key_id) DO UPDATE SET
+            count = count + excluded.count
+        """,
+        [
+            (month, key_id, count)
+            for month, blobs in per_month.items()
+            for key_id, count in keyvectors.nonzero_items(keyvectors.sum_blobs(blobs))
+        ],
+    )
+    return conn.execute("DELETE FROM keyboard_daily WHERE day >= ? AND day < ?", (first_day, last_day)).rowcount
+
+
+def page_stats(conn):
+    """(page_size, page_count, freelist_count)"""
+    return tuple(conn.execute(f"PRAGMA {name}").fetchone()[0] for name in ("page_size", "page_count", "freelist_count"))
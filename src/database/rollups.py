@@ -0,0 +1,133 @@
+# 文件路径: database/rollups.py
+"""
+daily_stats 与 monthly_stats / yearly_stats 汇总表。
+
+daily_stats 由 hourly_stats 上的触发器维护（迁移 v11 创建）：写路径只写 hourly_stats，
+每次插入 / 更新的差值在同一条语句里累加到当天的行，两张表不会再出现不一致。
+hourly_stats 的删除（保留策略折叠旧的小时明细）不影响 daily_stats。
+
+写路径在同一个事务里调用 add_daily_deltas()，把每日增量同时累加到月表和年表；
+rebuild() 从 daily_stats 重新计算两张汇总表，check() 对比两者是否一致。
+"""
+from .timekeys import SQL_DAY_TO_MONTH, month_key_from_day
+
+ROLLUP_TABLES = ("monthly_stats", "yearly_stats")
+
+# 浮点累加（screen_time_seconds 为 REAL）允许的误差
+_TOLERANCE = 1e-6
+
+
+def add_daily_deltas(conn, daily):
+    """
+    daily: {day: (sec, clicks, keys)}
+    把每日增量累加进月表与年表（调用方负责事务）。
+    """
+    monthly = {}
+    for day, (sec, clicks, keys) in daily.items():
+        total = monthly.setdefault(month_key_from_day(day), [0, 0, 0])
+        total[0] += sec
+        total[1] += clicks
+        total[2] += keys
+
+    yearly = {}
+    for month, (sec, clicks, keys) in monthly.items():
+        total = yearly.setdefault(month // 12, [0, 0, 0])
+        total[0] += sec
+        total[1] += clicks
+        total[2] += keys
+
+    conn.executemany(
+        """
+        INSERT INTO monthly_stats (month, screen_time_seconds, mouse_clicks, keystrokes)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(month) DO UPDATE SET
+            screen_time_seconds = screen_time_seconds + excluded.screen_time_seconds,
+            mouse_clicks        = mouse_clicks        + excluded.mouse_clicks,
+            keystrokes          = keystrokes          + excluded.keystrokes
+        """,
+        [(m, *v) for m, v in monthly.items()],
+    )
+    conn.executemany(
+        """
+        INSERT INTO yearly_stats (year, screen_time_seconds, mouse_clicks, keystrokes)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(year) DO UPDATE SET
+            screen_time_seconds = screen_time_seconds + excluded.screen_time_seconds,
+            mouse_clicks        = mouse_clicks        + excluded.mouse_clicks,
+            keystrokes          = keystrokes          + excluded.keystrokes
+        """,
+        [(y, *v) for y, v in yearly.items()],
+    )
+
+
+def rebuild(conn):
+    """从 daily_stats 重新计算月表与年表（调用方负责事务；两张表由迁移 v3 创建）"""
+    conn.execute("DELETE FROM monthly_stats")
+    conn.execute("DELETE FROM yearly_stats")
+    conn.execute(
+        f"""
+        INSERT INTO monthly_stats (month, screen_time_seconds, mouse_clicks, keystrokes)
+        SELECT {SQL_DAY_TO_MONTH.format(col="day")},
+               SUM(screen_time_seconds), SUM(mouse_clicks), SUM(keystrokes)
+        FROM daily_stats
+        GROUP BY 1
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO yearly_stats (year, screen_time_seconds, mouse_clicks, keystrokes)
+        SELECT month / 12, SUM(screen_time_seconds), SUM(mouse_clicks), SUM(keystrokes)
+        FROM monthly_stats
+        GROUP BY 1
+        """
+    )
+
+
+def check(conn):
+    """
+    对比汇总表与 daily_stats 重新计算的结果。
+    返回不一致的条目列表：[(table, key, expected, actual), ...]，一致时为空列表。
+    expected / actual 为 (sec, clicks, keys)，缺失的一方为 None。
+    """
+    expected_monthly = {
+        row[0]: row[1:]
+        for row in conn.execute(
+            f"""
+            SELECT {SQL_DAY_TO_MONTH.format(col="day")},
+                   SUM(screen_time_seconds), SUM(mouse_clicks), SUM(keystrokes)
+            FROM daily_stats
+            GROUP BY 1
+            """
+        )
+    }
+    expected_yearly = {}
+    for month, (sec, clicks, keys) in expected_monthly.items():
+        total = expected_yearly.setdefault(month // 12, [0, 0, 0])
+        total[0] += sec or 0
+        total[1] += clicks or 0
+        total[2] += keys or 0
+
+    problems = []
+    for table, key_col, expected in (
+            ("monthly_stats", "month", expected_monthly),
+            ("yearly_stats", "year", expected_yearly),
+    ):
+        actual = {
+            row[0]: row[1:]
+            for row in conn.execute(
+                f"SELECT {key_col}, screen_time_seconds, mouse_clicks, keystrokes FROM {table}"
+            )
+        }
+        for key in sorted(set(expected) | set(actual)):
+            exp = tuple(expected[key]) if key in expected else None
+            act = tuple(actual[key]) if key in actual else None
+            if not _same(exp, act):
+                problems.append((table, key, exp, act))
+    return problems
+
+
+def _same(expected, actual):
+    zero = (0, 0, 0)
+    expected = expected or zero
+    actual = actual or zero
+    return all(abs((e or 0) - (a or 0)) <= _TOLERANCE for e, a in zip(expected, actual))
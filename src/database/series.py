@@ -0,0 +1,162 @@
+# 文件路径: database/series.py
+"""
+通用时间序列：按 小时 / 天 / 周 / 月 / 年 聚合的指标数组。
+
+每种粒度的桶键都是连续整数，聚合在 SQL 中沿主键做区间扫描完成：
+    hour   epoch-hour                    hourly_stats
+    day    epoch-day                     daily_stats
+    week   epoch-week（周一开始）       daily_stats 按 (day + 3) / 7 分组
+    month  year * 12 + (month - 1)       monthly_stats
+    year   年份                          yearly_stats
+查询结果由 np.fromiter() 读入结构化数组，再散射到补零的连续数组；
+晚于当前时刻的桶用 future 掩码标出（数值为 0）。
+"""
+from collections import namedtuple
+from datetime import date, datetime
+
+import numpy as np
+
+from .timekeys import date_from_day, day_key, month_key
+
+GRANULARITIES = ("hour", "day", "week", "month", "year")
+
+# 指标名 -> (列名, dtype)
+METRICS = {
+    "screen_time": ("screen_time_seconds", np.float64),
+    "clicks": ("mouse_clicks", np.int64),
+    "keys": ("keystrokes", np.int64),
+}
+
+# 各粒度读取的表及其键列（week 由 daily_stats 分组得到）
+SOURCES = {
+    "hour": ("hourly_stats", "hour"),
+    "day": ("daily_stats", "day"),
+    "week": ("daily_stats", "day"),
+    "month": ("monthly_stats", "month"),
+    "year": ("yearly_stats", "year"),
+}
+
+# index 为各粒度的桶键，values 为 {指标名: 数组}，future 为晚于当前时刻的桶
+Series = namedtuple("Series", ["granularity", "index", "values", "future"])
+
+# 1970-01-01 是周四，(day + 3) // 7 使每周从周一开始
+_WEEK_OFFSET = 3
+
+
+# ======================================================
+# 桶键
+# ======================================================
+def bucket(granularity, day, hour=0):
+    """epoch-day（以及小时）所在的桶键"""
+    if granularity == "hour":
+        return day * 24 + hour
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return (day + _WEEK_OFFSET) // 7
+    month = month_key(date_from_day(day))
+    return month if granularity == "month" else month // 12
+
+
+def bounds(granularity, start, end):
+    """
+    [start, end]（date / datetime / 'YYYY-MM-DD'，闭区间）覆盖的第一个、最后一个桶键，
+    以及最后一个桶的最后一天（epoch-day，用于读缓存的作用域）。
+    """
+    first_day, last_day = day_key(start), day_key(end)
+    if granularity == "hour":
+        return first_day * 24, last_day * 24 + 23, last_day
+    first, last = bucket(granularity, first_day), bucket(granularity, last_day)
+    return first, last, last_bucket_day(granularity, last)
+
+
+def last_bucket_day(granularity, key):
+    """桶的最后一天（epoch-day）"""
+    if granularity == "hour":
+        return key // 24
+    if granularity == "day":
+        return key
+    if granularity == "week":
+        return key * 7 - _WEEK_OFFSET + 6
+    if granularity == "year":
+        key = key * 12 + 11
+    next_month = key + 1
+    return day_key(date(next_month // 12, next_month % 12 + 1, 1)) - 1
+
+
+def current_bucket(granularity, now=None):
+    now = now or datetime.now()
+    return bucket(granularity, day_key(now), now.hour)
+
+
+# ======================================================
+# 查询（调用方提供只读连接）
+# ======================================================
+def _query(granularity, columns):
+    sums = ", ".join(f"IFNULL(SUM({c}), 0)" for c in columns)
+    if granularity == "week":
+        return f"""
+            SELECT (day + {_WEEK_OFFSET}) / 7, {sums}
+            FROM daily_stats
+            WHERE day BETWEEN ? AND ?
+            GROUP BY 1
+            ORDER BY 1
+        """
+    table, key_col = SOURCES[granularity]
+    values = ", ".join(f"IFNULL({c}, 0)" for c in columns)
+    return f"""
+        SELECT {key_col}, {values}
+        FROM {table}
+        WHERE {key_col} BETWEEN ? AND ?
+        ORDER BY {key_col}
+    """
+
+
+def read_rows(conn, granularity, metrics, first, last):
+    """
+    [first, last] 桶键闭区间内有数据的桶，返回只读的结构化数组（字段 index + 各指标）。
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    columns = [METRICS[m][0] for m in metrics]
+    params = (first, last)
+    if granularity == "week":
+        # 周键换算成 daily_stats 上的日期区间
+        params = (first * 7 - _WEEK_OFFSET, last * 7 - _WEEK_OFFSET + 6)
+    dtype = np.dtype([("index", np.int64), *((m, METRICS[m][1]) for m in metrics)])
+    rows = np.fromiter(conn.execute(_query(granularity, columns), params), dtype=dtype)
+    rows.flags.writeable = False
+    return rows
+
+
+def dense(granularity, rows, metrics, first, last, now=None):
+    """把稀疏的行散射到 [first, last] 上连续的数组，缺失的桶补 0，未来的桶置 0 并标入 future"""
+    size = max(last - first + 1, 0)
+    index = np.arange(first, first + size, dtype=np.int64)
+    values = {m: np.zeros(size, dtype=METRICS[m][1]) for m in metrics}
+    if len(rows):
+        pos = rows["index"] - first
+        for m in metrics:
+            values[m][pos] = rows[m]
+    future = index > current_bucket(granularity, now)
+    for m in metrics:
+        values[m][future] = 0
+    return Series(granularity, index, values, future)
+
+
+def add_deltas(series, deltas):
+    """
+    deltas: {桶键: (sec, clicks, keys)}，例如写缓冲中未刷盘的增量
+    就地累加到 series 中（范围外和未来的桶忽略）。
+    """
+    if not deltas or not len(series.index):
+        return series
+    first = series.index[0]
+    size = len(series.index)
+    for key, totals in deltas.items():
+        pos = key - first
+        if 0 <= pos < size and not series.future[pos]:
+            for m, value in zip(METRICS, totals):
+                if m in series.values:
+                    series.values[m][pos] += value
+    return series
@@ -1,380 +1,858 @@
+import json
+import os
 import sqlite3
-from datetime import date, timedelta, datetime
+import threading
+from datetime import date, timedelta, datetime, time
+
+import numpy as np
+
+from . import arrays, export, importer, keyvectors, merge, minutes, retention, rollups, series, synthetic
+from .buffer import WriteBuffer
+from .cache import QueryCache
+from .connection import ConnectionManager
+from .journal import JOURNAL_SUFFIX, SETTING_JOURNAL_SEQ, DeltaJournal
+from .migrations import migrate
+from .names import NameDictionary
+from .profiler import SLOW_MS, QueryProfiler
+from .snapshot import SNAPSHOT_INTERVAL, Snapshotter, previous_session
+from .timekeys import (
+    SQL_DAY_TO_DATE, date_from_day, date_str_from_day, day_key, to_date, year_bounds,
+)
+from .writer import DatabaseWriter
 
 DB_NAME = "activity_data.db"
 
+# 各类写操作涉及的表（用于读缓存失效）
+STATS_TABLES = ("daily_stats", "hourly_stats", *rollups.ROLLUP_TABLES)
+DELTA_TABLES = (*STATS_TABLES, "minute_stats", "app_stats", "keyboard_daily", "events")
+
 
 class DatabaseManager:
-    def __init__(self, db_name=DB_NAME):
+    def __init__(self, db_name=DB_NAME, in_memory=False, snapshot_interval=SNAPSHOT_INTERVAL,
+                 profile=False, slow_query_ms=SLOW_MS, journal=False):
         self.db_name = db_name
+        # 每线程长连接（WAL + 预编译语句缓存）；in_memory=True 时指向启动时载入的内存数据库
+        self.connections = ConnectionManager(db_name, in_memory=in_memory)
+        # 单写线程：所有写操作排队执行；UI 查询走只读连接池
+        self.writer = DatabaseWriter(self.connections)
+        # MonitorService 的写缓冲；读取「今天」的查询会合并其中未刷盘的增量
+        self.buffer = WriteBuffer(self)
+        # 读缓存：写事务提交后按表失效
+        self.cache = QueryCache()
+        # 应用名 / 按键名 <-> 整数 id（事实表只存 id，见 names.py）
+        self.app_names = NameDictionary("apps")
+        self.key_names = NameDictionary("keys")
+        # 内存模式：定时（以及退出时）用 backup API 把内存数据库写回 db_name
+        self.snapshotter = Snapshotter(self, snapshot_interval) if in_memory else None
+        # 按方法计时 + 慢查询日志（profile=True 时启用，见 profiler.py）
+        self.profiler = None
+        if profile:
+            self.profiler = QueryProfiler(self, slow_query_ms)
+            self.profiler.instrument()
+        # 写缓冲的崩溃恢复日志 <db_name>.deltas（journal=True 时在 init_db() 中打开并重放）
+        self.use_journal = journal
+        # 迁移是否已执行：没有先调用 init_db() 就读写时，在第一次访问数据库前执行一次
+        self._migrated = False
+        self._init_lock = threading.RLock()
 
     def _get_connection(self):
-        return sqlite3.connect(self.db_name)
+        # 返回的是当前线程的长连接；`with conn:` 只负责提交/回滚，不会关闭连接。
+        # 写操作只在写线程里调用它
+        return self.connections.get()
+
+    def _reader(self):
+        # 只读连接（上下文管理器），用完自动归还连接池
+        self._ensure_migrated()
+        return self.connections.reader()
+
+    def _ensure_migrated(self):
+        # 读取未迁移的旧库（整数 day 列还不存在）之前先执行待处理的迁移
+        if not self._migrated:
+            with self._init_lock:
+                if not self._migrated:
+                    self.init_db()
+
+    def close(self, timeout=5.0):
+        """
+        停止写线程并关闭所有长连接（程序退出时调用）；内存模式下先写最后一次快照。
+        timeout: 等待写线程处理完队列的秒数；超时后不关闭写线程正在使用的连接
+        """
+        if self.profiler is not None and self.profiler.report():
+            self.dump_query_report()
+        if self.snapshotter is not None:
+            self.snapshotter.stop()
+            self.snapshotter.snapshot(final=True)
+        if self.writer.stop(timeout):
+            self.connections.close_all()
+        else:
+            # 写线程仍在执行命令：它的连接由它退出时自己关闭（见 DatabaseWriter._run）
+            self.connections.close_all(keep=self.writer.thread)
+        self.buffer.close_journal()
+
+    def metrics(self):
+        """写队列深度、等锁时间以及只读连接池状态"""
+        result = {"writer": self.writer.metrics(), "readers": self.connections.metrics()}
+        if self.snapshotter is not None:
+            result["snapshot"] = self.snapshotter.status()
+        return result
+
+    def query_report(self):
+        """
+        按方法统计的调用次数 / 耗时分位数 / 行数以及慢查询日志；未启用 profile 时返回 None。
+        {"methods": [...], "slow": [...]}
+        """
+        if self.profiler is None:
+            return None
+        return {"methods": self.profiler.report(), "slow": self.profiler.slow_queries()}
+
+    def dump_query_report(self, path=None):
+        """输出调试报告：path 为空时打印文本，否则写入 JSON 文件"""
+        if self.profiler is None:
+            print("Query profiling is not enabled.")
+            return
+        if path is None:
+            print(self.profiler.format_report())
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.query_report(), f, ensure_ascii=False, indent=2)
+
+    def snapshot_status(self):
+        """内存模式下的快照状态（最近一次快照、可能丢失的最长时长等）；非内存模式返回 None"""
+        return None if self.snapshotter is None else self.snapshotter.status()
+
+    def _submit_write(self, tables, fn, *args, days=None):
+        """
+        把写命令交给写线程，事务提交后使 tables 相关的读缓存失效。
+        days: 写入涉及的 epoch-day（None 表示未知）。返回 Future。
+        """
+        self._ensure_migrated()
+        # 在写线程中、Future 完成之前使缓存失效：写入方拿到结果后立即读取也不会命中旧条目
+        return self.writer.submit(fn, *args, after=lambda error: self._after_write(error, tables, days))
+
+    def _after_write(self, error, tables, days):
+        self.cache.bump(*tables, days=days)
+        if error is not None:
+            # 事务已回滚：字典缓存里可能有未提交的 id
+            self.app_names.reset()
+            self.key_names.reset()
+
+    def _write(self, tables, fn, *args, days=None):
+        """同步版本的 _submit_write()，返回命令的结果"""
+        return self._submit_write(tables, fn, *args, days=days).result()
 
     # ======================================================
     # 初始化数据库
     # ======================================================
     def init_db(self):
+        with self._init_lock:
+            self.writer.call(self._init_db)
+            # 之后的日志重放 / 快照会读写数据库，此时迁移已经完成
+            self._migrated = True
+        self.cache.clear()
+        if self.use_journal:
+            self._open_journal()
+        if self.snapshotter is not None:
+            # 启动后立即写一次快照：磁盘文件随即带上迁移结果和「未正常退出」标记
+            self.snapshotter.snapshot()
+            self.snapshotter.start()
+            print(
+                f"In-memory database: snapshot every {self.snapshotter.interval}s, "
+                f"up to {self.snapshotter.max_loss_seconds():.0f}s of data may be lost on a crash."
+            )
+
+    def _open_journal(self):
+        """打开崩溃恢复日志，把上次没有写入数据库的增量重放进写缓冲并立即刷盘"""
+        journal = DeltaJournal(f"{self.db_name}{JOURNAL_SUFFIX}")
+        # 内存模式下刷盘只写到内存数据库，要等快照写回磁盘后才能截断日志
+        self.buffer.open_journal(journal, truncate_on_flush=self.snapshotter is None)
+        replayed = self.buffer.replay_journal(self.writer.call(self._journal_seq))
+        if replayed:
+            try:
+                self.buffer.flush()
+            except sqlite3.Error:
+                # 错误已由 WriteBuffer 输出，增量仍在缓冲区和日志中
+                return
+            print(f"Recovered {replayed} unsaved activity records from {journal.path}.")
+
+    def _journal_seq(self):
+        conn = self._get_connection()
+        row = conn.execute("SELECT value FROM settings WHERE key = ?", (SETTING_JOURNAL_SEQ,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _init_db(self):
+        # 建表 / 升级表结构都由带版本号的迁移完成（见 migrations.py）
         with self._get_connection() as conn:
-            cursor = conn.cursor()
+            applied = migrate(conn)
+            if self.snapshotter is not None:
+                snapshot_at, clean = previous_session(conn)
+                if not clean and not self.use_journal:
+                    print(f"Previous session did not shut down cleanly; data after the snapshot at "
+                          f"{snapshot_at} was lost.")
+        if applied:
+            print(f"Database migrated to schema version {applied[-1]}.")
 
-            # 每日汇总
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS daily_stats (
-                    date TEXT PRIMARY KEY,
-                    screen_time_seconds REAL DEFAULT 0,
-                    mouse_clicks INTEGER DEFAULT 0,
-                    keystrokes INTEGER DEFAULT 0
-                )
-                """
-            )
+    # ======================================================
+    # 写入 / 更新
+    # ======================================================
+    def update_stats(self, add_time=0, add_clicks=0, add_keys=0):
+        """
+        更新今日当前分钟的统计（与写缓冲刷盘走同一条写路径：minute_stats / hourly_stats / 汇总表，
+        daily_stats 由触发器同步累加）。
+        add_time 单位：秒
+        """
+        now = datetime.now()
+        minute_deltas = {(str(now.date()), now.hour * 60 + now.minute): (add_time, add_clicks, add_keys)}
+        self._write((*STATS_TABLES, "minute_stats"), self._apply_deltas, minute_deltas, {}, {},
+                    days=(day_key(now),))
 
-            # 每日每应用使用时长
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS app_stats (
-                    date TEXT,
-                    app_name TEXT,
-                    duration_seconds REAL DEFAULT 0,
-                    PRIMARY KEY (date, app_name)
-                )
-                """
-            )
+    def update_app_usage(self, app_name, duration_delta):
+        today = day_key(date.today())
+        self._write(("app_stats",), self._update_app_usage, today, app_name, duration_delta, days=(today,))
 
-            # 设置表（例如 daily_goal）
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS settings (
-                    key TEXT PRIMARY KEY,
-                    value TEXT
-                )
+    def _update_app_usage(self, today, app_name, duration_delta):
+        with self._get_connection() as conn:
+            app_id = self.app_names.ids(conn, (app_name,))[app_name]
+            conn.execute(
                 """
+                INSERT INTO app_stats (day, app_id, duration_seconds)
+                VALUES (?, ?, ?)
+                ON CONFLICT(day, app_id) DO UPDATE SET
+                    duration_seconds = duration_seconds + excluded.duration_seconds
+                """,
+                (today, app_id, duration_delta),
             )
 
-            # 键盘热力图
-            cursor.execute(
+    def update_key_counts(self, key_counts_dict):
+        if not key_counts_dict:
+            return
+        today = day_key(date.today())
+        self._write(("keyboard_daily",), self._update_key_counts, today, key_counts_dict, days=(today,))
+
+    def _update_key_counts(self, today, key_counts_dict):
+        with self._get_connection() as conn:
+            ids = self.key_names.ids(conn, key_counts_dict)
+            keyvectors.add_daily(conn, {(today, ids[key]): count for key, count in key_counts_dict.items()})
+
+    def apply_deltas(self, minute_deltas, apps, keys, events=(), journal_seq=None):
+        """
+        在一个事务中写入 WriteBuffer 合并好的增量。
+        minute_deltas: {(date_str, minute): (sec, clicks, keys)}，minute 为当天第几分钟
+        apps:   {(date_str, app_name): sec}
+        keys:   {(date_str, key_name): count}
+        events: [(FocusEvent, end_ts), ...] 新建或延长过的焦点区间
+        journal_seq: 批次中最大的崩溃恢复日志序号，与增量在同一个事务里写入 settings
+        hourly_stats 由 minute_deltas 按小时汇总得到，daily_stats 由 hourly_stats 的触发器累加。
+        """
+        self.submit_deltas(minute_deltas, apps, keys, events, journal_seq).result()
+
+    def submit_deltas(self, minute_deltas, apps, keys, events=(), journal_seq=None):
+        """apply_deltas 的异步版本，返回 Future（采集线程不等待写库）"""
+        days = {day_key(d) for d, _ in (*minute_deltas, *apps, *keys)}
+        days.update(day_key(datetime.fromtimestamp(end_ts)) for _, end_ts in events)
+        return self._submit_write(DELTA_TABLES, self._apply_deltas, minute_deltas, apps, keys, events, journal_seq,
+                                  days=days)
+
+    def _apply_deltas(self, minute_deltas, apps, keys, events=(), journal_seq=None):
+        daily = {}
+        hourly = {}
+        per_minute = {}
+        for (date_str, minute), values in minute_deltas.items():
+            day = day_key(date_str)
+            per_minute[(day, minute)] = values
+            for totals in (daily.setdefault(day, [0, 0, 0]), hourly.setdefault(day * 24 + minute // 60, [0, 0, 0])):
+                totals[0] += values[0]
+                totals[1] += values[1]
+                totals[2] += values[2]
+
+        with self._get_connection() as conn:
+            rollups.add_daily_deltas(conn, daily)
+            # daily_stats 由触发器按小时的增量累加
+            conn.executemany(
                 """
-                CREATE TABLE IF NOT EXISTS keyboard_stats (
-                    date TEXT,
-                    key_name TEXT,
-                    count INTEGER DEFAULT 0,
-                    PRIMARY KEY (date, key_name)
-                )
+                INSERT INTO hourly_stats (hour, screen_time_seconds, mouse_clicks, keystrokes)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(hour) DO UPDATE SET
+                    screen_time_seconds = screen_time_seconds + excluded.screen_time_seconds,
+                    mouse_clicks        = mouse_clicks        + excluded.mouse_clicks,
+                    keystrokes          = keystrokes          + excluded.keystrokes
+                """,
+                [(h, *v) for h, v in hourly.items()],
+            )
+            # 按分钟的数组：每天一行，一次读 + 一次写
+            minutes.add_daily(conn, per_minute)
+            app_ids = self.app_names.ids(conn, (name for _, name in apps))
+            conn.executemany(
                 """
+                INSERT INTO app_stats (day, app_id, duration_seconds)
+                VALUES (?, ?, ?)
+                ON CONFLICT(day, app_id) DO UPDATE SET
+                    duration_seconds = duration_seconds + excluded.duration_seconds
+                """,
+                [(day_key(d), app_ids[name], sec) for (d, name), sec in apps.items()],
             )
+            # 按键计数：每天一行向量，一次读 + 一次写
+            key_ids = self.key_names.ids(conn, (name for _, name in keys))
+            keyvectors.add_daily(conn, {(day_key(d), key_ids[name]): count for (d, name), count in keys.items()})
+            self._write_events(conn, events)
+            if journal_seq is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                    (SETTING_JOURNAL_SEQ, str(journal_seq)),
+                )
 
-            # 小时粒度统计（用于 Daily Activity 24h 图）
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS hourly_stats (
-                    date TEXT,
-                    hour INTEGER,
-                    screen_time_seconds REAL DEFAULT 0,
-                    mouse_clicks INTEGER DEFAULT 0,
-                    keystrokes INTEGER DEFAULT 0,
-                    PRIMARY KEY (date, hour)
+    def _write_events(self, conn, events):
+        """已写过的区间只更新 end_ts，其余插入新行并记下 row_id"""
+        for event, end_ts in events:
+            if event.row_id is not None:
+                # 连同 app_name / start_ts 一起匹配：之前的事务若回滚过，row_id 可能已被别的行占用
+                cursor = conn.execute(
+                    """
+                    UPDATE events SET end_ts = MAX(end_ts, ?)
+                    WHERE id = ? AND app_name = ? AND start_ts = ?
+                    """,
+                    (end_ts, event.row_id, event.app_name, event.start_ts),
                 )
-                """
+                if cursor.rowcount:
+                    continue
+            cursor = conn.execute(
+                "INSERT INTO events (app_name, start_ts, end_ts) VALUES (?, ?, ?)",
+                (event.app_name, event.start_ts, end_ts),
             )
+            event.row_id = cursor.lastrowid
 
-            # 默认每日目标 4 小时
-            cursor.execute(
-                "INSERT OR IGNORE INTO settings (key, value) VALUES ('daily_goal', '4.0')"
-            )
+    # ======================================================
+    # 月 / 年汇总表维护
+    # ======================================================
+    def rebuild_rollups(self):
+        """从 daily_stats 重新计算 monthly_stats / yearly_stats，返回重建后的校验结果"""
+        return self._write(rollups.ROLLUP_TABLES, self._rebuild_rollups)
 
-            conn.commit()
+    def _rebuild_rollups(self):
+        with self._get_connection() as conn:
+            rollups.rebuild(conn)
+            return rollups.check(conn)
+
+    def check_rollups(self):
+        """
+        校验汇总表与 daily_stats 是否一致。
+        返回 [(table, key, expected, actual), ...]，一致时为空列表。
+        """
+        with self._reader() as conn:
+            return rollups.check(conn)
 
     # ======================================================
-    # 写入 / 更新
+    # 历史数据保留 / 降采样
     # ======================================================
-    def update_stats(self, add_time=0, add_clicks=0, add_keys=0):
+    def get_retention_policy(self):
+        with self._reader() as conn:
+            return retention.RetentionPolicy.from_settings(conn)
+
+    def set_retention_policy(self, policy):
+        self._ensure_migrated()
+        self.writer.call(self._save_retention_policy, policy)
+
+    def _save_retention_policy(self, policy):
+        with self._get_connection() as conn:
+            policy.save(conn)
+
+    def apply_retention(self, policy=None, vacuum=False):
         """
-        更新今日的总统计 + 小时统计。
-        add_time 单位：秒
+        按保留策略降采样旧数据。每个批次是一条独立的写命令（短事务），
+        批次之间采集线程的刷盘可以插队执行。
+        vacuum=True 时最后执行 VACUUM 把空闲页归还给文件系统（会短暂独占数据库）。
+        返回报告 dict：删除的行数、批次数、释放的字节数等。
         """
-        now = datetime.now()
-        today_str = now.date().isoformat()
-        current_hour = now.hour
+        policy = policy or self.get_retention_policy()
+        report = {"hourly_rows": 0, "key_days": 0, "batches": 0}
+        with self._reader() as conn:
+            page_size, pages_before, free_before = retention.page_stats(conn)
+
+        hourly_cutoff = policy.hourly_cutoff()
+        while hourly_cutoff is not None:
+            deleted = self._write(("hourly_stats", *STATS_TABLES), self._fold_hourly_batch,
+                                  hourly_cutoff, policy.batch_days)
+            if not deleted:
+                break
+            report["hourly_rows"] += deleted
+            report["batches"] += 1
+
+        keys_cutoff = policy.keys_cutoff()
+        while keys_cutoff is not None:
+            deleted = self._write(("keyboard_daily", "keyboard_monthly"), self._fold_keys_batch,
+                                  keys_cutoff, policy.batch_days)
+            if not deleted:
+                break
+            report["key_days"] += deleted
+            report["batches"] += 1
+
+        if vacuum:
+            self.writer.call(self._vacuum)
+
+        with self._reader() as conn:
+            _, pages_after, free_after = retention.page_stats(conn)
+        # 未 VACUUM 时删除的行只会变成文件内的空闲页（之后的写入会复用）；VACUUM 后文件变小
+        report["freed_bytes"] = max(free_after - free_before, 0) * page_size
+        report["reclaimed_bytes"] = max(pages_before - pages_after, 0) * page_size
+        report["file_bytes"] = pages_after * page_size
+        return report
+
+    def _fold_hourly_batch(self, cutoff, batch_days):
+        with self._get_connection() as conn:
+            return retention.fold_hourly_batch(conn, cutoff, batch_days)
 
+    def _fold_keys_batch(self, cutoff, batch_days):
         with self._get_connection() as conn:
-            cursor = conn.cursor()
+            return retention.fold_keys_batch(conn, cutoff, batch_days)
 
-            # --- 更新 daily_stats ---
-            try:
-                cursor.execute(
-                    """
-                    INSERT INTO daily_stats (date, screen_time_seconds, mouse_clicks, keystrokes)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (today_str, add_time, add_clicks, add_keys),
-                )
-            except sqlite3.IntegrityError:
-                cursor.execute(
-                    """
-                    UPDATE daily_stats
-                    SET screen_time_seconds = screen_time_seconds + ?,
-                        mouse_clicks        = mouse_clicks        + ?,
-                        keystrokes          = keystrokes          + ?
-                    WHERE date = ?
-                    """,
-                    (add_time, add_clicks, add_keys, today_str),
-                )
+    def _vacuum(self):
+        conn = self._get_connection()
+        # VACUUM 不能在事务中执行：先结束写线程开启的事务
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
-            # --- 更新 hourly_stats（用于 24h 图） ---
+    # ======================================================
+    # 多机合并
+    # ======================================================
+    def merge_from(self, path):
+        """
+        把另一台机器的数据库合并进来（见 merge.py），重复合并同一个文件不会重复计入。
+        返回合并报告 dict。
+        """
+        self._ensure_migrated()
+        attach_path, temp_path, source_id = merge.prepare_source(path)
+        try:
+            report = self.writer.call(self._merge_from, attach_path, path, source_id)
+        finally:
+            if temp_path is not None:
+                os.remove(temp_path)
+        if report["status"] == "merged":
+            self.cache.bump(*merge.MERGE_TABLES)
+        return report
+
+    def _merge_from(self, attach_path, path, source_id):
+        conn = self._get_connection()
+        # ATTACH 不能在事务中执行：先结束写线程开启的事务，挂载后再重新加写锁
+        conn.commit()
+        conn.execute("ATTACH DATABASE ? AS src", (attach_path,))
+        try:
+            conn.execute("BEGIN IMMEDIATE")
             try:
-                cursor.execute(
-                    """
-                    INSERT INTO hourly_stats (date, hour, screen_time_seconds, mouse_clicks, keystrokes)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (today_str, current_hour, add_time, add_clicks, add_keys),
-                )
-            except sqlite3.IntegrityError:
-                cursor.execute(
-                    """
-                    UPDATE hourly_stats
-                    SET screen_time_seconds = screen_time_seconds + ?,
-                        mouse_clicks        = mouse_clicks        + ?,
-                        keystrokes          = keystrokes          + ?
-                    WHERE date = ? AND hour = ?
-                    """,
-                    (add_time, add_clicks, add_keys, today_str, current_hour),
-                )
-
+                report = merge.merge_attached(conn, path, source_id)
+            except BaseException:
+                conn.rollback()
+                raise
             conn.commit()
+        finally:
+            conn.execute("DETACH DATABASE src")
+        return report
 
-    def update_app_usage(self, app_name, duration_delta):
-        today_str = str(date.today())
+    # ======================================================
+    # 从其他工具导入
+    # ======================================================
+    def import_history(self, path, mapping=importer.PRESETS["generic"], dry_run=False,
+                       batch_records=importer.BATCH_RECORDS, progress=None):
+        """
+        流式导入其他记录工具导出的 CSV / JSON 文件（见 importer.py）。每批记录是一条独立的写命令（短事务），
+        批次之间采集线程的刷盘可以插队执行；中断后再次导入同一个文件会从上次提交的批次之后继续。
+        dry_run=True 时只解析和校验，不写数据库。
+        返回报告 dict，其中 status 为 "imported" / "dry_run" / "already_imported"。
+        """
+        source_id = importer.SOURCE_PREFIX + importer.file_digest(path)
+        with self._reader() as conn:
+            already = conn.execute("SELECT 1 FROM merged_sources WHERE source_id = ?", (source_id,)).fetchone()
+            records_done = importer.load_progress(conn, source_id)
+        if already is not None and not dry_run:
+            return {"status": "already_imported", "source_id": source_id}
+
+        if dry_run:
+            report = importer.import_file(path, mapping, batch_records=batch_records, progress=progress)
+            report["status"] = "dry_run"
+            report["already_imported"] = already is not None
+        else:
+            def write(hourly, apps, records):
+                return self._write((*STATS_TABLES, "app_stats"), self._import_batch, source_id, hourly, apps, records)
+
+            report = importer.import_file(path, mapping, write, batch_records=batch_records, progress=progress,
+                                          skip_records=records_done)
+            if report["imported"]:
+                self._write(("merged_sources",), self._finish_import, source_id, path, report["last_day"])
+            report["status"] = "imported"
+        report["source_id"] = source_id
+        return report
+
+    def _import_batch(self, source_id, hourly, apps, records_done):
         with self._get_connection() as conn:
-            cursor = conn.cursor()
-            try:
+            rows = importer.write_batch(conn, hourly, apps, self.app_names)
+            importer.save_progress(conn, source_id, records_done)
+            return rows
+
+    def _finish_import(self, source_id, path, last_day):
+        with self._get_connection() as conn:
+            importer.mark_imported(conn, source_id, path, last_day)
+
+    # ======================================================
+    # 合成数据
+    # ======================================================
+    def generate_synthetic(self, years=synthetic.YEARS, apps=synthetic.APPS, seed=synthetic.SEED, end=None,
+                           progress=None):
+        """
+        用合成的多年历史填充一个空数据库（见 synthetic.py），在一个事务中写入。
+        已有活动数据时抛出 synthetic.SyntheticError。返回 {表名: 行数}。
+        """
+        result = self._write(DELTA_TABLES, self._generate_synthetic, years, apps, seed, end, progress)
+        # 字典表与汇总表也一并写入，整个读缓存作废
+        self.cache.clear()
+        return result
+
+    def _generate_synthetic(self, years, apps, seed, end, progress):
+        with self._get_connection() as conn:
+            return synthetic.generate(conn, years=years, apps=apps, seed=seed, end=end, progress=progress)
+
+    # ======================================================
+    # 导出
+    # ======================================================
+    def export_data(self, path, tables=None, progress=None, cancel_event=None):
+        """
+        流式导出到 path（格式由扩展名决定：.csv / .jsonl，可再加 .gz / .xz），见 export.py。
+        先把写缓冲刷盘，保证导出包含最新的数据。在后台线程中调用。
+        """
+        self.buffer.flush()
+        with self._reader() as conn:
+            return export.export_tables(conn, path, tables=tables, progress=progress, cancel_event=cancel_event)
+
+    # ======================================================
+    # 读缓存
+    # ======================================================
+    def _cached(self, key, tables, loader, days=()):
+        """
+        通过 QueryCache 执行 loader()。
+        days: 查询覆盖的最晚 epoch-day；只覆盖过去日期的条目不随今天的写入失效、不过期，
+              包含今天的条目只短暂有效；未给出时条目随任何写入失效。
+        """
+        today = day_key(date.today())
+        past_only = bool(days) and all(d < today for d in days)
+        ttl = None if past_only or not days else self.cache.today_ttl
+        return self.cache.get_or_load(key, tables, loader, ttl=ttl, past_only=past_only)
+
+    def cache_stats(self):
+        """读缓存命中 / 未命中等统计"""
+        return self.cache.stats()
+
+    # ======================================================
+    # 合并写缓冲中未刷盘的增量
+    # ======================================================
+    def _with_pending_daily(self, date_str, row):
+        """row: (sec, clicks, keys) 或 None"""
+        sec, clicks, keys = row if row else (0, 0, 0)
+        p_sec, p_clicks, p_keys = self.buffer.pending_daily(date_str)
+        return (sec or 0) + p_sec, (clicks or 0) + p_clicks, (keys or 0) + p_keys
+
+    def _with_pending_daily_rows(self, rows, first_date_str, last_date_str):
+        """rows: [(date_str, sec, clicks, keys), ...] 按日期升序；返回合并后的新列表"""
+        pending = [d for d in self.buffer.pending_dates() if first_date_str <= d <= last_date_str]
+        if not pending:
+            return list(rows)
+        merged = {row[0]: row for row in rows}
+        for d in pending:
+            merged[d] = (d, *self._with_pending_daily(d, merged.get(d, (d, 0, 0, 0))[1:]))
+        return [merged[d] for d in sorted(merged)]
+
+    def _app_totals(self, day):
+        """{app_name: duration_seconds}（某天全部应用，已缓存）"""
+
+        def load():
+            with self._reader() as conn:
+                cursor = conn.cursor()
                 cursor.execute(
-                    """
-                    INSERT INTO app_stats (date, app_name, duration_seconds)
-                    VALUES (?, ?, ?)
-                    """,
-                    (today_str, app_name, duration_delta),
+                    "SELECT app_id, duration_seconds FROM app_stats WHERE day = ?",
+                    (day,),
                 )
-            except sqlite3.IntegrityError:
+                return dict(self.app_names.decode(conn, cursor.fetchall()))
+
+        return self._cached(("app_totals", day), ("app_stats",), load, days=(day,))
+
+    def _top_apps(self, date_str, limit):
+        day = day_key(date_str)
+        pending = self.buffer.pending_apps(date_str)
+        if pending:
+            totals = dict(self._app_totals(day))
+            for app_name, sec in pending.items():
+                totals[app_name] = (totals.get(app_name) or 0) + sec
+            return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+        def load():
+            with self._reader() as conn:
+                cursor = conn.cursor()
                 cursor.execute(
                     """
-                    UPDATE app_stats
-                    SET duration_seconds = duration_seconds + ?
-                    WHERE date = ? AND app_name = ?
+                    SELECT app_id, duration_seconds
+                    FROM app_stats
+                    WHERE day = ?
+                    ORDER BY duration_seconds DESC
+                    LIMIT ?
                     """,
-                    (duration_delta, today_str, app_name),
+                    (day, limit),
                 )
-            conn.commit()
+                return self.app_names.decode(conn, cursor.fetchall())
 
-    def update_key_counts(self, key_counts_dict):
-        if not key_counts_dict:
-            return
-        today_str = str(date.today())
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            for key, count in key_counts_dict.items():
-                try:
-                    cursor.execute(
-                        """
-                        INSERT INTO keyboard_stats (date, key_name, count)
-                        VALUES (?, ?, ?)
-                        """,
-                        (today_str, key, count),
-                    )
-                except sqlite3.IntegrityError:
-                    cursor.execute(
-                        """
-                        UPDATE keyboard_stats
-                        SET count = count + ?
-                        WHERE date = ? AND key_name = ?
-                        """,
-                        (count, today_str, key),
-                    )
-            conn.commit()
+        return list(self._cached(("top_apps", day, limit), ("app_stats",), load, days=(day,)))
 
     # ======================================================
     # 基础查询
     # ======================================================
     def get_today_stats(self):
         today_str = str(date.today())
-        with self._get_connection() as conn:
+        today = day_key(today_str)
+
+        def load():
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT screen_time_seconds, mouse_clicks, keystrokes
+                    FROM daily_stats
+                    WHERE day = ?
+                    """,
+                    (today,),
+                )
+                return cursor.fetchone()
+
+        row = self._cached(("daily", today), ("daily_stats",), load, days=(today,))
+        return self._with_pending_daily(today_str, row)
+
+    def get_all_data(self):
+        with self._reader() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                """
-                SELECT screen_time_seconds, mouse_clicks, keystrokes
+                f"""
+                SELECT {SQL_DAY_TO_DATE.format(col="day")}, screen_time_seconds, mouse_clicks, keystrokes
                 FROM daily_stats
-                WHERE date = ?
-                """,
-                (today_str,),
+                ORDER BY day
+                """
             )
-            row = cursor.fetchone()
-            return row if row else (0, 0, 0)
-
-    def get_all_data(self):
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM daily_stats ORDER BY date")
             return cursor.fetchall()
 
     def get_available_years(self):
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT DISTINCT substr(date, 1, 4) FROM daily_stats ORDER BY date DESC"
-            )
-            rows = cursor.fetchall()
-            years = [int(row[0]) for row in rows]
-            current_year = date.today().year
-            if current_year not in years:
-                years.insert(0, current_year)
-            return years
+        def load():
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                # 年表每年只有一行
+                cursor.execute("SELECT year FROM yearly_stats ORDER BY year DESC")
+                return [row[0] for row in cursor.fetchall()]
+
+        years = list(self._cached(("available_years",), ("yearly_stats",), load))
+        current_year = date.today().year
+        if current_year not in years:
+            years.insert(0, current_year)
+        return years
 
     def get_data_by_year(self, year):
         year_str = str(year)
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT * FROM daily_stats
-                WHERE date LIKE ?
-                ORDER BY date
-                """,
-                (f"{year_str}-%",),
-            )
-            return cursor.fetchall()
+        first_day, last_day = year_bounds(year)
+
+        def load():
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""
+                    SELECT {SQL_DAY_TO_DATE.format(col="day")}, screen_time_seconds, mouse_clicks, keystrokes
+                    FROM daily_stats
+                    WHERE day BETWEEN ? AND ?
+                    ORDER BY day
+                    """,
+                    (first_day, last_day),
+                )
+                return cursor.fetchall()
+
+        rows = self._cached(("year_rows", year), ("daily_stats",), load, days=(last_day,))
+        return self._with_pending_daily_rows(rows, f"{year_str}-01-01", f"{year_str}-12-31")
 
     # database.py
 
     def get_today_top_apps(self, limit=10):
-        today_str = str(date.today())
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT app_name, duration_seconds
-                FROM app_stats
-                WHERE date = ?
-                ORDER BY duration_seconds DESC
-                LIMIT ?
-                """,
-                (today_str, limit),
-            )
-            return cursor.fetchall()
+        return self._top_apps(str(date.today()), limit)
 
     def get_total_keyboard_heatmap(self):
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT key_name, SUM(count)
-                FROM keyboard_stats
-                GROUP BY key_name
-                """
-            )
-            rows = cursor.fetchall()
-            return {row[0]: row[1] for row in rows}
+        def load():
+            with self._reader() as conn:
+                # 按日向量逐位相加（O(天数)）+ 保留策略折叠出的按月计数
+                total = keyvectors.sum_blobs(row[0] for row in conn.execute("SELECT counts FROM keyboard_daily"))
+                heatmap = dict(self.key_names.decode(conn, keyvectors.nonzero_items(total)))
+                monthly = conn.execute("SELECT key_id, SUM(count) FROM keyboard_monthly GROUP BY key_id")
+                for key_name, count in self.key_names.decode(conn, monthly.fetchall()):
+                    heatmap[key_name] = heatmap.get(key_name, 0) + count
+                return heatmap
+
+        heatmap = dict(self._cached(("keyboard_heatmap",), ("keyboard_daily", "keyboard_monthly"), load))
+        for key_name, count in self.buffer.pending_keys().items():
+            heatmap[key_name] = (heatmap.get(key_name) or 0) + count
+        return heatmap
+
+    def get_events(self, date_str):
+        """
+        获取某天的前台应用焦点区间（与当天有重叠的区间，不做裁剪）。
+        返回列表: [(app_name, start_ts, end_ts), ...] 按 start_ts 升序，时间为 Unix 时间戳
+        """
+        day = day_key(date_str)
+        day_start = datetime.combine(date_from_day(day), time()).timestamp()
+        day_end = datetime.combine(date_from_day(day + 1), time()).timestamp()
+
+        def load():
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT id, app_name, start_ts, end_ts
+                    FROM events
+                    WHERE end_ts > ? AND start_ts < ?
+                    ORDER BY start_ts ASC
+                    """,
+                    (day_start, day_end),
+                )
+                return cursor.fetchall()
+
+        rows = {row[0]: row[1:] for row in self._cached(("events", day), ("events",), load, days=(day,))}
+
+        # 合并写缓冲中尚未写完的区间（已写过的以内存中的 end_ts 为准）
+        for row_id, app_name, start_ts, end_ts in self.buffer.pending_events():
+            if end_ts > day_start and start_ts < day_end:
+                rows[row_id if row_id is not None else ("pending", start_ts)] = (app_name, start_ts, end_ts)
+
+        return sorted(rows.values(), key=lambda row: row[1])
+
+    # ======================================================
+    # 单个应用的历史（AppDetailPage）
+    # ======================================================
+    def get_app_history(self, app_name, start_date=None, end_date=None):
+        """
+        app_name 在 [start_date, end_date] 内每天的使用时长、按小时的分布以及全部历史中的名次。
+        start_date 为空时从该应用第一次出现的日期开始，end_date 默认今天。
+        每一部分都只走一次索引范围扫描（idx_app_stats_app / idx_events_app），含写缓冲中未刷盘的增量。
+        返回 arrays.AppHistory
+        """
+        last = day_key(end_date or date.today())
+        first = day_key(start_date) if start_date else None
+
+        days, seconds = self._app_day_rows(app_name, first, last)
+        if first is None:
+            first = int(days[0]) if len(days) else last
+        series = arrays.dense_series(days, seconds, first, last)
+
+        for d in self.buffer.pending_dates():
+            pos = day_key(d) - first
+            if 0 <= pos < len(series):
+                series[pos] += self.buffer.pending_apps(d).get(app_name, 0)
+
+        # 小时分布来自焦点区间
+        start_ts = datetime.combine(date_from_day(first), time()).timestamp()
+        end_ts = datetime.combine(date_from_day(last + 1), time()).timestamp()
+        intervals = {
+            row_id: (start, end) for row_id, start, end in self._app_intervals(app_name, start_ts, end_ts, last)
+        }
+        for row_id, name, start, end in self.buffer.pending_events():
+            if name == app_name:
+                intervals[row_id if row_id is not None else ("pending", start)] = (start, end)
+        hourly = arrays.hourly_distribution(intervals.values(), start_ts, end_ts)
+
+        # 名次按已写入数据库的全部历史计算
+        totals = self._all_time_app_totals()
+        mine = totals.get(app_name, 0)
+        rank = 1 + sum(1 for total in totals.values() if total > mine) if app_name in totals else None
+
+        return arrays.AppHistory(
+            app_name=app_name,
+            index=np.arange(first, first + len(series), dtype=np.int64),
+            seconds=series,
+            hourly=hourly,
+            total_seconds=float(series.sum()),
+            active_days=int(np.count_nonzero(series)),
+            rank=rank,
+            app_count=len(totals),
+        )
+
+    def _app_day_rows(self, app_name, first, last):
+        """(days, seconds) 两个只读数组；first 为 None 时不限开始日期"""
+        def load():
+            with self._reader() as conn:
+                # 未知的应用：app_id 为 None，查询结果为空
+                rows = np.fromiter(
+                    conn.execute(
+                        """
+                        SELECT day, duration_seconds
+                        FROM app_stats
+                        WHERE app_id = ? AND day BETWEEN ? AND ?
+                        ORDER BY day
+                        """,
+                        (self.app_names.id(conn, app_name), first if first is not None else 0, last),
+                    ),
+                    dtype=[("day", np.int64), ("seconds", np.float64)],
+                )
+            rows.flags.writeable = False
+            return rows["day"], rows["seconds"]
+
+        return self._cached(("app_days", app_name, first, last), ("app_stats",), load, days=(last,))
+
+    def _app_intervals(self, app_name, start_ts, end_ts, last_day):
+        def load():
+            with self._reader() as conn:
+                cursor = conn.execute(
+                    """
+                    SELECT id, start_ts, end_ts
+                    FROM events
+                    WHERE app_name = ? AND end_ts > ? AND start_ts < ?
+                    """,
+                    (app_name, start_ts, end_ts),
+                )
+                return cursor.fetchall()
+
+        return self._cached(("app_events", app_name, start_ts, end_ts), ("events",), load, days=(last_day,))
+
+    def _all_time_app_totals(self):
+        """{app_name: 全部历史的总秒数}（按 idx_app_stats_app 顺序聚合，不需要临时 B 树）"""
+        def load():
+            with self._reader() as conn:
+                cursor = conn.execute(
+                    "SELECT app_id, SUM(duration_seconds) FROM app_stats GROUP BY app_id"
+                )
+                return dict(self.app_names.decode(conn, cursor.fetchall()))
+
+        return self._cached(("app_totals_all",), ("app_stats",), load, days=(day_key(date.today()),))
+
+    def get_app_totals(self, date_str):
+        """某天全部应用的使用时长 {app_name: 秒}（含写缓冲中未刷盘的增量）"""
+        totals = dict(self._app_totals(day_key(date_str)))
+        for app_name, sec in self.buffer.pending_apps(date_str).items():
+            totals[app_name] = (totals.get(app_name) or 0) + sec
+        return totals
 
     # ======================================================
     # 详情页图表相关
     # ======================================================
     def get_top_apps_by_date(self, date_str, limit=5):
         """获取指定日期的 Top Apps"""
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT app_name, duration_seconds
-                FROM app_stats
-                WHERE date = ?
-                ORDER BY duration_seconds DESC
-                LIMIT ?
-                """,
-                (date_str, limit),
-            )
-            return cursor.fetchall()
+        return self._top_apps(date_str, limit)
 
     def get_weekly_trend(self, end_date_str):
         """
         获取指定日期往前 7 天 (含当天) 的趋势数据。
         返回列表: [(date_str, screen_time_seconds, mouse_clicks, keystrokes), ... 7 天]
         """
-        end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-        start_date = end_date - timedelta(days=6)
-
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT date, screen_time_seconds, mouse_clicks, keystrokes
-                FROM daily_stats
-                WHERE date BETWEEN ? AND ?
-                ORDER BY date ASC
-                """,
-                (str(start_date), end_date_str),
-            )
-            rows = cursor.fetchall()
-
-        data_map = {row[0]: row for row in rows}
-        result = []
-        current = start_date
-        while current <= end_date:
-            d_str = current.strftime("%Y-%m-%d")
-            if d_str in data_map:
-                result.append(data_map[d_str])
-            else:
-                result.append((d_str, 0, 0, 0))
-            current += timedelta(days=1)
-
-        return result
+        end_date = to_date(end_date_str)
+        data = self.get_series(series.METRICS, "day", end_date - timedelta(days=6), end_date)
+        return [
+            (date_str_from_day(d), sec, clicks, keys)
+            for d, sec, clicks, keys in zip(data.index.tolist(), *(v.tolist() for v in data.values.values()))
+        ]
 
     def get_yearly_trend(self, year):
         """
         获取某年 1-12 月的数据 (用于 Year Trend 图)
-        返回长度为 12 的列表：
-        - 对于过去/当前月份: (screen_time_seconds_sum, mouse_clicks_sum, keystrokes_sum)
-        - 对于未来月份（今年还没到的月）: None
+        返回长度为 12 的列表，每个元素是 (screen_time_seconds_sum, mouse_clicks_sum, keystrokes_sum)；
+        没有记录的月份（包括还没到的月份）为 (0, 0, 0)，需要把未来月份画成空白的调用方自行按日期判断。
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT strftime('%m', date) AS month,
-                       SUM(screen_time_seconds),
-                       SUM(mouse_clicks),
-                       SUM(keystrokes)
-                FROM daily_stats
-                WHERE strftime('%Y', date) = ?
-                GROUP BY month
-                ORDER BY month ASC
-                """,
-                (str(year),),
-            )
-            rows = cursor.fetchall()
-
-        today = date.today()
-        current_year = today.year
-        current_month = today.month
-
-        temp_map = {}
-        for r in rows:
-            month_key = r[0]  # "01" ~ "12"
-            temp_map[month_key] = (
-                r[1] or 0,
-                r[2] or 0,
-                r[3] or 0,
-            )
-
-        result = []
-        for i in range(1, 13):
-            month_str = str(i).zfill(2)
-            if year == current_year and i > current_month:
-                # 未来月份：用 None 占位，前端可以画为“空”
-                result.append(None)
-            else:
-                result.append(temp_map.get(month_str, (0, 0, 0)))
-
-        return result
+        data = self.get_series(series.METRICS, "month", date(year, 1, 1), date(year, 12, 31))
+        return list(zip(*(v.tolist() for v in data.values.values())))
 
     def get_hourly_activity(self, date_str):
         """
@@ -385,27 +863,106 @@ class DatabaseManager:
 
         下标 0 对应 0 点, 1 对应 1 点, ..., 23 对应 23 点。
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT hour, screen_time_seconds, mouse_clicks, keystrokes
-                FROM hourly_stats
-                WHERE date = ?
-                ORDER BY hour ASC
-                """,
-                (date_str,),
-            )
-            rows = cursor.fetchall()
+        data = self.get_series(series.METRICS, "hour", date_str, date_str)
+        return list(zip(*(v.tolist() for v in data.values.values())))
 
-        # 先放 24 个 0
-        hourly = [(0, 0, 0) for _ in range(24)]
+    # ======================================================
+    # 列式（NumPy）查询：图表 / 热力图 / 多年统计直接做向量运算
+    # ======================================================
+    def get_series(self, metrics, granularity, start, end):
+        """
+        通用时间序列：[start, end]（date 或 'YYYY-MM-DD'，闭区间）内按 granularity
+        （hour / day / week / month / year）聚合的指标，一次查询返回所有 metrics
+        （"screen_time" / "clicks" / "keys" 的任意组合），含写缓冲中未刷盘的增量。
+        返回 series.Series(granularity, index, values, future)：
+            index   连续的桶键（epoch-hour / epoch-day / epoch-week / month 键 / 年份），缺失的桶为 0
+            values  {指标名: 数组}，顺序与 metrics 一致
+            future  晚于当前时刻的桶（数值为 0）
+        """
+        metrics = (metrics,) if isinstance(metrics, str) else tuple(metrics)
+        first, last, last_day = series.bounds(granularity, start, end)
+
+        # 缓存的是只读的结构化数组，调用方每次得到新的补零数组
+        def load():
+            with self._reader() as conn:
+                return series.read_rows(conn, granularity, metrics, first, last)
+
+        rows = self._cached(
+            ("series", granularity, metrics, first, last), (series.SOURCES[granularity][0],), load,
+            days=(last_day,),
+        )
+        result = series.dense(granularity, rows, metrics, first, last)
+
+        pending = {}
+        for d in self.buffer.pending_dates():
+            day = day_key(d)
+            if granularity == "hour":
+                buckets = {day * 24 + hour: totals for hour, totals in self.buffer.pending_hourly(d).items()}
+            else:
+                buckets = {series.bucket(granularity, day): self.buffer.pending_daily(d)}
+            for key, totals in buckets.items():
+                old = pending.get(key, (0, 0, 0))
+                pending[key] = tuple(a + b for a, b in zip(old, totals))
+        return series.add_deltas(result, pending)
 
-        for h, sec, clicks, keys in rows:
-            if 0 <= h < 24:
-                hourly[h] = (sec or 0, clicks or 0, keys or 0)
+    def get_daily_arrays(self, start_date, end_date):
+        """
+        [start_date, end_date] 内每天一项的连续数组，缺失的日期为 0，含写缓冲中未刷盘的增量。
+        start_date / end_date: date 或 'YYYY-MM-DD'
+        返回 MetricArrays(index, screen_time, clicks, keys)，index 为 epoch-day
+        """
+        data = self.get_series(series.METRICS, "day", start_date, end_date)
+        return arrays.MetricArrays(data.index, *data.values.values())
 
-        return hourly
+    def get_hourly_arrays(self, start_date, end_date):
+        """
+        [start_date, end_date] 内每小时一项（24 * 天数）的连续数组，缺失的小时为 0。
+        返回 MetricArrays(index, screen_time, clicks, keys)，index 为 epoch-hour
+        """
+        data = self.get_series(series.METRICS, "hour", start_date, end_date)
+        return arrays.MetricArrays(data.index, *data.values.values())
+
+    def get_minute_arrays(self, start_date, end_date):
+        """
+        [start_date, end_date] 内每分钟一项（1440 * 天数）的连续数组，含写缓冲中未刷盘的增量。
+        返回 MetricArrays(index, screen_time, clicks, keys)，index 为 epoch-minute（day * 1440 + 分钟）。
+        小时 / 天的合计：minutes.resample(np.vstack(...), 60)；休息 / 专注时段：minutes.active_blocks()
+        """
+        first, last = day_key(start_date), day_key(end_date)
+
+        def load():
+            with self._reader() as conn:
+                data = minutes.read_days(conn, first, last)
+            data.flags.writeable = False
+            return data
+
+        data = self._cached(("minute_days", first, last), ("minute_stats",), load, days=(last,)).copy()
+        for d in self.buffer.pending_dates():
+            pos = (day_key(d) - first) * minutes.SLOTS
+            if 0 <= pos < data.shape[1]:
+                for minute, values in self.buffer.pending_minutes(d).items():
+                    data[:, pos + minute] += values
+        base = first * minutes.SLOTS
+        index = np.arange(base, base + data.shape[1], dtype=np.int64)
+        return arrays.MetricArrays(index, data[0].astype(np.float64), data[1], data[2])
+
+    def get_window_totals(self, start, end):
+        """
+        任意时间窗 [start, end)（datetime，按分钟取整）内的 (screen_time_seconds, mouse_clicks, keystrokes)
+        """
+        data = self.get_minute_arrays(start.date(), end.date())
+        offset = int(data.index[0]) if len(data.index) else 0
+        lo = day_key(start.date()) * minutes.SLOTS + start.hour * 60 + start.minute - offset
+        hi = day_key(end.date()) * minutes.SLOTS + end.hour * 60 + end.minute - offset
+        return minutes.window(np.vstack((data.screen_time, data.clicks, data.keys)), lo, hi)
+
+    def get_activity_blocks(self, date_str, max_gap=2, min_length=5):
+        """
+        某天的连续活跃时段 [(start_minute, end_minute), ...]（当天第几分钟，结束为开区间）。
+        不超过 max_gap 分钟的空档算作同一段，短于 min_length 分钟的段忽略；段之间即为休息。
+        """
+        data = self.get_minute_arrays(date_str, date_str)
+        return minutes.active_blocks(data.screen_time, max_gap=max_gap, min_length=min_length)
 
 
 # 全局单例
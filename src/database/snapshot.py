@@ -0,0 +1,137 @@
+# 文件路径: database/snapshot.py
+"""
+内存模式下把内存数据库写回磁盘（sqlite3 backup API）。
+
+快照在写线程中执行：两次写命令之间内存数据库处于一致状态，备份期间也不会有新的写入。
+每次快照前在 settings 表记录 snapshot_at / snapshot_clean：
+    程序正常退出时的最后一次快照 snapshot_clean = '1'；
+    启动时读到 '0' 说明上次没有正常退出，最后一次快照之后的数据已经丢失，
+    丢失的时长不超过 快照间隔 + 写缓冲刷盘间隔。
+启用了崩溃恢复日志时，快照写回磁盘之后才截断日志，最后一次快照之后的增量在启动时重放。
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# 默认每 60 秒写一次快照
+SNAPSHOT_INTERVAL = 60
+
+SETTING_SNAPSHOT_AT = "snapshot_at"
+SETTING_SNAPSHOT_CLEAN = "snapshot_clean"
+
+
+class Snapshotter:
+    def __init__(self, manager, interval=SNAPSHOT_INTERVAL):
+        self.manager = manager
+        self.interval = interval
+
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+
+        self._lock = threading.Lock()
+        self._snapshots = 0
+        self._last_snapshot = None  # time.time()
+        self._last_duration = 0.0
+        self._last_error = None
+
+    # ======================================================
+    # 定时快照
+    # ======================================================
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="Snapshotter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5.0)
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval):
+            self.snapshot()
+
+    def snapshot(self, final=False):
+        """
+        把内存数据库完整写入磁盘文件。final=True 表示正常退出前的最后一次快照。
+        失败时输出错误并返回 False（下一次快照会重试）。
+        """
+        try:
+            self.manager.writer.call(self._snapshot, final)
+        except sqlite3.Error as e:
+            with self._lock:
+                self._last_error = str(e)
+            print(f"Failed to write database snapshot: {e}")
+            return False
+        return True
+
+    def _snapshot(self, final):
+        # 在写线程中执行
+        conn = self.manager._get_connection()
+        now = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+            [
+                (SETTING_SNAPSHOT_AT, datetime.fromtimestamp(now).isoformat(timespec="seconds")),
+                (SETTING_SNAPSHOT_CLEAN, "1" if final else "0"),
+            ],
+        )
+        # backup 需要源连接上没有进行中的写事务
+        conn.commit()
+        # 到此为止刷盘成功的增量都包含在这次快照里
+        checkpoint = self.manager.buffer.journal_checkpoint()
+
+        started = time.perf_counter()
+        disk = sqlite3.connect(self.manager.db_name, timeout=self.manager.connections.timeout)
+        try:
+            conn.backup(disk)
+        finally:
+            disk.close()
+        if self.manager.buffer.journal is not None:
+            self.manager.buffer.journal.discard_until(checkpoint)
+
+        with self._lock:
+            self._snapshots += 1
+            self._last_snapshot = now
+            self._last_duration = time.perf_counter() - started
+            self._last_error = None
+
+    # ======================================================
+    # 状态
+    # ======================================================
+    def max_loss_seconds(self):
+        """意外退出时最多丢失的数据时长（秒）：快照间隔 + 写缓冲刷盘间隔；启用崩溃恢复日志时为 0"""
+        if self.manager.buffer.journal is not None:
+            return 0
+        return self.interval + self.manager.buffer.flush_interval
+
+    def status(self):
+        with self._lock:
+            since = None if self._last_snapshot is None else time.time() - self._last_snapshot
+            return {
+                "snapshot_interval": self.interval,
+                "max_loss_seconds": self.max_loss_seconds(),
+                "snapshots": self._snapshots,
+                "last_snapshot": self._last_snapshot,
+                "seconds_since_snapshot": since,
+                "last_duration_ms": self._last_duration * 1000,
+                "last_error": self._last_error,
+            }
+
+
+def previous_session(conn):
+    """
+    读取载入的快照中上一次会话的记录。
+    返回 (snapshot_at, clean)；从未写过快照时返回 (None, True)。
+    """
+    values = dict(
+        conn.execute(
+            "SELECT key, value FROM settings WHERE key IN (?, ?)",
+            (SETTING_SNAPSHOT_AT, SETTING_SNAPSHOT_CLEAN),
+        ).fetchall()
+    )
+    return values.get(SETTING_SNAPSHOT_AT), values.get(SETTING_SNAPSHOT_CLEAN, "1") == "1"
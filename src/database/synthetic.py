@@ -0,0 +1,238 @@
+# 文件路径: database/synthetic.py
+"""
+合成多年的活动历史（压力测试 / 性能分析用）。
+
+按天生成，每天的数据都由 NumPy 向量运算得到：
+    - 日节律：按小时的活跃概率（上午 / 下午高峰、午休、夜间几乎为 0），周末整体推迟且更少；
+      偶尔插入几天到两周的假期
+    - 活跃时段：每天若干个从节律分布中抽样开始时刻、指数分布长度的区块，叠加成每分钟的活跃掩码
+    - 点击 / 按键：每个活跃分钟按当天的强度做 Poisson 抽样；按键按固定的键频分布多项式抽样
+    - 应用：几千个应用名，按 Zipf 分布选取；每个连续活跃段切成若干焦点区间，每段一个应用
+各表之间保持一致：分钟 -> 小时 -> 天 -> 月 / 年逐级求和，app_stats 为各焦点区间内活跃秒数的合计。
+全部数据在一个事务里用 executemany 批量写入。相同的 seed 生成完全相同的数据。
+"""
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+
+from . import keyvectors, minutes, rollups
+from .timekeys import date_from_day, day_key
+
+YEARS = 10
+APPS = 2000
+SEED = 0
+
+# 每个批次 executemany 的行数
+_CHUNK = 50_000
+
+# 按小时的相对活跃度（工作日）；周末整体推迟两小时
+_HOUR_PROFILE = np.array([
+    0.05, 0.02, 0.01, 0.0, 0.0, 0.0, 0.01, 0.05, 0.3, 0.8, 1.0, 0.95,
+    0.5, 0.6, 0.95, 1.0, 0.9, 0.7, 0.4, 0.35, 0.45, 0.5, 0.35, 0.15,
+])
+
+# 常见应用放在最前面（Zipf 分布下最常用），其余由音节随机拼成
+_COMMON_APPS = (
+    "chrome.exe", "Code.exe", "explorer.exe", "WeChat.exe", "msedge.exe", "firefox.exe", "WindowsTerminal.exe",
+    "pycharm64.exe", "Teams.exe", "slack.exe", "OUTLOOK.EXE", "WINWORD.EXE", "EXCEL.EXE", "POWERPNT.EXE",
+    "Spotify.exe", "Discord.exe", "steam.exe", "notepad.exe", "obsidian.exe", "Notion.exe", "Zoom.exe",
+    "Telegram.exe", "idea64.exe", "devenv.exe", "Photoshop.exe", "Figma.exe", "QQ.exe", "DingTalk.exe",
+)
+_SYLLABLES = (
+    "ab", "ar", "bo", "ca", "da", "de", "el", "fi", "ga", "hu", "in", "jo", "ka", "lo", "ma", "mi", "na",
+    "no", "or", "pa", "qu", "ra", "ri", "sa", "so", "ta", "ti", "ul", "va", "wi", "xe", "yo", "za", "zu",
+)
+
+# 按键名与 tracker 记录的一致（字符转大写，其余为 pynput 的 Key 名转大写），权重为相对频率
+_KEY_WEIGHTS = {
+    **dict(zip("ETAOINSHRDLCUMWFGYPBVKJXQZ", (
+        12.7, 9.1, 8.2, 7.5, 7.0, 6.7, 6.3, 6.1, 6.0, 4.3, 4.0, 2.8, 2.8,
+        2.4, 2.4, 2.2, 2.0, 2.0, 1.9, 1.5, 1.0, 0.8, 0.2, 0.2, 0.1, 0.1,
+    ))),
+    **{str(d): 0.6 for d in range(10)},
+    "SPACE": 18.0, "BACKSPACE": 5.0, "ENTER": 3.0, "SHIFT": 3.0, "CTRL_L": 2.5, "TAB": 1.2, "ALT_L": 0.4,
+    "UP": 0.8, "DOWN": 0.8, "LEFT": 0.7, "RIGHT": 0.7, "ESC": 0.3, "DELETE": 0.3, "CAPS_LOCK": 0.05,
+    "SHIFT_R": 0.4, "CTRL_R": 0.1, "CMD": 0.2, "HOME": 0.1, "END": 0.1, "PAGE_UP": 0.1, "PAGE_DOWN": 0.1,
+    ",": 1.0, ".": 1.1, "/": 0.3, ";": 0.3, "'": 0.3, "-": 0.3, "=": 0.2, "[": 0.2, "]": 0.2,
+    **{f"F{i}": 0.03 for i in range(1, 13)},
+}
+
+
+class SyntheticError(Exception):
+    pass
+
+
+def app_names(count, rng):
+    """count 个不重复的应用名：常见应用在前，其余随机拼写"""
+    names = list(_COMMON_APPS[:count])
+    seen = set(names)
+    while len(names) < count:
+        parts = rng.choice(_SYLLABLES, size=rng.integers(2, 5))
+        name = "".join(parts).capitalize() + ".exe"
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+# ======================================================
+# 单日数据
+# ======================================================
+def _day_factor(rng, day, vacation_until):
+    """当天的活跃度系数与新的假期截止日"""
+    if day < vacation_until:
+        return 0.05, vacation_until
+    if rng.random() < 0.006:
+        return 0.05, day + int(rng.integers(3, 15))
+    weekday = (day + 3) % 7  # 0 = 周一
+    factor = 1.0 if weekday < 5 else 0.45
+    # 缓慢的长期起伏（约三年一个周期）
+    factor *= 1.0 + 0.2 * np.sin(day / 1095 * 2 * np.pi)
+    return factor * rng.uniform(0.7, 1.2), vacation_until
+
+
+def _active_minutes(rng, factor, weekend):
+    """每分钟的活跃掩码：若干个区块（开始时刻服从日节律，长度服从指数分布）叠加"""
+    profile = np.roll(_HOUR_PROFILE, 2) if weekend else _HOUR_PROFILE
+    start_p = np.repeat(profile / profile.sum() / 60, 60)
+    blocks = rng.poisson(10 * factor)
+    if not blocks:
+        return np.zeros(minutes.SLOTS, dtype=bool)
+    starts = rng.choice(minutes.SLOTS, size=blocks, p=start_p)
+    ends = np.minimum(starts + rng.exponential(35, size=blocks).astype(np.int64) + 1, minutes.SLOTS)
+    edges = np.zeros(minutes.SLOTS + 1, dtype=np.int64)
+    np.add.at(edges, starts, 1)
+    np.add.at(edges, ends, -1)
+    return np.cumsum(edges[:-1]) > 0
+
+
+def _runs(mask):
+    """连续为 True 的段：(starts, ends)，ends 为开区间"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _sessions(rng, mask):
+    """把连续活跃段切成平均约 12 分钟的焦点区间：(starts, ends)"""
+    starts, ends = _runs(mask)
+    if not len(starts):
+        return starts, ends
+    # 每个活跃分钟以 1/12 的概率开始新的区间；连续段的第一分钟总是新区间
+    cut = rng.random(minutes.SLOTS) < 1 / 12
+    boundary = np.zeros(minutes.SLOTS, dtype=bool)
+    boundary[starts] = True
+    boundary |= cut & mask
+    # 区间在下一个边界或连续段结束处截止
+    session_starts = np.flatnonzero(boundary)
+    stops = np.sort(np.concatenate((session_starts, ends)))
+    session_ends = stops[np.searchsorted(stops, session_starts, side="right")]
+    return session_starts, session_ends
+
+
+# ======================================================
+# 生成并写入（调用方负责事务）
+# ======================================================
+def generate(conn, years=YEARS, apps=APPS, seed=SEED, end=None, progress=None):
+    """
+    生成截至 end（默认昨天）的 years 年数据写入 conn。目标库必须还没有活动数据。
+    progress(done_days, total_days): 可选的进度回调。
+    返回 {表名: 行数}。
+    """
+    if conn.execute("SELECT 1 FROM daily_stats LIMIT 1").fetchone() is not None:
+        raise SyntheticError("Refusing to generate into a database that already has activity data.")
+
+    rng = np.random.default_rng(seed)
+    end = end or date.today() - timedelta(days=1)
+    last_day = day_key(end)
+    first_day = day_key(date(end.year - years, end.month, min(end.day, 28))) + 1
+
+    # 字典表
+    names = app_names(apps, rng)
+    conn.executemany("INSERT OR IGNORE INTO apps (name) VALUES (?)", [(n,) for n in names])
+    app_id_map = dict(conn.execute("SELECT name, id FROM apps"))
+    app_ids = np.array([app_id_map[n] for n in names], dtype=np.int64)
+    key_names = list(_KEY_WEIGHTS)
+    conn.executemany("INSERT OR IGNORE INTO keys (name) VALUES (?)", [(n,) for n in key_names])
+    key_id_map = dict(conn.execute("SELECT name, id FROM keys"))
+    key_ids = np.array([key_id_map[n] for n in key_names], dtype=np.int64)
+    key_p = np.array(list(_KEY_WEIGHTS.values()))
+    key_p /= key_p.sum()
+
+    # 应用的 Zipf 权重（累积分布，searchsorted 抽样）
+    app_cdf = np.cumsum(1.0 / np.arange(1, apps + 1) ** 1.1)
+    app_cdf /= app_cdf[-1]
+
+    daily, hourly, minute_rows, app_rows, key_rows, events = [], [], [], [], [], []
+    vacation_until = first_day
+    total_days = last_day - first_day + 1
+    for i, day in enumerate(range(first_day, last_day + 1)):
+        factor, vacation_until = _day_factor(rng, day, vacation_until)
+        weekend = (day + 3) % 7 >= 5
+        mask = _active_minutes(rng, factor, weekend)
+        active = int(mask.sum())
+        if not active:
+            continue
+
+        # 每分钟：活跃秒数（采集间隔 5 秒，偶尔少几次）/ 点击 / 按键
+        data = np.zeros((minutes.FIELDS, minutes.SLOTS), dtype=np.int64)
+        data[0, mask] = 60 - 5 * rng.binomial(12, 0.04, size=active)
+        intensity = rng.gamma(2.0, 0.5, size=active)
+        data[1, mask] = rng.poisson(rng.uniform(4, 12) * intensity)
+        data[2, mask] = rng.poisson(rng.uniform(40, 120) * intensity)
+
+        per_hour = minutes.resample(data, 60)
+        totals = data.sum(axis=1)
+        daily.append(day)
+        hourly.extend(
+            (day * 24 + h, float(per_hour[0, h]), int(per_hour[1, h]), int(per_hour[2, h]))
+            for h in np.flatnonzero(per_hour[0]).tolist()
+        )
+        minute_rows.append((day, minutes.pack(data)))
+
+        # 焦点区间与应用时长
+        starts, ends = _sessions(rng, mask)
+        chosen = np.searchsorted(app_cdf, rng.random(len(starts)))
+        cumulative = np.concatenate(([0], np.cumsum(data[0])))
+        seconds = cumulative[ends] - cumulative[starts]
+        midnight = datetime.combine(date_from_day(day), time()).timestamp()
+        events.extend(zip(
+            (names[a] for a in chosen.tolist()),
+            (midnight + starts * 60).tolist(),
+            (midnight + ends * 60).tolist(),
+        ))
+        per_app = np.bincount(chosen, weights=seconds, minlength=apps)
+        used = np.flatnonzero(per_app)
+        app_rows.extend(zip([day] * len(used), app_ids[used].tolist(), per_app[used].tolist()))
+
+        # 按键向量
+        vector = np.zeros(int(key_ids.max()) + 1, dtype=np.int64)
+        vector[key_ids] = rng.multinomial(int(totals[2]), key_p)
+        key_rows.append((day, keyvectors.pack(vector)))
+
+        if progress is not None and i % 100 == 0:
+            progress(i, total_days)
+
+    # daily_stats 由 hourly_stats 的触发器汇总（每天的合计等于各小时之和）
+    _insert(conn, "INSERT INTO hourly_stats (hour, screen_time_seconds, mouse_clicks, keystrokes) VALUES (?, ?, ?, ?)",
+            hourly)
+    _insert(conn, "INSERT INTO minute_stats (day, data) VALUES (?, ?)", minute_rows)
+    _insert(conn, "INSERT INTO app_stats (day, app_id, duration_seconds) VALUES (?, ?, ?)", app_rows)
+    _insert(conn, "INSERT INTO keyboard_daily (day, counts) VALUES (?, ?)", key_rows)
+    _insert(conn, "INSERT INTO events (app_name, start_ts, end_ts) VALUES (?, ?, ?)", events)
+    rollups.rebuild(conn)
+    if progress is not None:
+        progress(total_days, total_days)
+
+    return {
+        "daily_stats": len(daily),
+        "hourly_stats": len(hourly),
+        "minute_stats": len(minute_rows),
+        "app_stats": len(app_rows),
+        "keyboard_daily": len(key_rows),
+        "events": len(events),
+    }
+
+
+def _insert(conn, sql, rows):
+    for i in range(0, len(rows), _CHUNK):
+        conn.executemany(sql, rows[i:i + _CHUNK])
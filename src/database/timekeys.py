@@ -0,0 +1,60 @@
+# 文件路径: database/timekeys.py
+"""
+整数时间键：
+    day  = 自 1970-01-01 起的天数（epoch-day）
+    hour = day * 24 + 当天小时（epoch-hour）
+所有统计表都以它们作为主键，范围查询都是索引上的区间扫描。
+"""
+from datetime import date, datetime
+
+EPOCH = date(1970, 1, 1)
+_EPOCH_ORDINAL = EPOCH.toordinal()
+
+# SQL 中把 day 转回 'YYYY-MM-DD'
+SQL_DAY_TO_DATE = "date({col} * 86400, 'unixepoch')"
+
+
+def to_date(value):
+    """date / datetime / 'YYYY-MM-DD' -> date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def day_key(value):
+    """date / datetime / 'YYYY-MM-DD' -> epoch-day"""
+    return to_date(value).toordinal() - _EPOCH_ORDINAL
+
+
+def date_from_day(day):
+    return date.fromordinal(day + _EPOCH_ORDINAL)
+
+
+def date_str_from_day(day):
+    return date_from_day(day).isoformat()
+
+
+def year_bounds(year):
+    """某年第一天和最后一天的 epoch-day（闭区间）"""
+    return day_key(date(year, 1, 1)), day_key(date(year, 12, 31))
+
+
+# ======================================================
+# 月 / 年汇总键
+# ======================================================
+# month = year * 12 + (month - 1)，同一年的 12 个月是连续整数
+SQL_DAY_TO_MONTH = (
+    "(CAST(strftime('%Y', {col} * 86400, 'unixepoch') AS INTEGER) * 12"
+    " + CAST(strftime('%m', {col} * 86400, 'unixepoch') AS INTEGER) - 1)"
+)
+
+
+def month_key(value):
+    d = to_date(value)
+    return d.year * 12 + d.month - 1
+
+
+def month_key_from_day(day):
+    return month_key(date_from_day(day))
@@ -0,0 +1,163 @@
+# 文件路径: database/writer.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# 队列中的停止标记
+_STOP = object()
+
+
+class DatabaseWriter:
+    """
+    单写线程（database actor）。
+
+    所有写操作以「命令」的形式放入队列，由同一个线程按顺序执行，
+    每条命令占用一个 BEGIN IMMEDIATE ... COMMIT 事务。
+    命令是普通函数：在写线程中执行时，DatabaseManager._get_connection()
+    返回的正是写线程自己的长连接。
+
+    metrics() 返回队列深度、排队等待时间和获取写锁的等待时间。
+    """
+
+    def __init__(self, connections, name="DatabaseWriter"):
+        self.connections = connections
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+        self._metrics_lock = threading.Lock()
+        self._commands = 0
+        self._errors = 0
+        self._max_depth = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._lock_wait_total = 0.0
+        self._lock_wait_max = 0.0
+        self._exec_total = 0.0
+
+    # ======================================================
+    # 提交命令
+    # ======================================================
+    def submit(self, fn, *args, after=None, **kwargs):
+        """
+        异步提交写命令，返回 concurrent.futures.Future。
+        after(error): 事务提交（error 为 None）或回滚之后、Future 完成之前在写线程中调用，
+        等待 Future 的线程醒来时 after 已经执行完毕。
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((fn, args, kwargs, after, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        with self._metrics_lock:
+            self._max_depth = max(self._max_depth, depth)
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        """同步执行写命令并返回结果；在写线程内部调用时直接执行"""
+        if threading.current_thread() is self._thread:
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    # ======================================================
+    # 线程管理
+    # ======================================================
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    @property
+    def thread(self):
+        return self._thread
+
+    def stop(self, timeout=5.0):
+        """
+        处理完队列中已有的命令后停止写线程。
+        返回写线程是否已经退出；timeout 秒内没有处理完时返回 False，线程仍在后台执行剩下的命令。
+        """
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return True
+        self._queue.put(_STOP)
+        thread.join(timeout=timeout)
+        if thread.is_alive():
+            print(f"{self.name} did not stop within {timeout}s; {self._queue.qsize()} commands still queued.")
+            return False
+        return True
+
+    def _run(self):
+        conn = self.connections.get()
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            fn, args, kwargs, after, future, enqueued_at = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            started = time.perf_counter()
+            locked = None
+            try:
+                # 显式获取写锁，便于统计等锁时间
+                conn.execute("BEGIN IMMEDIATE")
+                locked = time.perf_counter()
+                result = fn(*args, **kwargs)
+                if conn.in_transaction:
+                    conn.commit()
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                with self._metrics_lock:
+                    self._errors += 1
+                self._after(after, e)
+                future.set_exception(e)
+            else:
+                self._after(after, None)
+                future.set_result(result)
+            finished = time.perf_counter()
+            if locked is None:
+                locked = finished
+            self._record(started - enqueued_at, locked - started, finished - locked)
+
+        self.connections.close_current()
+
+    def _after(self, after, error):
+        if after is None:
+            return
+        try:
+            after(error)
+        except Exception as e:
+            print(f"Error in post-commit hook: {e}")
+
+    # ======================================================
+    # 指标
+    # ======================================================
+    def _record(self, queue_wait, lock_wait, exec_time):
+        with self._metrics_lock:
+            self._commands += 1
+            self._queue_wait_total += queue_wait
+            self._queue_wait_max = max(self._queue_wait_max, queue_wait)
+            self._lock_wait_total += lock_wait
+            self._lock_wait_max = max(self._lock_wait_max, lock_wait)
+            self._exec_total += exec_time
+
+    def metrics(self):
+        with self._metrics_lock:
+            n = self._commands or 1
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_depth_max": self._max_depth,
+                "commands": self._commands,
+                "errors": self._errors,
+                "queue_wait_avg_ms": self._queue_wait_total / n * 1000,
+                "queue_wait_max_ms": self._queue_wait_max * 1000,
+                "lock_wait_avg_ms": self._lock_wait_total / n * 1000,
+                "lock_wait_max_ms": self._lock_wait_max * 1000,
+                "exec_avg_ms": self._exec_total / n * 1000,
+            }
@@ -1,3 +1,4 @@
+import sqlite3
 import threading
 import time
 from datetime import datetime
@@ -11,13 +12,21 @@ from .window_utils import get_active_process_name
 # 导入 monitor.tracker.py 中的 InputListener
 from .tracker import InputListener
 
+# 今天的实时统计（UI 直接读取）
+from .today import TodayState
+
 # 监控间隔（秒）。例如，每 5 秒记录一次活动。
 MONITOR_INTERVAL = 5
 
+# 写缓冲刷盘间隔（秒）与待写条目上限
+FLUSH_INTERVAL = 30
+FLUSH_MAX_PENDING = 2000
+
 
 class MonitorService:
     # 接收 interval 和 idle_threshold
-    def __init__(self, interval=MONITOR_INTERVAL, idle_threshold=300):
+    def __init__(self, interval=MONITOR_INTERVAL, idle_threshold=300,
+                 flush_interval=FLUSH_INTERVAL, flush_max_pending=FLUSH_MAX_PENDING):
         super().__init__()
         self.interval = interval
 
@@ -25,7 +34,9 @@ class MonitorService:
         self.idle_threshold = idle_threshold
 
         self.running = False
-        self._timer: threading.Timer | None = None
+        # 常驻采集线程：复用同一个线程，数据库长连接才能真正被复用
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
 
         # 记录上一次活动的应用名 (用于计算时长)
         self.last_app_name = None
@@ -36,15 +47,30 @@ class MonitorService:
 
         # 初始化数据库和输入监听器
         db.init_db()
+        # 每次采集的增量先进写缓冲，按间隔/条目上限批量写库
+        db.buffer.flush_interval = flush_interval
+        db.buffer.max_pending = flush_max_pending
         # 属性名称保持 input_listener，对应 MainWindow 中的调用
         self.input_listener = InputListener()
 
         # 记录应用的累计时长 (内存中，达到 interval 后写入DB)
         self._app_durations = {}
 
+        # 今天的总计 / 每小时 / 各应用时长，启动时从数据库载入，之后每次采集累加
+        self.today = TodayState()
+
     # ======================================================
     # 核心监控逻辑
     # ======================================================
+    def _monitor_loop(self):
+        """
+        采集线程主循环：立即执行一次，之后每隔 self.interval 秒执行一次。
+        """
+        while self.running:
+            self._run_monitoring_task()
+            if self._stop_event.wait(self.interval):
+                break
+
     def _run_monitoring_task(self):
         """
         定时任务：每隔 self.interval 秒执行一次数据采集和写入。
@@ -52,27 +78,23 @@ class MonitorService:
         if not self.running:
             return
 
-        # 1. 重新安排下一次任务
-        self._timer = threading.Timer(self.interval, self._run_monitoring_task)
-        self._timer.start()
-
-        # 2. 获取当前活动的应用名
+        # 1. 获取当前活动的应用名
         current_app_name = get_active_process_name()
 
-        # 3. 获取输入增量 (点击/按键)
+        # 2. 获取输入增量 (点击/按键)
         clicks, keys, key_details = self.input_listener.get_and_reset_counts()
 
-        # 4. 获取闲置时间
+        # 3. 获取闲置时间
         idle_time = self.input_listener.get_idle_time()
 
-        # 5. 判断是否处于活动状态 (未闲置 且 有点击/按键)
+        # 4. 判断是否处于活动状态 (未闲置 且 有点击/按键)
         is_active = (
                 (clicks > 0) or
                 (keys > 0) or
                 (idle_time < self.idle_threshold)
         )
 
-        # 6. 计算屏幕/应用使用时长
+        # 5. 计算屏幕/应用使用时长
         screen_time_delta = 0
         app_duration_delta = 0
 
@@ -89,23 +111,42 @@ class MonitorService:
             # 如果处于闲置状态，不计入时间，但保留 last_app_name
             pass
 
-        # 7. 写入数据库
+        # 6. 写入写缓冲（daily_stats / hourly_stats / app_stats / keyboard_daily 的增量，
+        #    以及前台应用的心跳：同一应用连续处于前台时只延长 events 中的当前区间），
+        #    并以同一时刻累加进内存中的今天统计，两边按同一个小时 / 同一天归档
+        now = datetime.now()
         if screen_time_delta > 0 or clicks > 0 or keys > 0:
-
-            # --- 写入总统计 (daily_stats, hourly_stats) ---
-            db.update_stats(screen_time_delta, clicks, keys)
-
-            # --- 写入应用使用时长 ---
-            if app_duration_delta > 0 and current_app_name:
-                db.update_app_usage(current_app_name, app_duration_delta)
-
-            # --- 写入键盘按键详情 ---
-            if key_details:
-                db.update_key_counts(key_details)
-
-        # 8. 更新内存中的实时统计 (用于 UI 仪表盘)
+            db.buffer.add(
+                screen_time_delta, clicks, keys,
+                app_name=current_app_name if app_duration_delta > 0 else None,
+                app_delta=app_duration_delta,
+                key_counts=key_details,
+                focus_app=current_app_name if screen_time_delta > 0 else None,
+                focus_seconds=screen_time_delta,
+                now=now,
+            )
+            self.today.add(
+                now, screen_time_delta, clicks, keys,
+                app_name=current_app_name, app_delta=app_duration_delta,
+            )
+
+        # 到达间隔、条目上限或跨天时批量写库
+        self._flush_buffer(force=False)
+
+        # 7. 更新内存中的实时统计 (用于 UI 仪表盘)
         self._update_live_stats(screen_time_delta, clicks, keys)
 
+    def _flush_buffer(self, force=True):
+        if not force:
+            # 异步交给写线程，写库失败时增量会合并回缓冲区
+            db.buffer.flush_if_due()
+            return
+        try:
+            db.buffer.flush()
+        except sqlite3.Error:
+            # 错误已由 WriteBuffer 输出，增量已合并回缓冲区
+            pass
+
     # ======================================================
     # 控制与状态
     # ======================================================
@@ -120,8 +161,33 @@ class MonitorService:
         # 初始时获取上一个活动应用名
         self.last_app_name = get_active_process_name()
 
-        # 启动定时任务
-        self._run_monitoring_task()
+        # 今天已有的数据只在这里读一次库，之后由采集线程在内存中累加
+        try:
+            self.today.seed(db)
+        except sqlite3.Error as e:
+            print(f"Failed to load today's stats: {e}")
+
+        # 启动采集线程
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._monitor_loop, name="MonitorService", daemon=True)
+        self._thread.start()
+
+        # 后台按保留策略降采样旧数据（分批短事务，不阻塞采集线程的刷盘）；
+        # 策略默认永久保留，只有用户设置过保留月数才会删除旧明细
+        threading.Thread(target=self._apply_retention, name="Retention", daemon=True).start()
+
+    def _apply_retention(self):
+        try:
+            policy = db.get_retention_policy()
+            if policy.hourly_cutoff() is None and policy.keys_cutoff() is None:
+                return
+            report = db.apply_retention(policy)
+        except sqlite3.Error as e:
+            print(f"Failed to apply retention policy: {e}")
+            return
+        if report["batches"]:
+            print(f"Retention: folded {report['hourly_rows']} hourly rows and {report['key_days']} "
+                  f"days of key counts, freed {report['freed_bytes'] / 1024:.1f} KiB.")
 
     def stop(self):
         if not self.running:
@@ -129,10 +195,21 @@ class MonitorService:
 
         print("Monitoring service stopped.")
         self.running = False
-        if self._timer:
-            self._timer.cancel()
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 1)
         self.input_listener.stop()
 
+        # 最后一次采集之后的点击/按键也计入（不计时长）
+        clicks, keys, key_details = self.input_listener.get_and_reset_counts()
+        if clicks or keys:
+            now = datetime.now()
+            db.buffer.add(0, clicks, keys, key_counts=key_details, now=now)
+            self.today.add(now, 0, clicks, keys)
+
+        # 退出前把未刷盘的增量写入数据库
+        self._flush_buffer()
+
     def _update_live_stats(self, time_delta, clicks_delta, keys_delta):
         """
         实时更新内存中的统计数据，供 UI 轮询。
@@ -142,6 +219,13 @@ class MonitorService:
             self._live_stats["mouse_clicks"] += clicks_delta
             self._live_stats["keystrokes"] += keys_delta
 
+    def get_today_snapshot(self):
+        """
+        今天的实时统计（TodaySnapshot），不读数据库。
+        尚未被采集线程取走的点击 / 按键不在其中，由调用方用 input_listener.get_current_counts() 补上。
+        """
+        return self.today.snapshot()
+
     def get_current_session_stats(self):
         """
         获取当前会话累计的总统计 (自服务启动以来)
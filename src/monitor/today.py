@@ -0,0 +1,76 @@
+import threading
+from collections import namedtuple
+from datetime import date
+
+# 今天的实时统计快照（UI 直接读取，不查数据库）：
+#   hourly  24 个 (screen_time_seconds, mouse_clicks, keystrokes)，下标为小时
+#   apps    ((app_name, duration_seconds), ...) 按时长降序
+#   version 状态每次变化加一
+TodaySnapshot = namedtuple(
+    "TodaySnapshot",
+    ["date", "screen_time_seconds", "mouse_clicks", "keystrokes", "hourly", "apps", "version"],
+)
+
+
+class TodayState:
+    """
+    今天的总计、每小时分布和各应用时长，常驻内存。
+    启动时从数据库（含写缓冲中未刷盘的部分）载入一次，之后由采集线程每次采集时累加；
+    跨天时清零。数据库只是它的持久化副本，两者累加的是同一批增量。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 每次变化加一（跨天也不清零），UI 据此判断是否需要重绘
+        self._version = 0
+        self._reset(date.today())
+
+    def _reset(self, day):
+        self._date = day
+        self._totals = [0, 0, 0]
+        self._hourly = [[0, 0, 0] for _ in range(24)]
+        self._apps = {}
+        self._version += 1
+        self._snapshot = None
+
+    def seed(self, db):
+        """从数据库载入今天已有的数据（在采集线程启动前调用）"""
+        day = date.today()
+        date_str = str(day)
+        totals = db.get_today_stats()
+        hourly = db.get_hourly_activity(date_str)
+        apps = db.get_app_totals(date_str)
+        with self._lock:
+            self._reset(day)
+            self._totals = [totals[0] or 0, totals[1] or 0, totals[2] or 0]
+            self._hourly = [[sec or 0, clicks or 0, keys or 0] for sec, clicks, keys in hourly]
+            self._apps = {name: sec or 0 for name, sec in apps.items()}
+
+    def add(self, now, screen_time=0, clicks=0, keys=0, app_name=None, app_delta=0):
+        """累加一次采集的增量；now 为采集时刻（datetime）"""
+        with self._lock:
+            if now.date() != self._date:
+                # 跨天：新的一天从零开始
+                self._reset(now.date())
+            for i, delta in enumerate((screen_time, clicks, keys)):
+                self._totals[i] += delta
+                self._hourly[now.hour][i] += delta
+            if app_name and app_delta:
+                self._apps[app_name] = self._apps.get(app_name, 0) + app_delta
+            self._version += 1
+            self._snapshot = None
+
+    def snapshot(self):
+        """当前状态的不可变快照；状态没有变化时返回同一个对象（version 相同）"""
+        with self._lock:
+            if date.today() != self._date:
+                self._reset(date.today())
+            if self._snapshot is None:
+                self._snapshot = TodaySnapshot(
+                    str(self._date),
+                    *self._totals,
+                    tuple(tuple(bucket) for bucket in self._hourly),
+                    tuple(sorted(self._apps.items(), key=lambda item: item[1], reverse=True)),
+                    self._version,
+                )
+            return self._snapshot
@@ -184,8 +184,8 @@ class DashboardPage(ctk.CTkFrame):
         self.update_graph()
 
     def update_graph(self):
-        rows = db.get_data_by_year(self.selected_year)
-        self.heatmap_obj = GithubHeatmap(rows, metric=self.current_metric, year=self.selected_year)
+        data = db.get_daily_arrays(f"{self.selected_year}-01-01", f"{self.selected_year}-12-31")
+        self.heatmap_obj = GithubHeatmap(data, metric=self.current_metric, year=self.selected_year)
         self.heatmap_obj.plot(self.ax)
         self.chart_canvas.draw()
 
@@ -15,58 +15,44 @@ GITHUB_PALETTE = {
 }
 
 
+# metric -> DatabaseManager.get_daily_arrays() 返回的列
+METRIC_COLUMNS = {
+    'screen_time_seconds': 'screen_time',
+    'mouse_clicks': 'clicks',
+    'keystrokes': 'keys',
+}
+
+
 class GithubHeatmap:
-    def __init__(self, data_rows, metric='screen_time_seconds', year=None):
-        self.data_rows = data_rows
+    def __init__(self, data, metric='screen_time_seconds', year=None):
+        # data: 该年 1/1 ~ 12/31 的列式数组（DatabaseManager.get_daily_arrays()）
+        self.data = data
         self.metric = metric
         self.year = year if year else datetime.date.today().year
-        self.coord_map = {}
 
     def _prepare_data(self):
-        data_map = {}
-        metric_idx = 1
-        if self.metric == 'mouse_clicks':
-            metric_idx = 2
-        elif self.metric == 'keystrokes':
-            metric_idx = 3
+        column = METRIC_COLUMNS.get(self.metric, 'screen_time')
+        self.values = getattr(self.data, column).astype(np.float64)
+        self.display_values = self.values / 3600.0 if self.metric == 'screen_time_seconds' else self.values
 
-        for row in self.data_rows:
-            data_map[row[0]] = row[metric_idx]
+        # 以当年 1 月 1 日所在周为第 0 列，行 = 星期几（周一为 0）
+        self.first_day_weekday = datetime.date(self.year, 1, 1).weekday()
+        slot = np.arange(len(self.values)) + self.first_day_weekday
+        rows, cols = slot % 7, slot // 7
+        inside = cols < 53
 
         # 初始化矩阵 (7行 x 53列)
         self.heatmap_data = np.zeros((7, 53))
-        self.month_labels = [""] * 53
-        last_month = -1
-
-        start_date = datetime.date(self.year, 1, 1)
-        end_date = datetime.date(self.year, 12, 31)
-        delta = datetime.timedelta(days=1)
-        curr_date = start_date
-
-        while curr_date <= end_date:
-            date_str = str(curr_date)
-            val = data_map.get(date_str, 0)
+        self.heatmap_data[rows[inside], cols[inside]] = self.display_values[inside]
 
-            display_val = val
-            if self.metric == 'screen_time_seconds':
-                display_val = val / 3600.0
-
-            day_of_year = (curr_date - datetime.date(self.year, 1, 1)).days
-            first_day_weekday = start_date.weekday()
-
-            col = (day_of_year + first_day_weekday) // 7
-            row = curr_date.weekday()
-
-            if col < 53:
-                self.heatmap_data[row, col] = display_val
-                self.coord_map[(row, col)] = (date_str, val, display_val)
-
-                if row == 0:
-                    if curr_date.month != last_month:
-                        self.month_labels[col] = curr_date.strftime("%b")
-                        last_month = curr_date.month
-
-            curr_date += delta
+        # 每个月第一次出现的周一所在列打上月份标签
+        months = (np.datetime64(f"{self.year}-01-01") + np.arange(len(self.values))).astype('datetime64[M]')
+        month_idx = months.astype(np.int64) % 12
+        mondays = np.flatnonzero((rows == 0) & inside)
+        new_month = np.diff(month_idx[mondays], prepend=-1) != 0
+        self.month_labels = [""] * 53
+        for doy in mondays[new_month].tolist():
+            self.month_labels[cols[doy]] = datetime.date(self.year, month_idx[doy] + 1, 1).strftime("%b")
 
     def plot(self, ax):
         self._prepare_data()
@@ -123,4 +109,8 @@ class GithubHeatmap:
         if x is None or y is None: return None
         col = int(x)
         row = int(y)
-        return self.coord_map.get((row, col))
\ No newline at end of file
+        day_of_year = col * 7 + row - self.first_day_weekday
+        if not (0 <= row < 7 and 0 <= col < 53 and 0 <= day_of_year < len(self.values)):
+            return None
+        date_str = str(datetime.date(self.year, 1, 1) + datetime.timedelta(days=day_of_year))
+        return date_str, self.values[day_of_year], self.display_values[day_of_year]
\ No newline at end of file
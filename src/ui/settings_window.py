@@ -2,11 +2,12 @@ import customtkinter as ctk
 import winreg
 import sys
 import os
-import csv
 import datetime
+import threading
 from tkinter import filedialog, messagebox
 
 from src.database import db
+from src.database.export import ExportCancelled
 from .constants import *
 
 
@@ -62,8 +63,14 @@ class SettingsWindow(ctk.CTkToplevel):
         if self.check_autostart_status(): self.switch_autostart.select()
         self.switch_autostart.pack(padx=10, pady=(0, 15), anchor="w")
 
+        # 导出在后台线程中进行，主线程用 after() 轮询进度
+        self._export_thread = None
+        self._export_cancel = threading.Event()
+        self._export_progress = (0, 0)
+        self._export_result = None
+
         self.btn_export = ctk.CTkButton(
-            self, text="Export Data to CSV", command=self.export_data,
+            self, text="Export Data", command=self.export_data,
             fg_color=GH_FRAME, text_color=GH_TEXT_MAIN, hover_color=GH_HOVER, border_width=1, border_color=GH_HOVER
         )
         self.btn_export.pack(fill="x", padx=20, pady=20)
@@ -110,16 +117,58 @@ class SettingsWindow(ctk.CTkToplevel):
                 self.switch_autostart.select()
 
     def export_data(self):
-        filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files", "*.csv")],
-                                                initialfile=f"dailygrid_export_{datetime.date.today()}.csv")
+        if self._export_thread is not None:
+            # 导出进行中：按钮作为「取消」
+            self._export_cancel.set()
+            return
+
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[
+                ("CSV Files", "*.csv"), ("CSV Files (gzip)", "*.csv.gz"),
+                ("JSON Lines", "*.jsonl"), ("JSON Lines (gzip)", "*.jsonl.gz"), ("JSON Lines (xz)", "*.jsonl.xz"),
+            ],
+            initialfile=f"dailygrid_export_{datetime.date.today()}.csv",
+        )
         if filename:
-            try:
-                data = db.get_all_data()
-                with open(filename, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["Date", "Screen Time", "Clicks", "Keystrokes"])
-                    writer.writerows(data)
-                messagebox.showinfo("Success", "Data exported!")
-                self.destroy()
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
\ No newline at end of file
+            self._export_cancel.clear()
+            self._export_progress = (0, 0)
+            self._export_result = None
+            self._export_thread = threading.Thread(target=self._run_export, args=(filename,), daemon=True)
+            self._export_thread.start()
+            self.btn_export.configure(text="Exporting... (click to cancel)")
+            self.after(100, self._poll_export)
+
+    def _run_export(self, filename):
+        # 后台线程：不直接操作 Tk 控件，只记录进度和结果
+        def progress(done, total, name):
+            self._export_progress = (done, total)
+
+        try:
+            self._export_result = ("ok", db.export_data(filename, progress=progress, cancel_event=self._export_cancel))
+        except ExportCancelled:
+            self._export_result = ("cancelled", None)
+        except Exception as e:
+            self._export_result = ("error", e)
+
+    def _poll_export(self):
+        if self._export_thread.is_alive():
+            done, total = self._export_progress
+            percent = done * 100 // total if total else 0
+            self.btn_export.configure(text=f"Exporting... {percent}% (click to cancel)")
+            self.after(100, self._poll_export)
+            return
+
+        self._export_thread = None
+        self.btn_export.configure(text="Export Data")
+        status, value = self._export_result
+        if status == "ok":
+            messagebox.showinfo("Success", f"Data exported to {len(value['files'])} file(s)!")
+            self.destroy()
+        elif status == "error":
+            messagebox.showerror("Error", str(value))
+
+    def destroy(self):
+        # 窗口关闭时取消尚未完成的导出
+        self._export_cancel.set()
+        super().destroy()
@@ -1,5 +1,20 @@
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QHBoxLayout
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QFrame
 from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QColor
+
+from src.database import db
+from src.database.timekeys import date_from_day
+from .query_worker import QueryClient
+from .widgets.chart_widget import ChartWidget
+
+# 折线图显示最近多少天
+RECENT_DAYS = 30
+
+
+def _format_duration(seconds):
+    h = int(seconds // 3600)
+    m = int((seconds % 3600) // 60)
+    return f"{h}h {m}m" if h else f"{m}m"
 
 
 class AppDetailPage(QWidget):
@@ -8,6 +23,11 @@ class AppDetailPage(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
 
+        self.app_name = None
+
+        # 异步查询：切换应用 / 离开页面时旧请求作废
+        self.queries = QueryClient(self)
+
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(30, 30, 30, 30)
         self.layout.setSpacing(20)
@@ -35,10 +55,72 @@ class AppDetailPage(QWidget):
         self.lbl_title.setStyleSheet("font-size: 24px; font-weight: bold; color: #c9d1d9;")
         self.layout.addWidget(self.lbl_title)
 
-        # --- 占位内容 ---
-        self.lbl_placeholder = QLabel("More detailed app charts will go here.")
-        self.lbl_placeholder.setStyleSheet("color: #8b949e; font-size: 14px;")
-        self.lbl_placeholder.setAlignment(Qt.AlignCenter)
-        self.layout.addWidget(self.lbl_placeholder)
+        # --- 汇总：总时长 / 活跃天数 / 日均 / 名次 ---
+        summary_layout = QHBoxLayout()
+        summary_layout.setSpacing(15)
+        self.summary_labels = {}
+        for key, title in (("total", "Total"), ("days", "Active Days"), ("average", "Daily Average"), ("rank", "Rank")):
+            card = QFrame()
+            card.setStyleSheet("QFrame { background-color: #161b22; border: 1px solid #30363d; border-radius: 12px; }")
+            card_layout = QVBoxLayout(card)
+            card_layout.setContentsMargins(20, 15, 20, 15)
+
+            lbl_name = QLabel(title)
+            lbl_name.setStyleSheet("color: #8b949e; font-size: 12px; font-weight: 600; border: none;")
+            lbl_value = QLabel("-")
+            lbl_value.setStyleSheet("color: #c9d1d9; font-size: 20px; font-weight: bold; border: none;")
+            card_layout.addWidget(lbl_name)
+            card_layout.addWidget(lbl_value)
+
+            self.summary_labels[key] = lbl_value
+            summary_layout.addWidget(card)
+        self.layout.addLayout(summary_layout)
+
+        # --- 图表：最近 30 天 / 按小时分布 ---
+        self.chart_daily = self._add_chart(f"Last {RECENT_DAYS} Days")
+        self.chart_hourly = self._add_chart("Time of Day (all history)")
+
+        self.layout.addStretch()
+
+    def _add_chart(self, title):
+        lbl = QLabel(title)
+        lbl.setStyleSheet("color: #8b949e; font-size: 13px; font-weight: 600;")
+        self.layout.addWidget(lbl)
+
+        chart = ChartWidget()
+        chart.theme_color = QColor("#238636")
+        chart.unit_guess = "Time"
+        chart.setFixedHeight(180)
+        self.layout.addWidget(chart)
+        return chart
+
+    # ======================================================
+    # 数据加载
+    # ======================================================
+    def load_app(self, app_name: str):
+        """AppsWidget 点击某个应用时调用：异步查询该应用的全部历史"""
+        self.app_name = app_name
+        self.lbl_title.setText(app_name.replace(".exe", ""))
+        self.queries.submit("app", db.get_app_history, app_name, callback=self._apply_data)
+
+    def cancel_loading(self):
+        """离开页面时调用：丢弃尚未返回的查询"""
+        self.queries.cancel("app")
+
+    def _apply_data(self, history):
+        if history.app_name != self.app_name:
+            return
+
+        self.summary_labels["total"].setText(_format_duration(history.total_seconds))
+        self.summary_labels["days"].setText(str(history.active_days))
+        average = history.total_seconds / history.active_days if history.active_days else 0
+        self.summary_labels["average"].setText(_format_duration(average))
+        rank = f"#{history.rank} of {history.app_count}" if history.rank is not None else "-"
+        self.summary_labels["rank"].setText(rank)
 
-        self.layout.addStretch()
\ No newline at end of file
+        recent_days = history.index[-RECENT_DAYS:]
+        self.chart_daily.set_data(
+            (history.seconds[-RECENT_DAYS:] / 3600.0).tolist(),
+            [date_from_day(d).strftime("%m-%d") for d in recent_days.tolist()],
+        )
+        self.chart_hourly.set_data((history.hourly / 3600.0).tolist(), [str(h) for h in range(24)])
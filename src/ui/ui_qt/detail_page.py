@@ -7,9 +7,24 @@ from PySide6.QtGui import QColor
 import datetime
 
 from src.database import db
+from src.database.timekeys import date_from_day
+from .query_worker import QueryClient
 from .widgets.chart_widget import ChartWidget
 
 
+def _query_detail(date_str, year):
+    """在查询线程中执行：Day / Week / Year 三组数据"""
+    end_date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+    day_data = db.get_hourly_arrays(end_date, end_date)                             # 24h
+    week_data = db.get_daily_arrays(end_date - datetime.timedelta(days=6), end_date)  # 最近 7 天
+    year_data = db.get_yearly_trend(year)                                           # 1-12 月
+    # 今年还没到的月份：用 None 占位，图表画为“空”
+    today = datetime.date.today()
+    year_data = [None if year == today.year and month > today.month else row
+                 for month, row in enumerate(year_data, 1)]
+    return day_data, week_data, year_data
+
+
 class DetailPage(QWidget):
     back_clicked = Signal()
 
@@ -19,6 +34,9 @@ class DetailPage(QWidget):
         # 当前查看的日期（字符串形式 "YYYY-MM-DD"）
         self.current_date_str = datetime.date.today().strftime("%Y-%m-%d")
 
+        # 异步查询：数据库查询不在 GUI 线程执行，切换日期/页面时旧请求作废
+        self.queries = QueryClient(self)
+
         # ========== 1. 主布局：左侧导航 + 右侧内容 ==========
         self.main_layout = QHBoxLayout(self)
         self.main_layout.setContentsMargins(0, 0, 0, 0)
@@ -262,7 +280,8 @@ class DetailPage(QWidget):
     # ======================================================
     def load_data(self, date_str: str):
         """
-        根据日期加载 Day / Week / Year 数据，并刷新全部图表。
+        根据日期异步加载 Day / Week / Year 数据，到达后刷新全部图表。
+        数据到达之前图表保持显示上一次的数据。
         date_str: "YYYY-MM-DD"
         """
         self.current_date_str = date_str  # 记住当前日期
@@ -271,39 +290,36 @@ class DetailPage(QWidget):
         dt = datetime.datetime.strptime(date_str, "%Y-%m-%d")
         current_year = dt.year
 
-        # ---------- 1. 从数据库取数据 ----------
-        day_data = db.get_hourly_activity(date_str)     # 24h
-        week_data = db.get_weekly_trend(date_str)       # 最近 7 天
-        year_data = db.get_yearly_trend(current_year)   # 1-12 月
+        # ---------- 1. 在查询线程中从数据库取数据 ----------
+        self.queries.submit("detail", _query_detail, date_str, current_year, callback=self._apply_data)
+
+    def cancel_loading(self):
+        """离开详情页时调用：丢弃尚未返回的查询"""
+        self.queries.cancel("detail")
+
+    def _apply_data(self, data):
+        day_data, week_data, year_data = data
 
         # ---------- 2. 准备 X 轴标签 ----------
         day_labels = [str(i) for i in range(24)]
-        week_labels = []
         year_labels = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
                        "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
 
         # y 值按 metric 分组
-        d_vals = {"Screen Time": [], "Clicks": [], "Keystrokes": []}
-        w_vals = {"Screen Time": [], "Clicks": [], "Keystrokes": []}
         y_vals = {"Screen Time": [], "Clicks": [], "Keystrokes": []}
 
-        # ---------- Day: 24 小时 ----------
-        for val in day_data:
-            # val: (sec, clicks, keys)
-            seconds, clicks, keys = val
-            d_vals["Screen Time"].append((seconds or 0) / 3600.0)
-            d_vals["Clicks"].append(clicks or 0)
-            d_vals["Keystrokes"].append(keys or 0)
-
-        # ---------- Week: 7 天 ----------
-        for row in week_data:
-            # row: (date, sec, clicks, keys)
-            d_obj = datetime.datetime.strptime(row[0], "%Y-%m-%d")
-            week_labels.append(d_obj.strftime("%a"))
-            seconds, clicks, keys = row[1], row[2], row[3]
-            w_vals["Screen Time"].append((seconds or 0) / 3600.0)
-            w_vals["Clicks"].append(clicks or 0)
-            w_vals["Keystrokes"].append(keys or 0)
+        # ---------- Day: 24 小时 / Week: 7 天（列式数组，缺失的小时/日期已补 0） ----------
+        d_vals = {
+            "Screen Time": (day_data.screen_time / 3600.0).tolist(),
+            "Clicks": day_data.clicks.tolist(),
+            "Keystrokes": day_data.keys.tolist(),
+        }
+        w_vals = {
+            "Screen Time": (week_data.screen_time / 3600.0).tolist(),
+            "Clicks": week_data.clicks.tolist(),
+            "Keystrokes": week_data.keys.tolist(),
+        }
+        week_labels = [date_from_day(d).strftime("%a") for d in week_data.index.tolist()]
 
         # ---------- Year: 12 个月 ----------
         for val in year_data:
@@ -12,6 +12,19 @@ from src.monitor.service import MonitorService
 from src.ui.ui_qt.dashboard import DashboardPage
 from src.ui.ui_qt.detail_page import DetailPage
 from src.ui.ui_qt.app_detail_page import AppDetailPage
+from src.ui.ui_qt.query_worker import QueryClient
+
+
+# 仪表盘 Top Apps 取前 10 个（AppsWidget 渲染前 7 个）
+TOP_APPS = 10
+
+
+def _query_dashboard(year, need_years):
+    """在查询线程中执行：仪表盘每 2 秒刷新所需的数据（今天的统计由 MonitorService 在内存中提供）"""
+    return {
+        "years": db.get_available_years() if need_years else None,
+        "year_data": db.get_data_by_year(year),
+    }
 
 
 class MainWindow(QMainWindow):
@@ -26,9 +39,13 @@ class MainWindow(QMainWindow):
         self.monitor = MonitorService(interval=2, idle_threshold=300)
         self.monitor.start()
 
-        self.db_stats = (0, 0, 0)
+        # 上一次渲染的今天快照版本，没有变化时不重绘 Top Apps
+        self._today_version = None
         self.current_year = datetime.date.today().year
 
+        # 异步查询：数据库查询放到线程池，结果通过信号回到 GUI 线程
+        self.queries = QueryClient(self)
+
         # 2. UI 基础设置
         self.load_stylesheet()
 
@@ -87,10 +104,12 @@ class MainWindow(QMainWindow):
         self.stack.setCurrentWidget(self.detail_page)
 
     def go_to_app_detail(self, app_name):
-        # 未来可以根据 app_name 加载数据
+        self.app_detail_page.load_app(app_name)
         self.stack.setCurrentWidget(self.app_detail_page)
 
     def go_to_dashboard(self):
+        self.detail_page.cancel_loading()
+        self.app_detail_page.cancel_loading()
         self.stack.setCurrentWidget(self.dashboard)
 
     # --- 辅助功能 ---
@@ -137,50 +156,61 @@ class MainWindow(QMainWindow):
 
     def quit_app(self):
         self.monitor.stop()
+        db.close()
         self.tray_icon.hide()
         sys.exit(0)
 
     # --- 循环更新逻辑 ---
     def sync_db_loop(self):
-        """定时从数据库读取最新数据并更新图表"""
-        self.db_stats = db.get_today_stats()
-
+        """定时在查询线程中读取最新数据，到达后更新图表"""
+        need_years = False
+        year_changed = False
         if self.dashboard and hasattr(self.dashboard, 'year_combo'):
             if self.dashboard.year_combo.count() > 0:
                 selected_year = int(self.dashboard.year_combo.currentText())
                 if selected_year != self.current_year:
                     self.current_year = selected_year
+                    year_changed = True
             else:
-                years = db.get_available_years()
-                if years:
-                    self.dashboard.year_combo.addItems([str(y) for y in years])
-                    idx = self.dashboard.year_combo.findText(str(self.current_year))
-                    if idx >= 0: self.dashboard.year_combo.setCurrentIndex(idx)
+                need_years = True
+
+        # 上一次刷新还没返回（数据库繁忙）时不再排队，除非切换了年份
+        if self.queries.is_pending("dashboard") and not year_changed:
+            return
+        self.queries.submit("dashboard", _query_dashboard, self.current_year, need_years,
+                            callback=self._apply_dashboard_data)
 
-        year_data = db.get_data_by_year(self.current_year)
+    def _apply_dashboard_data(self, data):
+        years = data["years"]
+        if years and self.dashboard.year_combo.count() == 0:
+            self.dashboard.year_combo.addItems([str(y) for y in years])
+            idx = self.dashboard.year_combo.findText(str(self.current_year))
+            if idx >= 0: self.dashboard.year_combo.setCurrentIndex(idx)
 
-        # ❗ 修正：将 limit 提高到 10，确保获取足够的 App 数据 ❗
-        top_apps = db.get_today_top_apps(limit=10)
+        year_data = data["year_data"]
 
         if self.dashboard:
             self.dashboard.update_heatmap_data(year_data, self.current_year)
-            # AppsWidget 内部的 update_data 会从 top_apps 中取前 7 个进行渲染
-            self.dashboard.update_apps_data(top_apps)
 
     def update_ui_loop(self):
-        """高频更新：将内存中的实时计数显示在 UI 上"""
+        """高频更新：将内存中的实时计数显示在 UI 上（不读数据库）"""
 
         # 修正：检查 monitor.input_listener 属性 (修复 AttributeError)
         if not self.monitor.input_listener: return
 
-        base_time, base_clicks, base_keys = self.db_stats
+        # 今天的总计和各应用时长由采集线程每次采集时累加
+        today = self.monitor.get_today_snapshot()
 
-        # 修正：从 monitor.input_listener 获取实时计数
+        # 修正：从 monitor.input_listener 获取实时计数（采集线程尚未取走的部分）
         pending_clicks, pending_keys = self.monitor.input_listener.get_current_counts()
 
-        total_time = base_time
-        total_clicks = base_clicks + pending_clicks
-        total_keys = base_keys + pending_keys
+        total_time = today.screen_time_seconds
+        total_clicks = today.mouse_clicks + pending_clicks
+        total_keys = today.keystrokes + pending_keys
 
         if self.dashboard:
-            self.dashboard.update_stats(total_time, total_clicks, total_keys)
\ No newline at end of file
+            self.dashboard.update_stats(total_time, total_clicks, total_keys)
+            if today.version != self._today_version:
+                self._today_version = today.version
+                # AppsWidget 内部的 update_data 会从 top_apps 中取前 7 个进行渲染
+                self.dashboard.update_apps_data(list(today.apps[:TOP_APPS]))
\ No newline at end of file
@@ -0,0 +1,100 @@
+import itertools
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class _QueryTask(QRunnable):
+    """在线程池中执行一次查询，结果通过 QueryClient 的信号送回 GUI 线程"""
+
+    def __init__(self, client, channel, token, fn, args):
+        super().__init__()
+        self.client = client
+        self.channel = channel
+        self.token = token
+        self.fn = fn
+        self.args = args
+
+    def run(self):
+        # 排队期间已被同一 channel 的新请求取代：不再查询数据库
+        if not self.client.is_current(self.channel, self.token):
+            self.client._dropped.emit(self.channel, self.token)
+            return
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            traceback.print_exc()
+            self.client._failed.emit(self.channel, self.token, str(e))
+        else:
+            self.client._finished.emit(self.channel, self.token, result)
+
+
+class QueryClient(QObject):
+    """
+    GUI 线程的异步查询入口（数据库查询放到 QThreadPool 中执行）。
+
+        client.submit("detail", load_fn, date_str, callback=self._apply)
+
+    load_fn(*args) 在工作线程中执行，callback(result) 回到 GUI 线程调用。
+    同一 channel 上的新请求会让旧请求作废：还在排队的直接跳过，
+    已经在执行的结果到达时被丢弃。控件在新数据到达之前保持显示上一次的数据。
+    """
+
+    _finished = Signal(str, int, object)
+    _failed = Signal(str, int, str)
+    _dropped = Signal(str, int)
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+
+        self._tokens = itertools.count(1)
+        # channel -> 最新请求的 token
+        self._latest = {}
+        # token -> (channel, callback, errback)
+        self._pending = {}
+
+        # 信号属于 GUI 线程的对象：工作线程 emit 后以队列方式在 GUI 线程中处理
+        self._finished.connect(self._on_finished)
+        self._failed.connect(self._on_failed)
+        self._dropped.connect(self._on_dropped)
+
+    def submit(self, channel, fn, *args, callback=None, errback=None):
+        """提交查询并返回 token；同一 channel 上尚未完成的请求随即作废"""
+        token = next(self._tokens)
+        self._latest[channel] = token
+        self._pending[token] = (channel, callback, errback)
+        self.pool.start(_QueryTask(self, channel, token, fn, args))
+        return token
+
+    def cancel(self, channel):
+        """作废 channel 上所有未完成的请求（例如离开页面时）"""
+        self._latest.pop(channel, None)
+
+    def is_current(self, channel, token):
+        return self._latest.get(channel) == token
+
+    def is_pending(self, channel):
+        """channel 上是否有尚未返回的有效请求"""
+        token = self._latest.get(channel)
+        return token is not None and token in self._pending
+
+    # ======================================================
+    # GUI 线程中的回调
+    # ======================================================
+    def _on_finished(self, channel, token, result):
+        _, callback, _ = self._pending.pop(token, (None, None, None))
+        if self.is_current(channel, token) and callback is not None:
+            callback(result)
+
+    def _on_failed(self, channel, token, message):
+        _, _, errback = self._pending.pop(token, (None, None, None))
+        if not self.is_current(channel, token):
+            return
+        if errback is not None:
+            errback(message)
+        else:
+            print(f"Query '{channel}' failed: {message}")
+
+    def _on_dropped(self, channel, token):
+        self._pending.pop(token, None)
@@ -0,0 +1,19 @@
+import pytest
+
+from src.database import DatabaseManager
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    """make_db(name, **kwargs) -> 已 init_db() 的 DatabaseManager，测试结束时关闭"""
+    managers = []
+
+    def make(name="activity.db", **kwargs):
+        manager = DatabaseManager(str(tmp_path / name), **kwargs)
+        manager.init_db()
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.close()
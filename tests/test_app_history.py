@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from src.database.timekeys import day_key
+
+
+def _use(manager, app_name, seconds, now):
+    manager.buffer.add(seconds, app_name=app_name, app_delta=seconds,
+                       focus_app=app_name, focus_seconds=seconds, now=now)
+
+
+def test_app_history_series_distribution_and_rank(make_db):
+    manager = make_db()
+    _use(manager, "editor.exe", 600, datetime(2023, 5, 1, 9, 10))
+    _use(manager, "editor.exe", 1200, datetime(2023, 5, 3, 14, 30))
+    _use(manager, "browser.exe", 3600, datetime(2023, 5, 2, 20, 0))
+    manager.buffer.flush()
+    # 未刷盘的增量也计入
+    _use(manager, "editor.exe", 300, datetime(2023, 5, 3, 15, 5))
+
+    history = manager.get_app_history("editor.exe", end_date="2023-05-04")
+    assert history.index[0] == day_key("2023-05-01")
+    assert history.seconds.tolist() == [600, 0, 1500, 0]
+    assert history.total_seconds == 2100
+    assert history.active_days == 2
+    assert history.hourly[9] == 600
+    assert history.hourly[14] == 1200
+    assert history.hourly[15] == 300
+    assert history.hourly.sum() == 2100
+    # 名次按已写入的全部历史：browser.exe 3600 > editor.exe 1800
+    assert (history.rank, history.app_count) == (2, 2)
+
+
+def test_app_history_of_an_unknown_app(make_db):
+    manager = make_db()
+    history = manager.get_app_history("missing.exe", "2023-05-01", "2023-05-07")
+    assert len(history.seconds) == 7 and history.total_seconds == 0
+    assert history.rank is None
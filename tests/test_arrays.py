@@ -0,0 +1,38 @@
+from datetime import date, datetime
+
+import numpy as np
+
+from src.database.timekeys import day_key
+
+
+def test_daily_arrays_are_dense_and_include_pending_deltas(make_db):
+    manager = make_db()
+    manager.buffer.add(30, 1, 2, now=datetime(2023, 5, 1, 10))
+    manager.buffer.add(60, 0, 3, now=datetime(2023, 5, 3, 10))
+    manager.buffer.flush()
+    manager.buffer.add(5, 1, 0, now=datetime(2023, 5, 3, 11))
+
+    result = manager.get_daily_arrays("2023-04-30", date(2023, 5, 4))
+    assert result.index.tolist() == list(range(day_key("2023-04-30"), day_key("2023-05-04") + 1))
+    assert result.screen_time.tolist() == [0, 30, 0, 65, 0]
+    assert result.clicks.tolist() == [0, 1, 0, 1, 0]
+    assert result.keys.tolist() == [0, 2, 0, 3, 0]
+    assert result.clicks.dtype == np.int64
+
+    # 缓存的行是只读的，每次调用得到新的数组
+    result.screen_time[:] = -1
+    assert manager.get_daily_arrays("2023-04-30", "2023-05-04").screen_time.tolist() == [0, 30, 0, 65, 0]
+
+
+def test_hourly_arrays_cover_every_hour_of_the_range(make_db):
+    manager = make_db()
+    manager.buffer.add(30, 1, 2, now=datetime(2023, 5, 1, 0, 30))
+    manager.buffer.add(60, 0, 3, now=datetime(2023, 5, 2, 23, 30))
+    manager.buffer.flush()
+
+    result = manager.get_hourly_arrays("2023-05-01", "2023-05-02")
+    assert len(result.index) == 48
+    assert result.index[0] == day_key("2023-05-01") * 24
+    assert result.screen_time[0] == 30 and result.screen_time[47] == 60
+    assert result.screen_time[1:47].sum() == 0
+    assert manager.get_hourly_activity("2023-05-02")[23] == (60, 0, 3)
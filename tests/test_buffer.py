@@ -0,0 +1,96 @@
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from src.database.timekeys import SQL_DAY_TO_DATE
+
+
+def _stored_daily(manager):
+    with manager._reader() as conn:
+        return {row[0]: row[1:] for row in conn.execute(
+            f"SELECT {SQL_DAY_TO_DATE.format(col='day')}, screen_time_seconds, mouse_clicks, keystrokes "
+            "FROM daily_stats"
+        )}
+
+
+def test_flush_when_pending_entries_reach_the_limit(make_db):
+    manager = make_db()
+    buffer = manager.buffer
+    buffer.flush_interval = 3600
+    buffer.max_pending = 3
+
+    buffer.add(5, 1, 1, app_name="editor.exe", app_delta=5)
+    assert buffer.pending_count() == 2 and not buffer.is_due()
+    buffer.add(5, 0, 1, key_counts={"A": 1})
+    assert buffer.is_due()
+
+    buffer.flush_if_due()
+    assert buffer.pending_count() == 0
+    buffer.flush()  # flush_if_due() 不等待写线程
+    assert _stored_daily(manager) == {date.today().isoformat(): (10, 1, 2)}
+
+
+def test_flush_interval(make_db):
+    manager = make_db()
+    buffer = manager.buffer
+    buffer.flush_interval = 3600
+    buffer.add(5, 1, 1)
+    assert not buffer.is_due()
+    buffer.flush_interval = 0
+    assert buffer.is_due()
+
+
+def test_day_rollover_flushes_both_days(make_db):
+    manager = make_db()
+    buffer = manager.buffer
+    buffer.flush_interval = 3600
+    midnight = datetime.combine(date.today(), datetime.min.time())
+    before = midnight - timedelta(seconds=1)
+
+    buffer.add(5, 1, 1, now=before)
+    assert not buffer.is_due()
+    buffer.add(7, 2, 2, now=midnight)
+    assert buffer.is_due()
+
+    buffer.flush_if_due()
+    buffer.flush()
+    assert _stored_daily(manager) == {before.date().isoformat(): (5, 1, 1), midnight.date().isoformat(): (7, 2, 2)}
+    assert manager.get_hourly_activity(before.date().isoformat())[23] == (5, 1, 1)
+    assert manager.get_hourly_activity(midnight.date().isoformat())[0] == (7, 2, 2)
+
+
+def test_reads_merge_unflushed_deltas_once(make_db):
+    manager = make_db()
+    manager.update_stats(10, 1, 1)
+    manager.buffer.add(5, 1, 1, app_name="editor.exe", app_delta=5, key_counts={"A": 2})
+
+    assert tuple(manager.get_today_stats()) == (15, 2, 2)
+    assert dict(manager.get_today_top_apps()) == {"editor.exe": 5}
+    assert manager.get_total_keyboard_heatmap() == {"A": 2}
+
+    manager.buffer.flush()
+    assert tuple(manager.get_today_stats()) == (15, 2, 2)
+    assert dict(manager.get_today_top_apps()) == {"editor.exe": 5}
+    assert manager.get_total_keyboard_heatmap() == {"A": 2}
+
+
+def test_failed_flush_keeps_deltas_for_the_next_flush(make_db, monkeypatch):
+    manager = make_db()
+    manager.buffer.add(5, 1, 1)
+
+    with monkeypatch.context() as patch:
+        def fail(*args):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        patch.setattr(manager, "_apply_deltas", fail)
+        with pytest.raises(sqlite3.OperationalError):
+            manager.buffer.flush()
+    # 失败的批次由写线程在命令结束后合并回缓冲区；下一条命令开始时已经合并完毕
+    manager.writer.call(lambda: None)
+    assert manager.buffer.pending_count() == 1
+    assert tuple(manager.get_today_stats()) == (5, 1, 1)
+
+    manager.buffer.add(5, 0, 0)
+    manager.buffer.flush()
+    assert _stored_daily(manager) == {date.today().isoformat(): (10, 1, 1)}
@@ -0,0 +1,48 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+
+def test_writer_runs_after_hook_before_resolving(make_db):
+    manager = make_db()
+    done = threading.Event()
+
+    def after(error):
+        time.sleep(0.05)
+        done.set()
+
+    manager.writer.submit(lambda: None, after=after).result()
+    assert done.is_set()
+
+    errors = []
+    future = manager.writer.submit(lambda: 1 / 0, after=errors.append)
+    with pytest.raises(ZeroDivisionError):
+        future.result()
+    assert isinstance(errors[0], ZeroDivisionError)
+
+
+def test_reads_see_committed_writes(make_db):
+    manager = make_db()
+    manager.update_stats(60, 1, 2)
+    assert tuple(manager.get_today_stats()) == (60, 1, 2)
+    manager.update_stats(60, 1, 2)
+    assert tuple(manager.get_today_stats()) == (120, 2, 4)
+
+
+def test_today_writes_keep_past_entries_cached(make_db):
+    manager = make_db()
+    manager.buffer.add(30, 1, 1, now=datetime(2023, 5, 1, 10))
+    manager.buffer.flush()
+
+    assert manager.get_data_by_year(2023)[0][1] == 30
+    misses = manager.cache_stats()["misses"]
+    manager.update_stats(60, 1, 2)
+    assert manager.get_data_by_year(2023)[0][1] == 30
+    assert manager.cache_stats()["misses"] == misses
+
+    manager.buffer.add(30, 0, 0, now=datetime(2023, 5, 1, 11))
+    manager.buffer.flush()
+    assert manager.get_data_by_year(2023)[0][1] == 60
+    assert manager.cache_stats()["misses"] == misses + 1
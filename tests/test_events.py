@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+
+def _stored_events(manager):
+    with manager._reader() as conn:
+        return conn.execute("SELECT app_name, start_ts, end_ts FROM events ORDER BY start_ts").fetchall()
+
+
+def test_heartbeats_merge_into_one_event_per_app_switch(make_db):
+    manager = make_db()
+    buffer = manager.buffer
+    start = datetime(2023, 5, 1, 10)
+
+    for i in range(1, 4):
+        buffer.add(1, focus_app="editor.exe", focus_seconds=1, now=start + timedelta(seconds=i))
+    buffer.add(1, focus_app="browser.exe", focus_seconds=1, now=start + timedelta(seconds=4))
+    # 超过 event_merge_gap 的空档（闲置）之后另起一个区间
+    buffer.add(1, focus_app="browser.exe", focus_seconds=1, now=start + timedelta(seconds=60))
+    assert buffer.pending_count() == 2 + 3  # 两个分钟桶 + 三个区间
+
+    expected = [
+        ("editor.exe", start.timestamp(), start.timestamp() + 3),
+        ("browser.exe", start.timestamp() + 3, start.timestamp() + 4),
+        ("browser.exe", start.timestamp() + 59, start.timestamp() + 60),
+    ]
+    assert manager.get_events("2023-05-01") == expected
+    buffer.flush()
+    assert _stored_events(manager) == expected
+
+
+def test_open_event_is_extended_in_place_across_flushes(make_db):
+    manager = make_db()
+    buffer = manager.buffer
+    start = datetime(2023, 5, 1, 10)
+
+    buffer.add(1, focus_app="editor.exe", focus_seconds=1, now=start + timedelta(seconds=1))
+    buffer.flush()
+    buffer.add(1, focus_app="editor.exe", focus_seconds=1, now=start + timedelta(seconds=2))
+    assert manager.get_events("2023-05-01") == [("editor.exe", start.timestamp(), start.timestamp() + 2)]
+    buffer.flush()
+
+    assert _stored_events(manager) == [("editor.exe", start.timestamp(), start.timestamp() + 2)]
+    assert manager.get_events("2023-05-02") == []
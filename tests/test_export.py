@@ -0,0 +1,95 @@
+import csv
+import gzip
+import json
+import threading
+from datetime import datetime
+
+import pytest
+
+from src.database import export
+from src.database.timekeys import day_key
+
+
+def _populate(manager):
+    manager.buffer.add(60, 1, 2, app_name="editor.exe", app_delta=60, key_counts={"A": 2},
+                       focus_app="editor.exe", focus_seconds=60, now=datetime(2023, 5, 1, 10, 1))
+    manager.buffer.add(30, 0, 1, app_name="browser.exe", app_delta=30, key_counts={"B": 1},
+                       focus_app="browser.exe", focus_seconds=30, now=datetime(2023, 5, 2, 9, 0))
+    manager.buffer.add(key_counts={"A": 5}, now=datetime(2022, 1, 15, 12))
+    manager.buffer.flush()
+    # 把 2023 年之前的按键计数折叠进 keyboard_monthly
+    manager.writer.call(manager._fold_keys_batch, day_key("2023-01-01"), 366)
+
+
+def test_jsonl_export_contains_every_table(make_db, tmp_path):
+    manager = make_db()
+    _populate(manager)
+    path = str(tmp_path / "out.jsonl.gz")
+
+    result = manager.export_data(path)
+
+    assert result["files"] == [path]
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    by_table = {}
+    for line in lines:
+        by_table.setdefault(line.pop("table"), []).append(line)
+    assert set(by_table) == set(export.EXPORT_TABLES)
+    assert result["rows"] == {name: len(rows) for name, rows in by_table.items()}
+    assert by_table["daily"] == [
+        {"date": "2023-05-01", "screen_time_seconds": 60, "mouse_clicks": 1, "keystrokes": 2},
+        {"date": "2023-05-02", "screen_time_seconds": 30, "mouse_clicks": 0, "keystrokes": 1},
+    ]
+    assert by_table["hourly"][0]["hour"] == 10
+    assert by_table["keys_monthly"] == [{"month": "2022-01", "key_name": "A", "count": 5}]
+    assert [event["app_name"] for event in by_table["events"]] == ["editor.exe", "browser.exe"]
+
+
+def test_csv_export_writes_one_file_per_table(make_db, tmp_path):
+    manager = make_db()
+    _populate(manager)
+
+    result = manager.export_data(str(tmp_path / "out.csv"))
+
+    assert sorted(result["files"]) == sorted(str(tmp_path / f"out_{name}.csv") for name in export.EXPORT_TABLES)
+    with open(tmp_path / "out_apps.csv", newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == [
+            ["date", "app_name", "duration_seconds"],
+            ["2023-05-01", "editor.exe", "60.0"],
+            ["2023-05-02", "browser.exe", "30.0"],
+        ]
+
+
+def test_cancel_removes_partial_files(make_db, tmp_path):
+    manager = make_db()
+    _populate(manager)
+    cancel = threading.Event()
+    progress = []
+
+    def on_progress(done, total, name):
+        progress.append((done, total, name))
+        cancel.set()
+
+    with pytest.raises(export.ExportCancelled):
+        with manager._reader() as conn:
+            export.export_tables(conn, str(tmp_path / "out.csv"), progress=on_progress,
+                                 cancel_event=cancel, chunk_rows=1)
+
+    assert progress == [(1, progress[0][1], "daily")]
+    assert list(tmp_path.glob("out*")) == []
+
+
+def test_progress_counts_key_days(make_db, tmp_path):
+    manager = make_db()
+    manager.buffer.add(key_counts={"A": 1, "B": 2, "C": 3}, now=datetime(2023, 5, 1, 9))
+    manager.buffer.add(key_counts={"A": 4}, now=datetime(2023, 5, 2, 9))
+    manager.buffer.flush()
+    progress = []
+
+    with manager._reader() as conn:
+        result = export.export_tables(conn, str(tmp_path / "out.csv"), tables=["keys"], chunk_rows=2,
+                                      progress=lambda done, total, name: progress.append((done, total)))
+
+    # 进度按天计：总数是 keyboard_daily 的行数，按键向量不必预先展开
+    assert result["rows"] == {"keys": 4}
+    assert progress == [(1, 2), (2, 2)]
@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+from src.database import importer
+
+
+def _write_csv(path, days=3):
+    lines = ["start,duration,app,clicks,keys"]
+    for day in range(1, days + 1):
+        for hour in range(8, 18):
+            lines.append(f"2024-03-{day:02d} {hour:02d}:10:00,1800,app{hour % 3},{hour},{day}")
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def _contents(manager):
+    with manager._reader() as conn:
+        return {
+            table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+            for table in ("hourly_stats", "daily_stats", "app_stats", "monthly_stats", "yearly_stats")
+        }
+
+
+def test_import_commits_in_batches(make_db, tmp_path):
+    path = _write_csv(tmp_path / "history.csv")
+    whole = make_db("whole.db")
+    whole.import_history(path, batch_records=1000)
+    batched = make_db("batched.db")
+    batches = []
+    original = batched._import_batch
+    batched._import_batch = lambda *args: batches.append(args[-1]) or original(*args)
+
+    report = batched.import_history(path, batch_records=7)
+
+    assert report["imported"] == 30
+    assert batches == [7, 14, 21, 28, 30]
+    assert _contents(batched) == _contents(whole)
+    assert batched.import_history(path)["status"] == "already_imported"
+
+
+def test_interrupted_import_resumes_without_double_counting(make_db, tmp_path):
+    path = _write_csv(tmp_path / "history.csv")
+    whole = make_db("whole.db")
+    whole.import_history(path, batch_records=1000)
+    manager = make_db("resumed.db")
+    original = manager._import_batch
+    calls = []
+
+    def crash_on_third(*args):
+        calls.append(args[-1])
+        if len(calls) == 3:
+            raise sqlite3.OperationalError("disk I/O error")
+        return original(*args)
+
+    manager._import_batch = crash_on_third
+    with pytest.raises(sqlite3.OperationalError):
+        manager.import_history(path, batch_records=7)
+    with manager._reader() as conn:
+        assert importer.load_progress(conn, manager.import_history(path, dry_run=True)["source_id"]) == 14
+
+    manager._import_batch = original
+    report = manager.import_history(path, batch_records=7)
+
+    assert report["status"] == "imported"
+    assert report["resumed_records"] == 14
+    assert report["records"] == report["imported"] == 30
+    assert _contents(manager) == _contents(whole)
+    with manager._reader() as conn:
+        assert importer.load_progress(conn, report["source_id"]) == 0
+    assert manager.check_rollups() == []
@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+
+def _fail_flushes(manager, monkeypatch):
+    def fail(*args, **kwargs):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(manager, "_apply_deltas", fail)
+
+
+def _wait_for_callbacks(manager):
+    # 失败的批次由写线程在命令结束后合并回缓冲区并重新写入日志；下一条命令开始时已经完成
+    manager.writer.call(lambda: None)
+
+
+def _flush_failing(manager, monkeypatch):
+    with monkeypatch.context() as patch:
+        _fail_flushes(manager, patch)
+        with pytest.raises(sqlite3.OperationalError):
+            manager.buffer.flush()
+    _wait_for_callbacks(manager)
+
+
+def test_replay_recovers_unflushed_deltas(make_db):
+    crashed = make_db(journal=True)
+    crashed.buffer.add(10, 1, 1, app_name="editor.exe", app_delta=10, key_counts={"A": 1})
+    # 进程被杀：没有刷盘；重启时从日志恢复
+    recovered = make_db(journal=True)
+    assert tuple(recovered.get_today_stats()) == (10, 1, 1)
+    assert dict(recovered.get_today_top_apps()) == {"editor.exe": 10}
+    assert recovered.get_total_keyboard_heatmap() == {"A": 1}
+
+
+def test_replay_after_failed_flush_counts_once(make_db, monkeypatch):
+    crashed = make_db(journal=True)
+    crashed.buffer.add(10, 1, 1)
+    _flush_failing(crashed, monkeypatch)
+    crashed.buffer.add(5, 0, 0)
+
+    recovered = make_db(journal=True)
+    assert tuple(recovered.get_today_stats()) == (15, 1, 1)
+
+
+def test_replay_after_repeated_failures_counts_once(make_db, monkeypatch):
+    crashed = make_db(journal=True)
+    crashed.buffer.add(10, 1, 1)
+    _flush_failing(crashed, monkeypatch)
+    crashed.buffer.add(5, 0, 0)
+    _flush_failing(crashed, monkeypatch)
+
+    recovered = make_db(journal=True)
+    assert tuple(recovered.get_today_stats()) == (15, 1, 1)
+
+
+def test_failed_then_successful_flush_leaves_nothing_to_replay(make_db, monkeypatch):
+    crashed = make_db(journal=True)
+    crashed.buffer.add(10, 1, 1)
+    _flush_failing(crashed, monkeypatch)
+    crashed.buffer.flush()
+    crashed.buffer.add(5, 0, 0)
+
+    recovered = make_db(journal=True)
+    assert tuple(recovered.get_today_stats()) == (15, 1, 1)
+
+
+def test_failed_batch_with_a_later_batch_in_flight(make_db, monkeypatch):
+    # 批次 1 失败时批次 2 已经交给写线程：批次 2 成功后会截掉批次 1 原来的记录
+    crashed = make_db(journal=True)
+    calls = []
+    apply = crashed._apply_deltas
+
+    def fail_first(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("disk I/O error")
+        return apply(*args, **kwargs)
+
+    blocker = crashed.writer.submit(lambda: __import__("time").sleep(0.2))
+    monkeypatch.setattr(crashed, "_apply_deltas", fail_first)
+    crashed.buffer.add(10, 1, 1)
+    crashed.buffer.flush(wait=False)
+    crashed.buffer.add(5, 0, 0)
+    with pytest.raises(sqlite3.OperationalError):
+        crashed.buffer.flush()
+    blocker.result()
+    _wait_for_callbacks(crashed)
+
+    recovered = make_db(journal=True)
+    assert tuple(recovered.get_today_stats()) == (15, 1, 1)
@@ -0,0 +1,34 @@
+import numpy as np
+
+from src.database import keyvectors
+
+
+def test_pack_unpack_round_trip():
+    vector = np.array([0, 3, 0, 2 ** 32 - 1], dtype=np.int64)
+    blob = keyvectors.pack(vector)
+    assert len(blob) == 4 * len(vector)
+    assert blob[4:8] == (3).to_bytes(4, "little")
+    assert keyvectors.unpack(blob).tolist() == vector.tolist()
+    assert keyvectors.unpack(None).tolist() == []
+
+
+def test_add_counts_grows_shorter_vectors():
+    blob = keyvectors.add_counts(None, {2: 5})
+    blob = keyvectors.add_counts(blob, {2: 1, 5: 7})
+    assert keyvectors.unpack(blob).tolist() == [0, 0, 6, 0, 0, 7]
+    assert keyvectors.nonzero_items(keyvectors.unpack(blob)) == [(2, 6), (5, 7)]
+    assert keyvectors.sum_blobs([keyvectors.pack([1, 1]), blob]).tolist() == [1, 1, 6, 0, 0, 7]
+
+
+def test_one_row_per_day(make_db):
+    manager = make_db()
+    manager.update_key_counts({"A": 2, "B": 1})
+    manager.update_key_counts({"A": 1, "C": 4})
+
+    with manager._reader() as conn:
+        rows = conn.execute("SELECT day, counts FROM keyboard_daily").fetchall()
+        ids = dict(conn.execute("SELECT name, id FROM keys"))
+    assert len(rows) == 1
+    vector = keyvectors.unpack(rows[0][1])
+    assert {name: int(vector[key_id]) for name, key_id in ids.items()} == {"A": 3, "B": 1, "C": 4}
+    assert manager.get_total_keyboard_heatmap() == {"A": 3, "B": 1, "C": 4}
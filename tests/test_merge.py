@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+
+def _today_totals(manager):
+    return tuple(manager.get_today_stats())
+
+
+def test_merge_is_idempotent(make_db, tmp_path):
+    source = make_db("b.db")
+    source.update_stats(100, 1, 2)
+    source.update_app_usage("editor.exe", 100)
+    source.update_key_counts({"A": 2})
+    target = make_db("a.db")
+    target.update_stats(10, 1, 1)
+
+    assert target.merge_from(str(tmp_path / "b.db"))["status"] == "merged"
+    assert target.merge_from(str(tmp_path / "b.db"))["status"] == "up_to_date"
+    assert _today_totals(target) == (110, 2, 3)
+    assert dict(target.get_today_top_apps()) == {"editor.exe": 100}
+    assert target.get_total_keyboard_heatmap() == {"A": 2}
+    assert target.check_rollups() == []
+
+
+def test_incremental_merge_picks_up_growth_of_last_day(make_db, tmp_path):
+    source = make_db("b.db")
+    source.update_stats(100, 1, 2)
+    source.update_app_usage("editor.exe", 100)
+    source.update_key_counts({"A": 2})
+    target = make_db("a.db")
+    target.merge_from(str(tmp_path / "b.db"))
+
+    # 源库同一天又记录了新数据
+    source.update_stats(500, 3, 4)
+    source.update_app_usage("editor.exe", 500)
+    source.update_app_usage("browser.exe", 20)
+    source.update_key_counts({"A": 1, "B": 5})
+    report = target.merge_from(str(tmp_path / "b.db"))
+
+    assert report["status"] == "merged"
+    assert report["rows"]["hourly_stats"] >= 1
+    assert _today_totals(target) == _today_totals(source) == (600, 4, 6)
+    assert dict(target.get_today_top_apps()) == {"editor.exe": 600, "browser.exe": 20}
+    assert target.get_total_keyboard_heatmap() == {"A": 3, "B": 5}
+    assert target.get_hourly_activity(str(date.today())) == source.get_hourly_activity(str(date.today()))
+    assert target.check_rollups() == []
+    assert target.merge_from(str(tmp_path / "b.db"))["status"] == "up_to_date"
+
+
+def test_incremental_merge_of_minutes_and_events(make_db, tmp_path):
+    source = make_db("b.db")
+    source.buffer.add(60, 1, 1, app_name="editor.exe", app_delta=60, focus_app="editor.exe", focus_seconds=60)
+    source.buffer.flush()
+    target = make_db("a.db")
+    target.merge_from(str(tmp_path / "b.db"))
+
+    source.buffer.add(30, 2, 2, app_name="editor.exe", app_delta=30, focus_app="editor.exe", focus_seconds=30)
+    source.buffer.flush()
+    target.merge_from(str(tmp_path / "b.db"))
+
+    # 跨午夜运行时区间可能从前一天开始
+    for day in (date.today() - timedelta(days=1), date.today()):
+        assert target.get_events(str(day)) == source.get_events(str(day))
+        assert target.get_hourly_activity(str(day)) == source.get_hourly_activity(str(day))
+    first, last = date.today() - timedelta(days=1), date.today()
+    for ours, theirs in zip(target.get_minute_arrays(first, last), source.get_minute_arrays(first, last)):
+        assert np.array_equal(ours, theirs)
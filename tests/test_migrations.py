@@ -0,0 +1,145 @@
+import sqlite3
+
+import pytest
+
+from src.database import DatabaseManager, migrations
+
+# 未引入迁移之前（基线版本）的表结构：TEXT 日期，没有 schema_version
+BASELINE_SCHEMA = """
+CREATE TABLE daily_stats (
+    date TEXT PRIMARY KEY,
+    screen_time_seconds REAL DEFAULT 0,
+    mouse_clicks INTEGER DEFAULT 0,
+    keystrokes INTEGER DEFAULT 0
+);
+CREATE TABLE app_stats (
+    date TEXT,
+    app_name TEXT,
+    duration_seconds REAL DEFAULT 0,
+    PRIMARY KEY (date, app_name)
+);
+CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE keyboard_stats (
+    date TEXT,
+    key_name TEXT,
+    count INTEGER DEFAULT 0,
+    PRIMARY KEY (date, key_name)
+);
+CREATE TABLE hourly_stats (
+    date TEXT,
+    hour INTEGER,
+    screen_time_seconds REAL DEFAULT 0,
+    mouse_clicks INTEGER DEFAULT 0,
+    keystrokes INTEGER DEFAULT 0,
+    PRIMARY KEY (date, hour)
+);
+"""
+
+DAILY = {"2023-12-31": (60.0, 1, 1), "2024-01-31": (300.0, 3, 30), "2024-02-01": (7200.0, 10, 100)}
+HOURLY = {
+    ("2023-12-31", 23): (60.0, 1, 1),
+    ("2024-01-31", 9): (300.0, 3, 30),
+    ("2024-02-01", 9): (3600.0, 4, 40),
+    ("2024-02-01", 14): (3600.0, 6, 60),
+}
+APPS = {("2023-12-31", "editor.exe"): 60.0, ("2024-02-01", "editor.exe"): 3600.0,
+        ("2024-02-01", "browser.exe"): 1800.0}
+KEYS = {("2023-12-31", "A"): 1, ("2024-02-01", "A"): 5, ("2024-02-01", "B"): 3}
+
+
+def _baseline_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO daily_stats VALUES (?, ?, ?, ?)", [(d, *v) for d, v in DAILY.items()])
+    conn.executemany("INSERT INTO hourly_stats VALUES (?, ?, ?, ?, ?)", [(*k, *v) for k, v in HOURLY.items()])
+    conn.executemany("INSERT INTO app_stats VALUES (?, ?, ?)", [(*k, v) for k, v in APPS.items()])
+    conn.executemany("INSERT INTO keyboard_stats VALUES (?, ?, ?)", [(*k, v) for k, v in KEYS.items()])
+    conn.execute("INSERT INTO settings VALUES ('daily_goal', '6.0')")
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def _settings(manager):
+    with manager._reader() as conn:
+        return dict(conn.execute("SELECT key, value FROM settings WHERE key != 'instance_id'"))
+
+
+def test_baseline_database_migrates_without_losing_data(make_db, tmp_path):
+    _baseline_db(tmp_path / "baseline.db")
+    manager = make_db("baseline.db")
+
+    with manager._reader() as conn:
+        assert migrations.current_version(conn) == migrations.latest_version()
+        triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert triggers == {"hourly_stats_insert_daily", "hourly_stats_update_daily"}
+
+    assert manager.get_data_by_year(2024) == [("2024-01-31", *DAILY["2024-01-31"]),
+                                              ("2024-02-01", *DAILY["2024-02-01"])]
+    assert manager.get_data_by_year(2023) == [("2023-12-31", *DAILY["2023-12-31"])]
+    hourly = manager.get_hourly_activity("2024-02-01")
+    assert hourly[9] == HOURLY[("2024-02-01", 9)] and hourly[14] == HOURLY[("2024-02-01", 14)]
+    assert sum(h[0] for h in hourly) == 7200
+    assert manager.get_top_apps_by_date("2024-02-01") == [("editor.exe", 3600.0), ("browser.exe", 1800.0)]
+    assert manager.get_total_keyboard_heatmap() == {"A": 6, "B": 3}
+    assert manager.check_rollups() == []
+    trend = manager.get_yearly_trend(2024)
+    assert trend[0] == DAILY["2024-01-31"] and trend[1] == DAILY["2024-02-01"]
+    # 默认保留策略不写入设置
+    assert _settings(manager) == {"daily_goal": "6.0"}
+
+    # 迁移后的写入经触发器同步 daily_stats，汇总表保持一致
+    manager.update_stats(30, 1, 1)
+    today = manager.get_today_stats()
+    assert tuple(today) == (30, 1, 1)
+    assert manager.check_rollups() == []
+
+
+def test_migrated_database_reopens_unchanged(make_db, tmp_path):
+    _baseline_db(tmp_path / "baseline.db")
+    first = make_db("baseline.db")
+    before = first.get_data_by_year(2024), first.get_total_keyboard_heatmap()
+    first.close()
+
+    again = make_db("baseline.db")
+    with again._reader() as conn:
+        versions = [row[0] for row in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+    assert versions == [version for version, _, _ in migrations.MIGRATIONS]
+    assert (again.get_data_by_year(2024), again.get_total_keyboard_heatmap()) == before
+
+
+def test_reads_before_init_db_migrate_first(tmp_path):
+    # 全局 db 在导入时创建，调用方可能在 init_db() 之前就开始读取
+    manager = DatabaseManager(_baseline_db(tmp_path / "baseline.db"))
+    try:
+        assert manager.get_data_by_year(2023) == [("2023-12-31", *DAILY["2023-12-31"])]
+        assert manager.get_total_keyboard_heatmap() == {"A": 6, "B": 3}
+        with manager._reader() as conn:
+            assert migrations.current_version(conn) == migrations.latest_version()
+        manager.init_db()
+    finally:
+        manager.close()
+
+
+def test_failed_migration_leaves_baseline_untouched(tmp_path, monkeypatch):
+    path = _baseline_db(tmp_path / "baseline.db")
+
+    def broken(conn):
+        raise sqlite3.OperationalError("boom")
+
+    patched = [(9, "broken", broken) if m[0] == 9 else m for m in migrations.MIGRATIONS]
+    monkeypatch.setattr(migrations, "MIGRATIONS", patched)
+    manager = DatabaseManager(path)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            manager.init_db()
+    finally:
+        manager.close()
+
+    conn = sqlite3.connect(path)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert tables == {"daily_stats", "app_stats", "settings", "keyboard_stats", "hourly_stats"}
+        assert dict((row[0], row[1:]) for row in conn.execute("SELECT * FROM daily_stats")) == DAILY
+    finally:
+        conn.close()
@@ -0,0 +1,65 @@
+import zlib
+from datetime import date, datetime
+
+import numpy as np
+
+from src.database import minutes
+
+
+def test_pack_unpack_round_trip():
+    array = minutes.empty()
+    array[0, 0] = 60
+    array[1, 719] = 12
+    array[2, 1439] = 70000  # 超过 uint16 的部分截断
+
+    blob = minutes.pack(array)
+    raw = zlib.decompress(blob)
+    assert len(raw) == 2 * minutes.FIELDS * minutes.SLOTS
+    unpacked = minutes.unpack(blob)
+    assert unpacked.shape == (minutes.FIELDS, minutes.SLOTS)
+    assert (unpacked[0, 0], unpacked[1, 719], unpacked[2, 1439]) == (60, 12, 65535)
+    assert unpacked.sum() == 60 + 12 + 65535
+    assert not minutes.unpack(None).any()
+
+    blob = minutes.add_minutes(blob, {0: (-30, 0, 0), 5: (10, 1, 2)})
+    assert minutes.unpack(blob)[:, [0, 5]].T.tolist() == [[30, 0, 0], [10, 1, 2]]
+
+
+def test_resample_and_active_blocks():
+    seconds = np.zeros(minutes.SLOTS, dtype=np.int64)
+    seconds[60:90] = 60
+    seconds[92:100] = 60
+    seconds[600:602] = 60
+
+    hourly = minutes.resample(np.vstack((seconds, seconds, seconds)), 60)
+    assert hourly.shape == (3, 24)
+    assert hourly[0, 1] == 38 * 60 and hourly[0, 10] == 120
+    assert minutes.active_blocks(seconds, max_gap=2, min_length=5) == [(60, 100)]
+    assert minutes.active_blocks(seconds) == [(60, 90), (92, 100), (600, 602)]
+
+
+def test_minute_arrays_include_flushed_and_pending_ticks(make_db):
+    manager = make_db()
+    manager.buffer.add(30, 1, 2, now=datetime(2023, 5, 1, 9, 15, 10))
+    manager.buffer.add(20, 0, 1, now=datetime(2023, 5, 1, 9, 15, 40))
+    manager.buffer.flush()
+    manager.buffer.add(60, 2, 0, now=datetime(2023, 5, 1, 23, 59, 30))
+
+    data = manager.get_minute_arrays("2023-05-01", "2023-05-01")
+    assert len(data.index) == minutes.SLOTS
+    assert (data.screen_time[555], data.clicks[555], data.keys[555]) == (50, 1, 3)
+    assert data.screen_time[1439] == 60
+    assert data.screen_time.sum() == 110
+    assert manager.get_window_totals(datetime(2023, 5, 1, 9), datetime(2023, 5, 1, 10)) == (50, 1, 3)
+    assert manager.get_hourly_activity("2023-05-01")[9] == (50, 1, 3)
+
+
+def test_update_stats_fills_minute_arrays(make_db):
+    manager = make_db()
+    manager.update_stats(60, 1, 2)
+
+    today = str(date.today())
+    data = manager.get_minute_arrays(today, today)
+    assert (data.screen_time.sum(), data.clicks.sum(), data.keys.sum()) == (60, 1, 2)
+    assert sum(h[0] for h in manager.get_hourly_activity(today)) == 60
+    assert manager.check_rollups() == []
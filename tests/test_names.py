@@ -0,0 +1,33 @@
+import pytest
+
+
+def test_names_round_trip_through_integer_ids(make_db):
+    manager = make_db()
+    manager.update_app_usage("编辑器.exe", 30)
+    manager.update_app_usage("browser.exe", 10)
+    manager.update_key_counts({"A": 2, "Key.space": 1, "é": 1})
+    manager.update_app_usage("编辑器.exe", 30)
+
+    assert dict(manager.get_today_top_apps()) == {"编辑器.exe": 60, "browser.exe": 10}
+    assert manager.get_total_keyboard_heatmap() == {"A": 2, "Key.space": 1, "é": 1}
+    with manager._reader() as conn:
+        assert sorted(name for (name,) in conn.execute("SELECT name FROM apps")) == ["browser.exe", "编辑器.exe"]
+        assert conn.execute("SELECT typeof(app_id) FROM app_stats").fetchone() == ("integer",)
+
+
+def test_rolled_back_write_does_not_leave_ids_in_the_cache(make_db):
+    manager = make_db()
+
+    def allocate_then_fail():
+        conn = manager._get_connection()
+        manager.app_names.ids(conn, ("ghost.exe",))
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        manager._write(("app_stats",), allocate_then_fail)
+    # ghost.exe 的 id 已随事务回滚，可能被下一个名字复用
+    manager.update_app_usage("editor.exe", 5)
+
+    assert dict(manager.get_today_top_apps()) == {"editor.exe": 5}
+    with manager._reader() as conn:
+        assert manager.app_names.id(conn, "ghost.exe") is None
@@ -0,0 +1,25 @@
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from src.database.arrays import MetricArrays
+from src.database.profiler import _row_count
+
+Row = namedtuple("Row", ["sec", "clicks", "keys"])
+
+
+@pytest.mark.parametrize("result, rows", [
+    (None, 0),
+    ((3600.0, 10, 20), 1),
+    (Row(3600.0, 10, 20), 1),
+    ((), 0),
+    ([], 0),
+    ([("a", 1), ("b", 2)], 2),
+    ((("a", 1), ("b", 2), ("c", 3)), 3),
+    ({"A": 1, "B": 2}, 2),
+    (MetricArrays(np.arange(5), np.zeros(5), np.zeros(5), np.zeros(5)), 5),
+    (42, 1),
+])
+def test_row_count(result, rows):
+    assert _row_count(result) == rows
@@ -0,0 +1,73 @@
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+QtCore = pytest.importorskip("PySide6.QtCore")
+
+
+def _load_query_worker():
+    # 直接按文件加载：src.ui 包的 __init__ 会导入 customtkinter 和采集服务
+    path = Path(__file__).resolve().parents[1] / "src" / "ui" / "ui_qt" / "query_worker.py"
+    spec = importlib.util.spec_from_file_location("query_worker", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _process_until(app, predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_newer_request_supersedes_running_and_queued_ones():
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    pool = QtCore.QThreadPool()
+    pool.setMaxThreadCount(1)
+    client = _load_query_worker().QueryClient(pool=pool)
+
+    started = threading.Event()
+    gate = threading.Event()
+    calls = []
+    results = []
+
+    def load(value):
+        calls.append(value)
+        if value == 1:
+            started.set()
+            gate.wait(5)
+        return value
+
+    client.submit("detail", load, 1, callback=results.append)
+    assert started.wait(5)
+    client.submit("detail", load, 2, callback=results.append)
+    client.submit("detail", load, 3, callback=results.append)
+    gate.set()
+
+    assert _process_until(app, lambda: not client.is_pending("detail"))
+    pool.waitForDone(5000)
+    # 1 已在执行，结果被丢弃；2 还在排队，直接跳过，不查询数据库
+    assert calls == [1, 3]
+    assert results == [3]
+
+
+def test_cancel_drops_the_result():
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    pool = QtCore.QThreadPool()
+    client = _load_query_worker().QueryClient(pool=pool)
+    gate = threading.Event()
+    results = []
+
+    client.submit("dashboard", lambda: gate.wait(5), callback=results.append)
+    client.cancel("dashboard")
+    gate.set()
+    pool.waitForDone(5000)
+    _process_until(app, lambda: False, timeout=0.1)
+
+    assert results == []
+    assert not client.is_pending("dashboard")
@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+
+from src.database.retention import RetentionPolicy
+from src.database.timekeys import day_key
+
+
+def _history(manager, days=500):
+    """最近 days 天每天 8-17 点各 60 秒活动，每天按 A 键 10 次"""
+    first = date.today() - timedelta(days=days)
+    manager.apply_deltas(
+        {(str(first + timedelta(days=i)), h * 60): (60, 1, 10) for i in range(days) for h in range(8, 18)},
+        {},
+        {(str(first + timedelta(days=i)), "A"): 10 for i in range(days)},
+    )
+
+
+def _daily(manager):
+    with manager._reader() as conn:
+        return conn.execute("SELECT day, screen_time_seconds, mouse_clicks, keystrokes FROM daily_stats").fetchall()
+
+
+def test_default_policy_keeps_everything(make_db):
+    manager = make_db()
+    policy = manager.get_retention_policy()
+    assert policy.hourly_cutoff() is None and policy.keys_cutoff() is None
+    _history(manager)
+    report = manager.apply_retention()
+    assert report["batches"] == 0
+
+
+def test_fold_preserves_daily_totals(make_db):
+    manager = make_db()
+    _history(manager)
+    daily_before = _daily(manager)
+    heatmap_before = manager.get_total_keyboard_heatmap()
+    year_before = manager.get_yearly_trend(date.today().year)
+
+    report = manager.apply_retention(RetentionPolicy(hourly_months=6, keys_months=6, batch_days=30))
+
+    assert report["hourly_rows"] > 0 and report["key_days"] > 0
+    assert _daily(manager) == daily_before
+    assert manager.get_total_keyboard_heatmap() == heatmap_before
+    assert manager.get_yearly_trend(date.today().year) == year_before
+    assert manager.check_rollups() == []
+    cutoff = RetentionPolicy(hourly_months=6).hourly_cutoff()
+    with manager._reader() as conn:
+        assert conn.execute("SELECT MIN(hour) / 24 FROM hourly_stats").fetchone()[0] >= cutoff
+        assert conn.execute("SELECT MIN(day) FROM minute_stats").fetchone()[0] >= cutoff
+        assert conn.execute("SELECT MIN(day) FROM keyboard_daily").fetchone()[0] >= cutoff
+    assert cutoff > day_key(date.today() - timedelta(days=500))
@@ -0,0 +1,45 @@
+from datetime import date, datetime
+
+
+def _monthly(manager):
+    with manager._reader() as conn:
+        return dict((row[0], row[1:]) for row in conn.execute(
+            "SELECT month, screen_time_seconds, mouse_clicks, keystrokes FROM monthly_stats"
+        ))
+
+
+def test_rollups_follow_buffered_ticks_across_month_and_year(make_db):
+    manager = make_db()
+    buffer = manager.buffer
+    buffer.add(5, 1, 1, now=datetime(2023, 1, 31, 23, 59, 59))
+    buffer.add(7, 2, 2, now=datetime(2023, 2, 1, 0, 0, 0))
+    buffer.add(3, 0, 4, now=datetime(2023, 12, 31, 23, 59, 59))
+    buffer.add(4, 1, 0, now=datetime(2024, 1, 1, 0, 0, 0))
+    buffer.flush()
+    manager.update_stats(10, 1, 1)
+
+    assert manager.check_rollups() == []
+    trend = manager.get_yearly_trend(2023)
+    assert trend[0] == (5, 1, 1)
+    assert trend[1] == (7, 2, 2)
+    assert trend[11] == (3, 0, 4)
+    assert trend[2:11] == [(0, 0, 0)] * 9
+    assert manager.get_yearly_trend(2024)[0] == (4, 1, 0)
+    assert manager.get_yearly_trend(date.today().year + 1) == [(0, 0, 0)] * 12
+    assert {2023, 2024} <= set(manager.get_available_years())
+
+
+def test_rebuild_restores_rollups(make_db):
+    manager = make_db()
+    manager.buffer.add(5, 1, 1, now=datetime(2023, 3, 15, 12))
+    manager.buffer.flush()
+    expected = _monthly(manager)
+
+    with manager._get_connection() as conn:
+        conn.execute("UPDATE monthly_stats SET mouse_clicks = mouse_clicks + 100")
+        conn.execute("DELETE FROM yearly_stats")
+    problems = manager.check_rollups()
+    assert {table for table, *_ in problems} == {"monthly_stats", "yearly_stats"}
+
+    assert manager.rebuild_rollups() == []
+    assert _monthly(manager) == expected
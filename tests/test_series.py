@@ -0,0 +1,52 @@
+from datetime import date, datetime, timedelta
+
+from src.database import series
+from src.database.timekeys import day_key
+
+
+def test_week_buckets_start_on_monday():
+    sunday, monday = day_key("2023-05-07"), day_key("2023-05-08")
+    assert series.bucket("week", sunday) == series.bucket("week", sunday - 6)
+    assert series.bucket("week", monday) == series.bucket("week", sunday) + 1
+    assert series.last_bucket_day("week", series.bucket("week", monday)) == monday + 6
+    assert series.bucket("month", day_key("2023-12-31")) + 1 == series.bucket("month", day_key("2024-01-01"))
+    assert series.bucket("year", day_key("2023-12-31")) == 2023
+
+
+def test_series_buckets_edges(make_db):
+    manager = make_db()
+    buffer = manager.buffer
+    buffer.add(10, 1, 1, now=datetime(2023, 5, 7, 23, 59, 59))   # 周日
+    buffer.add(20, 2, 2, now=datetime(2023, 5, 8, 0, 0, 0))      # 周一
+    buffer.add(40, 4, 4, now=datetime(2023, 12, 31, 12))
+    buffer.flush()
+    buffer.add(80, 8, 8, now=datetime(2024, 1, 1, 0, 0, 0))     # 未刷盘
+
+    weeks = manager.get_series(("screen_time", "clicks"), "week", "2023-05-01", "2023-05-14")
+    assert weeks.values["screen_time"].tolist() == [10, 20]
+    assert weeks.values["clicks"].tolist() == [1, 2]
+
+    hours = manager.get_series("keys", "hour", "2023-05-07", "2023-05-08")
+    assert len(hours.index) == 48
+    assert hours.values["keys"][23] == 1 and hours.values["keys"][24] == 2
+
+    months = manager.get_series("screen_time", "month", "2023-11-01", "2024-02-01")
+    assert months.values["screen_time"].tolist() == [0, 40, 80, 0]
+    years = manager.get_series("screen_time", "year", "2023-01-01", "2024-12-31")
+    assert years.index.tolist() == [2023, 2024]
+    assert years.values["screen_time"].tolist() == [70, 80]
+
+
+def test_future_mask(make_db):
+    manager = make_db()
+    today = date.today()
+
+    days = manager.get_series("screen_time", "day", today - timedelta(days=1), today + timedelta(days=2))
+    assert days.future.tolist() == [False, False, True, True]
+
+    hours = manager.get_series("screen_time", "hour", today, today)
+    hour = datetime.now().hour
+    assert not hours.future[:hour + 1].any() and hours.future[hour + 1:].all()
+
+    years = manager.get_series("screen_time", "year", date(today.year - 1, 1, 1), date(today.year + 1, 1, 1))
+    assert years.future.tolist() == [False, False, True]
@@ -0,0 +1,36 @@
+import sqlite3
+
+from src.database.snapshot import SETTING_SNAPSHOT_CLEAN
+
+
+def _disk(tmp_path, sql):
+    conn = sqlite3.connect(tmp_path / "activity.db")
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_snapshot_writes_memory_back_to_disk(make_db, tmp_path):
+    manager = make_db(in_memory=True, snapshot_interval=3600)
+    manager.update_stats(60, 1, 2)
+    assert _disk(tmp_path, "SELECT screen_time_seconds FROM daily_stats") == []
+
+    assert manager.snapshotter.snapshot()
+    assert _disk(tmp_path, "SELECT screen_time_seconds, mouse_clicks, keystrokes FROM daily_stats") == [(60, 1, 2)]
+    # 会话还没结束：意外退出时下次启动会提示
+    assert _disk(tmp_path, f"SELECT value FROM settings WHERE key = '{SETTING_SNAPSHOT_CLEAN}'") == [("0",)]
+    assert manager.snapshot_status()["snapshots"] == 2  # 启动时一次 + 手动一次
+
+
+def test_close_takes_final_snapshot_and_next_start_restores_it(make_db, tmp_path):
+    manager = make_db(in_memory=True, snapshot_interval=3600)
+    manager.update_stats(60, 1, 2)
+    manager.update_app_usage("editor.exe", 60)
+    manager.close()
+    assert _disk(tmp_path, f"SELECT value FROM settings WHERE key = '{SETTING_SNAPSHOT_CLEAN}'") == [("1",)]
+
+    restored = make_db(in_memory=True, snapshot_interval=3600)
+    assert tuple(restored.get_today_stats()) == (60, 1, 2)
+    assert dict(restored.get_today_top_apps()) == {"editor.exe": 60}
+    assert make_db("other.db").snapshot_status() is None
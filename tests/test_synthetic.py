@@ -0,0 +1,66 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.database import minutes, synthetic
+
+END = date(2023, 12, 31)
+
+_DUMPS = {
+    "daily_stats": "SELECT * FROM daily_stats ORDER BY day",
+    "hourly_stats": "SELECT * FROM hourly_stats ORDER BY hour",
+    "app_stats": "SELECT s.day, a.name, s.duration_seconds FROM app_stats s JOIN apps a ON a.id = s.app_id "
+                 "ORDER BY s.day, a.name",
+    "keyboard_daily": "SELECT * FROM keyboard_daily ORDER BY day",
+    "minute_stats": "SELECT * FROM minute_stats ORDER BY day",
+    "events": "SELECT app_name, start_ts, end_ts FROM events ORDER BY start_ts, app_name",
+}
+
+
+def _dump(manager):
+    with manager._reader() as conn:
+        return {table: conn.execute(sql).fetchall() for table, sql in _DUMPS.items()}
+
+
+def test_same_seed_gives_identical_data(make_db):
+    first = make_db("a.db")
+    second = make_db("b.db")
+    other = make_db("c.db")
+    first.generate_synthetic(years=1, apps=50, seed=7, end=END)
+    second.generate_synthetic(years=1, apps=50, seed=7, end=END)
+    other.generate_synthetic(years=1, apps=50, seed=8, end=END)
+
+    dump = _dump(first)
+    assert all(dump.values())
+    assert dump == _dump(second)
+    assert dump["daily_stats"] != _dump(other)["daily_stats"]
+
+
+def test_tables_are_consistent(make_db):
+    manager = make_db()
+    manager.generate_synthetic(years=1, apps=50, seed=0, end=END)
+
+    assert manager.check_rollups() == []
+    with manager._reader() as conn:
+        day, blob = conn.execute("SELECT day, data FROM minute_stats ORDER BY day DESC LIMIT 1").fetchone()
+        hourly = conn.execute(
+            "SELECT hour % 24, screen_time_seconds, mouse_clicks, keystrokes FROM hourly_stats "
+            "WHERE hour BETWEEN ? AND ?",
+            (day * 24, day * 24 + 23),
+        ).fetchall()
+        daily = conn.execute(
+            "SELECT screen_time_seconds, mouse_clicks, keystrokes FROM daily_stats WHERE day = ?", (day,)
+        ).fetchone()
+    per_hour = minutes.resample(minutes.unpack(blob), 60)
+    for hour, *values in hourly:
+        assert per_hour[:, hour].tolist() == values
+    assert np.allclose(per_hour.sum(axis=1), daily)
+
+
+def test_refuses_a_database_with_activity(make_db):
+    manager = make_db()
+    manager.update_stats(60, 1, 1)
+    with pytest.raises(synthetic.SyntheticError):
+        manager.generate_synthetic(years=1, apps=10, end=END)
+    assert tuple(manager.get_today_stats()) == (60, 1, 1)
@@ -0,0 +1,51 @@
+import importlib.util
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+
+def _load_today():
+    # 直接按文件加载：src.monitor 包的 __init__ 会导入采集服务（依赖 pynput）
+    path = Path(__file__).resolve().parents[1] / "src" / "monitor" / "today.py"
+    spec = importlib.util.spec_from_file_location("today", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+TodayState = _load_today().TodayState
+
+
+def test_seed_includes_unflushed_deltas_and_ticks_accumulate(make_db):
+    manager = make_db()
+    now = datetime.now()
+    manager.update_stats(60, 1, 2)
+    manager.update_app_usage("editor.exe", 60)
+    manager.buffer.add(30, 0, 1, app_name="browser.exe", app_delta=30, now=now)
+
+    state = TodayState()
+    state.seed(manager)
+    first = state.snapshot()
+    assert first.date == str(date.today())
+    assert (first.screen_time_seconds, first.mouse_clicks, first.keystrokes) == (90, 1, 3)
+    assert first.apps == (("editor.exe", 60), ("browser.exe", 30))
+    assert state.snapshot() is first
+
+    state.add(now, 5, 1, 0, app_name="browser.exe", app_delta=45)
+    second = state.snapshot()
+    assert second.version > first.version
+    assert second.screen_time_seconds == 95
+    assert second.apps == (("browser.exe", 75), ("editor.exe", 60))
+    assert second.hourly[now.hour][1] == first.hourly[now.hour][1] + 1
+
+
+def test_rollover_starts_the_new_day_from_zero():
+    state = TodayState()
+    yesterday = datetime.combine(date.today() - timedelta(days=1), datetime.max.time())
+    state.add(yesterday, 10, 1, 1, app_name="editor.exe", app_delta=10)
+    # 快照总是今天的：昨天的状态已被清零
+    snapshot = state.snapshot()
+    assert snapshot.date == str(date.today())
+    assert (snapshot.screen_time_seconds, snapshot.apps) == (0, ())
+
+    state.add(datetime.now(), 5, 0, 0)
+    assert state.snapshot().screen_time_seconds == 5
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from src.database.timekeys import day_key
+
+
+def _daily(manager):
+    with manager._reader() as conn:
+        return conn.execute("SELECT day, screen_time_seconds, mouse_clicks, keystrokes FROM daily_stats").fetchall()
+
+
+def test_daily_stats_follow_hourly_writes(make_db):
+    manager = make_db()
+    manager.update_stats(60, 1, 2)
+    manager.update_stats(30, 0, 1)
+    manager.buffer.add(10, 1, 1, now=datetime(2023, 5, 1, 9, 30))
+    manager.buffer.add(20, 0, 3, now=datetime(2023, 5, 1, 23, 59, 59))
+    manager.buffer.flush()
+
+    day = day_key("2023-05-01")
+    assert (day, 30, 1, 4) in _daily(manager)
+    assert tuple(manager.get_today_stats()) == (90, 1, 3)
+
+    with manager._get_connection() as conn:
+        # 直接修改小时行：差值同步到当天；删除小时明细（保留策略折叠）不影响 daily_stats
+        conn.execute("UPDATE hourly_stats SET mouse_clicks = mouse_clicks + 5 WHERE hour = ?", (day * 24 + 9,))
+        conn.execute("DELETE FROM hourly_stats WHERE hour / 24 = ?", (day,))
+    assert (day, 30, 6, 4) in _daily(manager)
+
+
+def test_merge_adds_days_without_hourly_detail_once(make_db):
+    source = make_db("source.db")
+    source.buffer.add(60, 1, 1, now=datetime(2023, 5, 2, 12))
+    source.buffer.flush()
+    with source._get_connection() as conn:
+        # 早期没有小时明细的日期
+        conn.execute(
+            "INSERT INTO daily_stats (day, screen_time_seconds, mouse_clicks, keystrokes) VALUES (?, 100, 2, 3)",
+            (day_key("2023-05-01"),),
+        )
+        conn.execute("UPDATE daily_stats SET keystrokes = keystrokes + 7 WHERE day = ?", (day_key("2023-05-02"),))
+
+    target = make_db("target.db")
+    target.merge_from(source.db_name)
+    assert sorted(_daily(target)) == sorted(_daily(source))
+
+    # 再次合并：最后一天的小时增量由触发器计入，daily_stats 只补剩下的部分
+    source.buffer.add(30, 1, 0, now=datetime(2023, 5, 2, 13))
+    source.buffer.flush()
+    with source._get_connection() as conn:
+        conn.execute("UPDATE daily_stats SET keystrokes = keystrokes + 2 WHERE day = ?", (day_key("2023-05-02"),))
+    target.merge_from(source.db_name)
+    assert sorted(_daily(target)) == sorted(_daily(source))
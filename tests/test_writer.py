@@ -0,0 +1,80 @@
+import sqlite3
+import threading
+
+import pytest
+
+
+def _insert(manager, key, value):
+    with manager._get_connection() as conn:
+        conn.execute("INSERT INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+
+def _settings(manager):
+    with manager._reader() as conn:
+        return dict(conn.execute("SELECT key, value FROM settings WHERE key LIKE 'test_%'"))
+
+
+def test_commands_run_in_submission_order_on_one_thread(make_db):
+    manager = make_db()
+    order, threads = [], set()
+
+    def command(i):
+        order.append(i)
+        threads.add(threading.current_thread().name)
+        _insert(manager, f"test_{i:03d}", str(i))
+        return i
+
+    futures = [manager.writer.submit(command, i) for i in range(200)]
+    assert [f.result() for f in futures] == list(range(200))
+    assert order == list(range(200))
+    assert threads == {manager.writer.name}
+    assert len(_settings(manager)) == 200
+
+
+def test_failed_command_rolls_back_and_writer_keeps_going(make_db):
+    manager = make_db()
+
+    def half_done():
+        # 直接在写线程的事务里执行（不经过 `with conn:` 的提交）
+        manager._get_connection().execute("INSERT INTO settings (key, value) VALUES ('test_partial', '1')")
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        manager.writer.call(half_done)
+    manager.writer.call(_insert, manager, "test_after", "2")
+
+    assert _settings(manager) == {"test_after": "2"}
+    assert manager.metrics()["writer"]["errors"] == 1
+
+
+def test_read_pool_is_read_only(make_db):
+    manager = make_db()
+    with manager._reader() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO settings (key, value) VALUES ('test_x', '1')")
+
+
+def test_close_leaves_a_busy_writer_its_connection(make_db, capsys):
+    manager = make_db()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        _insert(manager, "test_slow", "1")
+
+    future = manager.writer.submit(slow)
+    started.wait(5)
+    manager.close(timeout=0.05)
+    assert "did not stop" in capsys.readouterr().out
+
+    # 写线程的连接没有被关闭：命令照常提交，线程随后退出
+    release.set()
+    future.result(timeout=5)
+    manager.writer.thread.join(5)
+    assert not manager.writer.thread.is_alive()
+    conn = sqlite3.connect(manager.db_name)
+    try:
+        assert conn.execute("SELECT value FROM settings WHERE key = 'test_slow'").fetchone() == ("1",)
+    finally:
+        conn.close()